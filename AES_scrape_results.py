@@ -1,6 +1,10 @@
-import requests
 import pandas as pd
 
+from common.aes_client import AESClient, AESRequestError
+from common.fetch_metrics import write_report
+from common.season_join import season_pivot
+from common.team_codes import load_team_code_conversions
+
 # First list of event IDs to process normally - current year's events
 event_ids = [
     "PTAwMDAwNDI3Nzk90", # 2026 NIT
@@ -15,42 +19,40 @@ event_ids = [
     # Add more event IDs here
 ]
 
-# Second list of event IDs where TeamCodes will be incremented - last year's events
-increment_teamcode_event_ids = [
-    # "PTAwMDAwMzY3MjM90", #2024 NIT
-    # "PTAwMDAwMzM4MDQ90", #2024 USAV 14-17
-    # "PTAwMDAwMzM4MDM90", #2024 USAV 11-13
-    #"PTAwMDAwMzY0NDM90", #2024 AAU Wave 4
-    #"PTAwMDAwMzY0NDE90", #2024 AAU Wave 3
-    #"PTAwMDAwMzY0NDA90", #2024 AAU Wave 2
-    #"PTAwMDAwMzYzNzA90", #2024 AAU Wave 1
-    # Add more event IDs here
-]
+# Event IDs of earlier seasons, keyed by how many seasons back they are (1 = last year's events).
+# Team codes are kept as scraped and matched to this season's codes when pivoting.
+prior_season_event_ids = {
+    1: [
+        # "PTAwMDAwMzY3MjM90", #2024 NIT
+        # "PTAwMDAwMzM4MDQ90", #2024 USAV 14-17
+        # "PTAwMDAwMzM4MDM90", #2024 USAV 11-13
+        #"PTAwMDAwMzY0NDM90", #2024 AAU Wave 4
+        #"PTAwMDAwMzY0NDE90", #2024 AAU Wave 3
+        #"PTAwMDAwMzY0NDA90", #2024 AAU Wave 2
+        #"PTAwMDAwMzYzNzA90", #2024 AAU Wave 1
+        # Add more event IDs here
+    ],
+}
+
+# Teams that changed codes between seasons (LastCode -> CurrentCode)
+team_code_conversions_path = "Power Pool Scraping/team_code_conversions.csv"
+# Per-endpoint fetch metrics of the run are written here (.json and .md)
+fetch_report_path = "fetch_report"
 
 # Initialize an empty DataFrame to hold all data
 all_data = pd.DataFrame()
 
-# Function to increment TeamCode
-def increment_team_code(team_code):
-    import re
-    match = re.search(r"g(\d+)(.+)", team_code)
-    if match:
-        number = int(match.group(1)) + 1  # Increment the numeric portion
-        return f"g{number}{match.group(2)}"
-    return team_code  # Return the original if no match
-
 # Function to fetch and process event data
-def process_event(event_id, increment_code=False):
+def process_event(event_id, season_offset=0):
     print(f"Processing event ID: {event_id}")
     
-    # Define the base API endpoint for the event
-    base_url = f"https://results.advancedeventsystems.com/api/event/{event_id}"
-    response = requests.get(base_url)
-    if response.status_code != 200:
-        print(f"Failed to fetch event details for event ID: {event_id}. Status code: {response.status_code}")
+    client = AESClient(event_id)
+    try:
+        event_data = client.event()
+    except AESRequestError as e:
+        print(f"Failed to fetch event details for event ID: {event_id}. Status code: {e.status_code}")
         return pd.DataFrame()
     
-    event_data = response.json()
     event_name = event_data.get("Name", f"Event_{event_id}")
     print(f"Processing {event_name}")
     
@@ -60,51 +62,47 @@ def process_event(event_id, increment_code=False):
     # Fetch standings for each division
     teams = []
     for division_id in division_ids:
-        standings_url = f"https://results.advancedeventsystems.com/odata/{event_id}/standings(dId={division_id},cId=null,tIds=[])?$orderby=OverallRank,FinishRank,TeamName,TeamCode"
-        response = requests.get(standings_url)
-        if response.status_code == 200:
-            standings_data = response.json()
-            teams.extend([
-                {
-                    "TeamName": team["TeamName"],
-                    "TeamCode": increment_team_code(team["TeamCode"]) if increment_code else team["TeamCode"],
-                    "OriginalTeamCode": team["TeamCode"],
-                    "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
-                    "DivisionName": team["Division"]["Name"],
-                    "EventName": event_name,
-                }
-                for team in standings_data.get("value", [])
-            ])
-        else:
-            print(f"Failed to fetch standings for division ID: {division_id}. Status code: {response.status_code}")
+        try:
+            standings = client.standings(division_id)
+        except AESRequestError as e:
+            print(f"Failed to fetch standings for division ID: {division_id}. Status code: {e.status_code}")
+            continue
+        teams.extend([
+            {
+                "TeamName": team["TeamName"],
+                "TeamCode": team["TeamCode"],
+                "SeasonOffset": season_offset,
+                "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
+                "DivisionName": team["Division"]["Name"],
+                "EventName": event_name,
+            }
+            for team in standings
+        ])
     return pd.DataFrame(teams)
 
 # Process first list of event IDs
 for event_id in event_ids:
     all_data = pd.concat([all_data, process_event(event_id)], ignore_index=True)
 
-# Process second list of event IDs with TeamCode increment
-for event_id in increment_teamcode_event_ids:
-    all_data = pd.concat([all_data, process_event(event_id, increment_code=True)], ignore_index=True)
+# Process earlier seasons' event IDs
+for season_offset, season_event_ids in prior_season_event_ids.items():
+    for event_id in season_event_ids:
+        all_data = pd.concat([all_data, process_event(event_id, season_offset=season_offset)], ignore_index=True)
     
 all_data.to_csv("raw_data.csv", index=False)
 
-# Pivot the data to group by TeamCode and include columns for each event Name
-pivot_data = all_data.pivot_table(
-    index="TeamCode", 
-    columns="EventName", 
-    values="FinishRank", 
-    aggfunc="first"
-).reset_index()
-
-# Pull list of team names from events
-team_names = all_data.groupby("OriginalTeamCode")["TeamName"].first().reset_index()
-team_names.rename(columns={'OriginalTeamCode': 'TeamCode'}, inplace=True)
+try:
+    team_code_mapping = load_team_code_conversions(team_code_conversions_path)
+except FileNotFoundError:
+    print(f"Team code conversions CSV not found: {team_code_conversions_path}. Proceeding without conversions.")
+    team_code_mapping = {}
 
-# Add the TeamName as the first column
-pivot_data = pd.merge(team_names, pivot_data, on="TeamCode")
+# One row per team across all seasons, with the TeamName as the first column
+pivot_data = season_pivot(all_data, team_code_mapping)
+pivot_data = pivot_data[["TeamName", "TeamCode"] + list(pivot_data.columns[2:])]
 
 # Save the consolidated data to a single CSV file
 csv_file_path = "combined_years_all_event_standings.csv"
 pivot_data.to_csv(csv_file_path, index=False)
-print(f"Consolidated standings saved to {csv_file_path}")
\ No newline at end of file
+print(f"Consolidated standings saved to {csv_file_path}")
+write_report(fetch_report_path)
@@ -1,18 +1,22 @@
-import requests
+import sys
+from pathlib import Path
 import pandas as pd
-import json
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.aes_client import AESClient, AESRequestError
 
 AesId = "PTAwMDAwNDI3Nzk90"
 Date = "2026-02-16"
 
+client = AESClient(AesId)
+
 # First, get the event info to extract division IDs and names
-event_url = f"https://results.advancedeventsystems.com/api/event/{AesId}"
-event_response = requests.get(event_url)
-if event_response.status_code != 200:
-    print(f"Failed to fetch event data: {event_response.status_code}")
+try:
+    event_data = client.event()
+except AESRequestError as e:
+    print(f"Failed to fetch event data: {e.status_code}")
     exit(1)
 
-event_data = event_response.json()
 divisions = event_data.get("Divisions", [])
 
 division_list = []
@@ -30,22 +34,23 @@ finals_rows = []
 for div in division_list:
     division_id = div["DivisionId"]
     division_name = div["Name"]
-    url = f"https://results.advancedeventsystems.com/api/event/{AesId}/division/{division_id}/plays/{Date}"
-    response = requests.get(url)
-    if response.status_code != 200:
-        print(f"Failed to fetch data for division {division_id}: {response.status_code}")
+    try:
+        data = client.plays(division_id, Date)
+    except AESRequestError as e:
+        print(f"Failed to fetch data for division {division_id}: {e.status_code}")
         continue
-    data = response.json()
     for bracket in data:
         # If this is a pool (no Roots, but has Teams), call the poolsheet API and record all matches
         if "Teams" in bracket and "Roots" not in bracket:
             pool_playid = bracket.get("PlayId")
             pool_name = bracket.get("FullName", "Unknown Pool")
             pool_short_name = bracket.get("CompleteShortName", "")
-            pool_url = f"https://results.advancedeventsystems.com/api/event/{AesId}/poolsheet/{pool_playid}"
-            pool_response = requests.get(pool_url)
-            if pool_response.status_code == 200:
-                pool_data = pool_response.json()
+            try:
+                pool_data = client.poolsheet(pool_playid)
+            except AESRequestError as e:
+                print(f"Failed to fetch pool sheet {pool_playid}: {e.status_code}")
+                pool_data = None
+            if pool_data is not None:
                 matches = pool_data.get("Matches", [])
                 for match in matches:
                     match_name = match.get("MatchFullName", "Unknown Match")
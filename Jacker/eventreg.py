@@ -1,8 +1,13 @@
-import requests
+import sys
+from pathlib import Path
 from bs4 import BeautifulSoup
 import csv
 import re
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.name_index import TeamNameIndex
+from common.session import get_session
+
 # API URL and query parameters
 url = "https://jacker.triplecrownsports.com/Tournament/GetRegistrations"
 params = {
@@ -20,6 +25,10 @@ cookies = {
     ".AspNetCore.Antiforgery.qKMI6Lrj50Q": "CfDJ8AlTajdgkWNJitwAPRoQPA8eT8XHVS2yQDXMUu-P7hpVkkdq92-STaBBrPUbEF52XU2oq51wdKYPt7cGfgI-E8HNFWtUmJFnOGknb_VC0Md16VSDwlPsSJ_mycr9LQ8UAJLcSrXYIn0Y9nColxMJ-D4"
 }
 
+# Jacker team list of the event (written by eventteams.py); registrations are matched
+# to it by team name to pick up each team's code
+jacker_teams_path = "jacker_teams_10570.csv"
+
 # Headers to simulate a browser request
 headers = {
     "User-Agent": "Mozilla/5.0",
@@ -63,7 +72,7 @@ def parse_section(soup, section_id, status, is_deleted=False):
 
 
 # Make request and parse HTML
-response = requests.get(url, params=params, cookies=cookies, headers=headers)
+response = get_session().get(url, params=params, cookies=cookies, headers=headers)
 soup = BeautifulSoup(response.text, "html.parser")
 
 # Parse all sections
@@ -71,12 +80,28 @@ confirmed = parse_section(soup, "ConfirmedRegistrations-10570", "Confirmed")
 pending = parse_section(soup, "PendingRegistrations-10570", "Pending")
 deleted = parse_section(soup, "DeletedRegistrations-10570", "Deleted", is_deleted=True)
 
-# Combine and write CSV
+# Combine the sections
 all_data = confirmed + pending + deleted
+
+# Add the team code of the closest-named Jacker team and how close the names are
+if Path(jacker_teams_path).exists():
+    with open(jacker_teams_path, newline="", encoding="utf-8") as jacker_file:
+        jacker_teams = list(csv.DictReader(jacker_file))
+    name_index = TeamNameIndex(team["TeamName"] for team in jacker_teams)
+    positions, scores = name_index.match_many(row[1] for row in all_data)
+    for row, position, score in zip(all_data, positions, scores):
+        row.extend([jacker_teams[position]["TeamCode"], round(score, 3)] if position >= 0 else ["", ""])
+else:
+    print(f"Jacker team list not found: {jacker_teams_path}. Team codes are left blank.")
+    for row in all_data:
+        row.extend(["", ""])
+
+# Write CSV
 with open("all_registrations.csv", "w", newline="", encoding="utf-8") as csvfile:
     writer = csv.writer(csvfile)
     writer.writerow([
-        "Reg #", "Team Name", "Team ID", "Coach", "Product", "Division Sold", "Date", "Status"
+        "Reg #", "Team Name", "Team ID", "Coach", "Product", "Division Sold", "Date", "Status",
+        "Team Code", "Match Score"
     ])
     writer.writerows(all_data)
 
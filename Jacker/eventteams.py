@@ -1,6 +1,11 @@
-import requests
+import sys
+from pathlib import Path
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.session import get_session
+from common.team_codes import normalize_team_codes
+
 def pull_jacker_teams(jacker_id):
     """
     Fetches team data from the API based on the given jacker_id,
@@ -16,7 +21,7 @@ def pull_jacker_teams(jacker_id):
     url = f"https://www.triplecrownsports.com/Data/UAGetTeams/?id={jacker_id}"
     
     # Fetch data from the API
-    response = requests.get(url)
+    response = get_session().get(url)
     
     if response.status_code == 200:
         # Parse JSON response
@@ -26,7 +31,7 @@ def pull_jacker_teams(jacker_id):
         df = pd.DataFrame(data)
         
         # Convert TeamCode to lowercase
-        df["TeamCode"] = df["TeamCode"].str.lower()
+        df["TeamCode"] = normalize_team_codes(df["TeamCode"])
 
         # Create a pivot table with TeamCode as the index and include all columns
         pivot_table = df.set_index("TeamCode").reset_index()
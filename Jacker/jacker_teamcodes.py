@@ -1,12 +1,18 @@
-import requests
+import sys
+from pathlib import Path
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.session import get_session
+from common.name_index import fuzzy_merge
+from common.team_codes import normalize_team_codes
+
 # API endpoint with the jackerID
 jacker_id = 10570 # West Coast Invite
 url = f"https://www.triplecrownsports.com/Data/UAGetTeams/?id={jacker_id}"
 
 # Fetch data from the API
-response = requests.get(url)
+response = get_session().get(url)
 
 # Check if the API call was successful
 if response.status_code == 200:
@@ -17,7 +23,7 @@ if response.status_code == 200:
     df = pd.DataFrame(data)
     
      # Convert TeamCode to lowercase
-    df["TeamCode"] = df["TeamCode"].str.lower()
+    df["TeamCode"] = normalize_team_codes(df["TeamCode"])
     
     # Create a pivot table with TeamCode as the index
     pivot_table = df.pivot_table(
@@ -33,8 +39,10 @@ if response.status_code == 200:
         raise FileNotFoundError(f"CSV file '{csv_filename}' not found in the current directory.")
     confirmed_registrations_df = pd.read_csv(csv_filename)
     
-    # Merge the pivot_table and confirmed_registrations_df on 'TeamName'
-    merged_df = pd.merge(pivot_table, confirmed_registrations_df, on="TeamName", how="inner")
+    # Match each Jacker team to the registration with the most similar 'TeamName'
+    # (spellings differ, e.g. "14U" vs "U14"); MatchScore is 1.0 for identical names
+    merged_df = fuzzy_merge(pivot_table, confirmed_registrations_df, left_on="TeamName", right_on="TeamName")
+    merged_df = merged_df.rename(columns={"TeamName_right": "RegisteredTeamName"})
     # Remove 'TeamCode' and 'Product' columns if they exist
     merged_df = merged_df.drop(columns=[col for col in ['Team Code', 'Product'] if col in merged_df.columns])
     
@@ -1,8 +1,20 @@
-import re
-import requests
+import sys
+from pathlib import Path
 import pandas as pd
 import streamlit as st
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.aes_client import AESClient, AESRequestError, event_id_from_url
+from common.aes_matches import fetch_event_matches
+
+# Parallel AES requests per event (still capped per host by the adaptive limit in common.throttle)
+schedule_workers = 16
+# "division" reads each pool/bracket once and only crawls teams it missed;
+# "team" crawls every team's schedule/past
+match_source = "division"
+# Seconds before a slow standings/schedule request is duplicated; None disables hedging
+hedge_after = 3.0
+
 
 # First list of event IDs to process normally - current year's events
 aes_urls = [
@@ -22,20 +34,18 @@ def process_event(url, increment_code=False):
     
     global aes_match_results
     
-    match = re.search(r'/event/([^/]+)$', url)
-    event_id = match.group(1) if match else None
+    event_id = event_id_from_url(url)
 
     print(f"Processing event ID: {event_id}")
     
-    # Define the base API endpoint for the event
-    base_url = f"https://results.advancedeventsystems.com/api/event/{event_id}"
-    response = requests.get(base_url)
-    if response.status_code != 200:
+    client = AESClient(event_id, hedge_after=hedge_after)
+    try:
+        event_data = client.event()
+    except AESRequestError as e:
         print(f"Failed to fetch event details for event ID: {
-              event_id}. Status code: {response.status_code}")
+              event_id}. Status code: {e.status_code}")
         return pd.DataFrame()
 
-    event_data = response.json()
     event_name = event_data.get("Name", f"Event_{event_id}")
     print(f"Processing {event_name}")
     
@@ -46,29 +56,27 @@ def process_event(url, increment_code=False):
     # Fetch standings for each division
     teams = []
     for division_id in division_ids:
-        standings_url = f"https://results.advancedeventsystems.com/odata/{event_id}/standings(dId={
-            division_id},cId=null,tIds=[])?$orderby=OverallRank,FinishRank,TeamName,TeamCode"
-        response = requests.get(standings_url)
-        if response.status_code == 200:
-            standings_data = response.json()
-            teams.extend([
-                {
-                    "TeamName": team["TeamName"],
-                    "TeamCode": team["TeamCode"],
-                    "OriginalTeamCode": team["TeamCode"],
-                    "AESTeamID": team["TeamId"],
-                    "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
-                    "DivisionName": team["Division"]["Name"],
-                    "DivisionID" : team["Division"]["DivisionId"],
-                    "EventName": event_name,
-                }
-                for team in standings_data.get("value", [])
-            ])
-        else:
+        try:
+            standings = client.standings(division_id)
+        except AESRequestError as e:
             print(f"Failed to fetch standings for division ID: {
-                  division_id}. Status code: {response.status_code}")
+                  division_id}. Status code: {e.status_code}")
+            continue
+        teams.extend([
+            {
+                "TeamName": team["TeamName"],
+                "TeamCode": team["TeamCode"],
+                "OriginalTeamCode": team["TeamCode"],
+                "AESTeamID": team["TeamId"],
+                "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
+                "DivisionName": team["Division"]["Name"],
+                "DivisionID" : team["Division"]["DivisionId"],
+                "EventName": event_name,
+            }
+            for team in standings
+        ])
         
-    results = process_match_results(teams, event_id)
+    results = process_match_results(teams, client, event_data)
     
     aes_match_results = pd.concat(
         [aes_match_results, results], ignore_index=True)
@@ -77,51 +85,45 @@ def process_event(url, increment_code=False):
         
 
 # Process match results
-def process_match_results(team_list, event_id):
+def process_match_results(team_list, client, event_data):
     match_list = []
     
-    for team in team_list:
-        aes_teamID = team["AESTeamID"]
-        division_id = team["DivisionID"]
-        base_url = f"https://results.advancedeventsystems.com/api/event/{event_id}/division/{division_id}/team/{aes_teamID}/schedule/past"
+    # Teams whose schedule still fails after retries are reported and skipped
+    matches = fetch_event_matches(
+        client,
+        event_data,
+        [(team["DivisionID"], team["AESTeamID"]) for team in team_list],
+        source=match_source,
+        max_workers=schedule_workers,
+    )
+
+    # Iterate through matches and extract details
+    for match in matches:
+        match_id = match["MatchId"]
         
-        response = requests.get(base_url)
-        if response.status_code != 200:
-            print(f"Failed to fetch event details for event ID: {
-                event_id}. Status code: {response.status_code}")
-            return pd.DataFrame()
+        first_team_id = match["FirstTeamId"]
+        first_team_name = match["FirstTeamName"]
+        first_team_won = match["FirstTeamWon"]
         
-        data = response.json()
+        second_team_id = match["SecondTeamId"]
+        second_team_name = match["SecondTeamName"]
         
-        # Iterate through matches and extract details
-        for match_data in data:
-            match = match_data["Match"]
-            
-            match_id = match["MatchId"]
-            
-            first_team_id = match["FirstTeamId"]
-            first_team_name = match["FirstTeamName"]
-            first_team_won = match["FirstTeamWon"]
-            
-            second_team_id = match["SecondTeamId"]
-            second_team_name = match["SecondTeamName"]
-            
-            # Extract set scores
-            set_scores = [set_data["ScoreText"] for set_data in match["Sets"] if set_data["ScoreText"]]
+        # Extract set scores
+        set_scores = [set_data["ScoreText"] for set_data in match["Sets"] if set_data["ScoreText"]]
 
-            # Determine match result
-            winner = first_team_name if first_team_won else second_team_name
-                
-            match_list.append({
-                "Match ID": match_id,
-                "First Team ID": first_team_id,
-                "First Team Name": first_team_name,
-                "Second Team ID": second_team_id,
-                "Second Team Name": second_team_name,
-                "Winner": winner,
-                "Set Scores": ", ".join(set_scores)
-            })
+        # Determine match result
+        winner = first_team_name if first_team_won else second_team_name
             
+        match_list.append({
+            "Match ID": match_id,
+            "First Team ID": first_team_id,
+            "First Team Name": first_team_name,
+            "Second Team ID": second_team_id,
+            "Second Team Name": second_team_name,
+            "Winner": winner,
+            "Set Scores": ", ".join(set_scores)
+        })
+        
     # Convert list to DataFrame
     df = pd.DataFrame(match_list)
     
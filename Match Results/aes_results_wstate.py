@@ -1,8 +1,20 @@
-import re
-import requests
+import sys
+from pathlib import Path
 import pandas as pd
 import streamlit as st
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.aes_client import AESClient, AESRequestError, event_id_from_url
+from common.aes_matches import fetch_event_matches
+
+# Parallel AES requests per event (still capped per host by the adaptive limit in common.throttle)
+schedule_workers = 16
+# "division" reads each pool/bracket once and only crawls teams it missed;
+# "team" crawls every team's schedule/past
+match_source = "division"
+# Seconds before a slow standings/schedule request is duplicated; None disables hedging
+hedge_after = 3.0
+
 # First list of event IDs to process normally - current year's events
 aes_urls = [
     # "https://results.advancedeventsystems.com/event/PTAwMDAwMzg4Mzk90",  # CO Challenge
@@ -25,19 +37,17 @@ if "data_fetched" not in st.session_state:
 
 # Function to fetch and process event data
 def process_event(url):
-    match = re.search(r'/event/([^/]+)$', url)
-    event_id = match.group(1) if match else None
+    event_id = event_id_from_url(url)
 
     print(f"Processing event ID: {event_id}")
     
-    # Define the base API endpoint for the event
-    base_url = f"https://results.advancedeventsystems.com/api/event/{event_id}"
-    response = requests.get(base_url)
-    if response.status_code != 200:
-        print(f"Failed to fetch event details for event ID: {event_id}. Status code: {response.status_code}")
+    client = AESClient(event_id, hedge_after=hedge_after)
+    try:
+        event_data = client.event()
+    except AESRequestError as e:
+        print(f"Failed to fetch event details for event ID: {event_id}. Status code: {e.status_code}")
         return pd.DataFrame()
 
-    event_data = response.json()
     event_name = event_data.get("Name", f"Event_{event_id}")
     print(f"Processing {event_name}")
     
@@ -47,27 +57,26 @@ def process_event(url):
     # Fetch standings for each division
     teams = []
     for division_id in division_ids:
-        standings_url = f"https://results.advancedeventsystems.com/odata/{event_id}/standings(dId={division_id},cId=null,tIds=[])?$orderby=OverallRank,FinishRank,TeamName,TeamCode"
-        response = requests.get(standings_url)
-        if response.status_code == 200:
-            standings_data = response.json()
-            teams.extend([
-                {
-                    "TeamName": team["TeamName"],
-                    "TeamCode": team["TeamCode"],
-                    "OriginalTeamCode": team["TeamCode"],
-                    "AESTeamID": team["TeamId"],
-                    "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
-                    "DivisionName": team["Division"]["Name"],
-                    "DivisionID": team["Division"]["DivisionId"],
-                    "EventName": event_name,
-                }
-                for team in standings_data.get("value", [])
-            ])
-        else:
-            print(f"Failed to fetch standings for division ID: {division_id}. Status code: {response.status_code}")
+        try:
+            standings = client.standings(division_id)
+        except AESRequestError as e:
+            print(f"Failed to fetch standings for division ID: {division_id}. Status code: {e.status_code}")
+            continue
+        teams.extend([
+            {
+                "TeamName": team["TeamName"],
+                "TeamCode": team["TeamCode"],
+                "OriginalTeamCode": team["TeamCode"],
+                "AESTeamID": team["TeamId"],
+                "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
+                "DivisionName": team["Division"]["Name"],
+                "DivisionID": team["Division"]["DivisionId"],
+                "EventName": event_name,
+            }
+            for team in standings
+        ])
     
-    results = process_match_results(teams, event_id, event_name)
+    results = process_match_results(teams, client, event_data, event_name)
     print(f"Finished processing {event_name}")
     
     return pd.DataFrame(teams), results
@@ -75,76 +84,71 @@ def process_event(url):
 
 from datetime import datetime
 
-def process_match_results(team_list, event_id, event_name):
+def process_match_results(team_list, client, event_data, event_name):
     match_list = []
     
-    for team in team_list:
-        aes_teamID = team["AESTeamID"]
-        division_id = team["DivisionID"]
-        base_url = f"https://results.advancedeventsystems.com/api/event/{event_id}/division/{division_id}/team/{aes_teamID}/schedule/past"
-        
-        response = requests.get(base_url)
-        if response.status_code != 200:
-            print(f"Failed to fetch event details for event ID: {event_id}. Status code: {response.status_code}")
-            return pd.DataFrame()
+    # Teams whose schedule still fails after retries are reported and skipped
+    matches = fetch_event_matches(
+        client,
+        event_data,
+        [(team["DivisionID"], team["AESTeamID"]) for team in team_list],
+        source=match_source,
+        max_workers=schedule_workers,
+    )
+
+    # Iterate through matches and extract details
+    for match in matches:
+        match_id = match["MatchId"]
+        first_team_id = match["FirstTeamId"]
+        first_team_name = match["FirstTeamName"]
+        first_team_won = match["FirstTeamWon"]
+        second_team_id = match["SecondTeamId"]
+        second_team_name = match["SecondTeamName"]
         
-        data = response.json()
+        # Extract match date & time
+        scheduled_datetime = match.get("ScheduledStartDateTime", "")
+        match_day, match_time = "N/A", "N/A"
+
+        if scheduled_datetime:
+            dt = datetime.fromisoformat(scheduled_datetime)  # Convert to datetime object
+            match_day = dt.strftime("%A, %B %d, %Y")  # Example: "Saturday, January 18, 2025"
+            match_time = dt.strftime("%I:%M %p").lstrip("0")  # Example: "8:30 AM"
+
+        # Extract set scores and ensure a max of 3 sets
+        set_scores = [set_data["ScoreText"] for set_data in match["Sets"] if set_data["ScoreText"]]
+        while len(set_scores) < 3:  # Fill missing sets with empty values
+            set_scores.append("")
+
+        # Calculate margin of victory for each set
+        margins = []
+        for set_score in set_scores:
+            if "-" in set_score:  # Ensure valid score format
+                scores = list(map(int, set_score.split("-")))
+                margins.append(abs(scores[0] - scores[1]))
+            else:
+                margins.append(None)  # Empty or invalid score
         
-        # Iterate through matches and extract details
-        for match_data in data:
-            match = match_data["Match"]
-            
-            match_id = match["MatchId"]
-            first_team_id = match["FirstTeamId"]
-            first_team_name = match["FirstTeamName"]
-            first_team_won = match["FirstTeamWon"]
-            second_team_id = match["SecondTeamId"]
-            second_team_name = match["SecondTeamName"]
-            
-            # Extract match date & time
-            scheduled_datetime = match.get("ScheduledStartDateTime", "")
-            match_day, match_time = "N/A", "N/A"
-
-            if scheduled_datetime:
-                dt = datetime.fromisoformat(scheduled_datetime)  # Convert to datetime object
-                match_day = dt.strftime("%A, %B %d, %Y")  # Example: "Saturday, January 18, 2025"
-                match_time = dt.strftime("%I:%M %p").lstrip("0")  # Example: "8:30 AM"
-
-            # Extract set scores and ensure a max of 3 sets
-            set_scores = [set_data["ScoreText"] for set_data in match["Sets"] if set_data["ScoreText"]]
-            while len(set_scores) < 3:  # Fill missing sets with empty values
-                set_scores.append("")
-
-            # Calculate margin of victory for each set
-            margins = []
-            for set_score in set_scores:
-                if "-" in set_score:  # Ensure valid score format
-                    scores = list(map(int, set_score.split("-")))
-                    margins.append(abs(scores[0] - scores[1]))
-                else:
-                    margins.append(None)  # Empty or invalid score
-            
-            # Determine match result
-            winner = first_team_name if first_team_won else second_team_name
-                
-            match_list.append({
-                "Event Name": event_name,
-                "Match ID": match_id,
-                "Match Day": match_day,  # ✅ Added match day
-                "Match Time": match_time,  # ✅ Added match time
-                "First Team ID": first_team_id,
-                "First Team Name": first_team_name,
-                "Second Team ID": second_team_id,
-                "Second Team Name": second_team_name,
-                "Winner": winner,
-                "Set 1": set_scores[0],
-                "Set 2": set_scores[1],
-                "Set 3": set_scores[2],
-                "Margin Set 1": margins[0],
-                "Margin Set 2": margins[1],
-                "Margin Set 3": margins[2]
-            })
+        # Determine match result
+        winner = first_team_name if first_team_won else second_team_name
             
+        match_list.append({
+            "Event Name": event_name,
+            "Match ID": match_id,
+            "Match Day": match_day,  # ✅ Added match day
+            "Match Time": match_time,  # ✅ Added match time
+            "First Team ID": first_team_id,
+            "First Team Name": first_team_name,
+            "Second Team ID": second_team_id,
+            "Second Team Name": second_team_name,
+            "Winner": winner,
+            "Set 1": set_scores[0],
+            "Set 2": set_scores[1],
+            "Set 3": set_scores[2],
+            "Margin Set 1": margins[0],
+            "Margin Set 2": margins[1],
+            "Margin Set 3": margins[2]
+        })
+        
     # Convert list to DataFrame
     df = pd.DataFrame(match_list)
     
@@ -1,7 +1,31 @@
-import re
-import requests
+import sys
+from pathlib import Path
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.aes_client import AESClient, AESRequestError, event_id_from_url
+from common.aes_matches import fetch_event_matches
+from common.fetch_metrics import write_report
+from common.match_metrics import (MetricsCube, add_metric_rates, parse_match_dates,
+                                  parse_set_score_array, set_score_counts)
+from common.warehouse import AES_SOURCE, MATCHES, STANDINGS, event_key, get_warehouse, record_aes_event
+
+# Parallel AES requests per event (still capped per host by the adaptive limit in common.throttle)
+schedule_workers = 16
+# "division" reads each pool/bracket once and only crawls teams it missed;
+# "team" crawls every team's schedule/past
+match_source = "division"
+# Seconds before a slow standings/schedule request is duplicated; None disables hedging
+hedge_after = 3.0
+# Set to True to analyze matches already in the local results warehouse instead of
+# fetching them again (events it does not hold in full since they ended are fetched as usual)
+read_warehouse = False
+# Metrics by division x day x round x court; a .parquet path writes Parquet instead of CSV
+cube_output_path = "NIT Results Analysis/data/match_metrics_cube.csv"
+# Per-endpoint fetch metrics of the run are written here (.json and .md)
+fetch_report_path = "NIT Results Analysis/data/fetch_report"
+
+
 
 # First list of event IDs to process normally - current year's events
 aes_urls = [
@@ -19,181 +43,101 @@ aes_match_results = pd.DataFrame()
 print("Volleyball Match Results")
 
 
-def parse_set_scores(set_scores_text):
-    parsed_sets = []
-    if not isinstance(set_scores_text, str) or not set_scores_text.strip():
-        return parsed_sets
-
-    for score_text in set_scores_text.split(","):
-        score_text = score_text.strip()
-        match = re.match(r"^(\d+)\s*-\s*(\d+)$", score_text)
-        if match:
-            team_one_score = int(match.group(1))
-            team_two_score = int(match.group(2))
-            parsed_sets.append((team_one_score, team_two_score))
-
-    return parsed_sets
-
-
 def calculate_weekend_metrics(match_results_df):
-    total_matches = len(match_results_df)
-    matches_went_three_sets = 0
-    total_set_margin = 0
-    total_sets = 0
-    two_point_sets = 0
-    extra_point_sets = 0
-
-    for _, row in match_results_df.iterrows():
-        parsed_sets = parse_set_scores(row.get("Set Scores", ""))
-
-        if len(parsed_sets) >= 3:
-            matches_went_three_sets += 1
-
-        for set_index, (team_one_score, team_two_score) in enumerate(parsed_sets):
-            margin = abs(team_one_score - team_two_score)
-            total_set_margin += margin
-            total_sets += 1
-            if margin == 2:
-                two_point_sets += 1
-            
-            # Check if set went to extra points
-            # For sets 1-2: a team scored 25+ points
-            # For set 3: a team scored 15+ points
-            is_set_three = set_index == 2
-            threshold = 15 if is_set_three else 25
-            if team_one_score > threshold or team_two_score > threshold:
-                extra_point_sets += 1
-
-    third_set_pct = (matches_went_three_sets / total_matches * 100) if total_matches else 0
-    avg_margin = (total_set_margin / total_sets) if total_sets else 0
-    two_point_set_pct = (two_point_sets / total_sets * 100) if total_sets else 0
-    extra_point_set_pct = (extra_point_sets / total_sets * 100) if total_sets else 0
+    scores, played = parse_set_score_array(match_results_df.get("Set Scores", pd.Series(dtype=object)))
+    totals = add_metric_rates(set_score_counts(scores, played).sum().to_frame().T).iloc[0]
 
     return {
-        "total_matches": total_matches,
-        "matches_went_three_sets": matches_went_three_sets,
-        "third_set_pct": third_set_pct,
-        "average_set_margin": avg_margin,
-        "two_point_sets": two_point_sets,
-        "total_sets": total_sets,
-        "two_point_set_pct": two_point_set_pct,
-        "extra_point_sets": extra_point_sets,
-        "extra_point_set_pct": extra_point_set_pct,
+        "total_matches": len(match_results_df),
+        "matches_went_three_sets": int(totals["matches_went_three_sets"]),
+        "third_set_pct": totals["third_set_pct"],
+        "average_set_margin": totals["avg_margin"],
+        "two_point_sets": int(totals["two_point_sets"]),
+        "total_sets": int(totals["total_sets"]),
+        "two_point_set_pct": totals["two_point_set_pct"],
+        "extra_point_sets": int(totals["extra_point_sets"]),
+        "extra_point_set_pct": totals["extra_point_set_pct"],
     }
 
 
 def calculate_daily_metrics(match_results_df):
     """Calculate metrics grouped by day of the event"""
-    from datetime import datetime
-    
-    daily_metrics = {}
-    
-    for _, row in match_results_df.iterrows():
-        # Parse the date
-        date_str = row.get("Match Date", "")
-        if not date_str:
-            continue
-        
-        try:
-            # Try parsing ISO format date
-            if "T" in date_str:
-                match_date = datetime.fromisoformat(date_str.replace("Z", "+00:00")).date()
-            else:
-                match_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        except (ValueError, AttributeError):
-            continue
-        
-        date_key = str(match_date)
-        
-        if date_key not in daily_metrics:
-            daily_metrics[date_key] = {
-                "total_matches": 0,
-                "matches_went_three_sets": 0,
-                "total_set_margin": 0,
-                "total_sets": 0,
-                "two_point_sets": 0,
-                "extra_point_sets": 0,
-            }
-        
-        parsed_sets = parse_set_scores(row.get("Set Scores", ""))
-        
-        if len(parsed_sets) >= 3:
-            daily_metrics[date_key]["matches_went_three_sets"] += 1
-        
-        daily_metrics[date_key]["total_matches"] += 1
-        
-        for set_index, (team_one_score, team_two_score) in enumerate(parsed_sets):
-            margin = abs(team_one_score - team_two_score)
-            daily_metrics[date_key]["total_set_margin"] += margin
-            daily_metrics[date_key]["total_sets"] += 1
-            
-            if margin == 2:
-                daily_metrics[date_key]["two_point_sets"] += 1
-            
-            is_set_three = set_index == 2
-            threshold = 15 if is_set_three else 25
-            if team_one_score > threshold or team_two_score > threshold:
-                daily_metrics[date_key]["extra_point_sets"] += 1
-    
-    # Calculate percentages
-    for date_key in daily_metrics:
-        data = daily_metrics[date_key]
-        data["third_set_pct"] = (data["matches_went_three_sets"] / data["total_matches"] * 100) if data["total_matches"] else 0
-        data["avg_margin"] = (data["total_set_margin"] / data["total_sets"]) if data["total_sets"] else 0
-        data["two_point_set_pct"] = (data["two_point_sets"] / data["total_sets"] * 100) if data["total_sets"] else 0
-        data["extra_point_set_pct"] = (data["extra_point_sets"] / data["total_sets"] * 100) if data["total_sets"] else 0
-    
-    return daily_metrics
+    scores, played = parse_set_score_array(match_results_df.get("Set Scores", pd.Series(dtype=object)))
+    counts = set_score_counts(scores, played)
+    counts["date"] = parse_match_dates(match_results_df.get("Match Date", pd.Series(dtype=object)))
+
+    daily = add_metric_rates(counts.dropna(subset=["date"]).groupby("date").sum())
+    return daily.to_dict(orient="index")
 
 # Function to fetch and process event data
 def process_event(url, increment_code=False):
     
     global aes_match_results
     
-    match = re.search(r'/event/([^/]+)$', url)
-    event_id = match.group(1) if match else None
+    event_id = event_id_from_url(url)
 
     print(f"Processing event ID: {event_id}")
     
-    # Define the base API endpoint for the event
-    base_url = f"https://results.advancedeventsystems.com/api/event/{event_id}"
-    response = requests.get(base_url)
-    if response.status_code != 200:
-        print(f"Failed to fetch event details for event ID: {event_id}. Status code: {response.status_code}")
+    # Matches of an ended event never change, so once they are all stored they are not downloaded again
+    warehouse_key = event_key(AES_SOURCE, event_id)
+    if read_warehouse and get_warehouse().has_final(warehouse_key, MATCHES):
+        stored_results = get_warehouse().match_results(warehouse_key)
+        if not stored_results.empty:
+            print(f"Loaded {len(stored_results)} matches for event ID: {event_id} from the warehouse")
+            aes_match_results = pd.concat(
+                [aes_match_results, stored_results], ignore_index=True)
+            return pd.DataFrame()
+
+    client = AESClient(event_id, hedge_after=hedge_after)
+    try:
+        event_data = client.event()
+    except AESRequestError as e:
+        print(f"Failed to fetch event details for event ID: {event_id}. Status code: {e.status_code}")
         return pd.DataFrame()
 
-    event_data = response.json()
     event_name = event_data.get("Name", f"Event_{event_id}")
     print(f"Processing {event_name}")
     
     # Get all division IDs for this event
     division_ids = [division["DivisionId"]
                     for division in event_data.get("Divisions", [])]
-    
+
+    # The stored rows stay incomplete until every division and match is written
+    standings_started = get_warehouse().begin_ingest(warehouse_key, STANDINGS)
+    matches_started = get_warehouse().begin_ingest(warehouse_key, MATCHES)
+
     # Fetch standings for each division
     teams = []
+    standings_by_division = {}
+    standings_complete = True
     for division_id in division_ids:
-        standings_url = f"https://results.advancedeventsystems.com/odata/{event_id}/standings(dId={division_id},cId=null,tIds=[])?$orderby=OverallRank,FinishRank,TeamName,TeamCode"
-        response = requests.get(standings_url)
-        if response.status_code == 200:
-            standings_data = response.json()
-            teams.extend([
-                {
-                    "TeamName": team["TeamName"],
-                    "TeamCode": team["TeamCode"],
-                    "OriginalTeamCode": team["TeamCode"],
-                    "AESTeamID": team["TeamId"],
-                    "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
-                    "DivisionName": team["Division"]["Name"],
-                    "DivisionID": team["Division"]["DivisionId"],
-                    "EventName": event_name,
-                }
-                for team in standings_data.get("value", [])
-            ])
-        else:
-            print(f"Failed to fetch standings for division ID: {division_id}. Status code: {response.status_code}")
+        try:
+            standings = client.standings(division_id)
+        except AESRequestError as e:
+            print(f"Failed to fetch standings for division ID: {division_id}. Status code: {e.status_code}")
+            standings_complete = False
+            continue
+        standings_by_division[division_id] = standings
+        teams.extend([
+            {
+                "TeamName": team["TeamName"],
+                "TeamCode": team["TeamCode"],
+                "OriginalTeamCode": team["TeamCode"],
+                "AESTeamID": team["TeamId"],
+                "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
+                "DivisionName": team["Division"]["Name"],
+                "DivisionID": team["Division"]["DivisionId"],
+                "EventName": event_name,
+            }
+            for team in standings
+        ])
         
-    results = process_match_results(teams, event_id)
+    record_aes_event(get_warehouse(), event_id, event_data, standings_by_division)
+    if standings_complete:
+        get_warehouse().complete_ingest(warehouse_key, STANDINGS, standings_started)
+    # Without a division's standings its teams' matches may be missing too
+    results = process_match_results(
+        teams, client, event_data, matches_started=matches_started if standings_complete else None)
     
     aes_match_results = pd.concat(
         [aes_match_results, results], ignore_index=True)
@@ -202,54 +146,61 @@ def process_event(url, increment_code=False):
         
 
 # Process match results
-def process_match_results(team_list, event_id):
+def process_match_results(team_list, client, event_data, matches_started=None):
     match_list = []
     
-    for team in team_list:
-        aes_teamID = team["AESTeamID"]
-        division_id = team["DivisionID"]
-        base_url = f"https://results.advancedeventsystems.com/api/event/{event_id}/division/{division_id}/team/{aes_teamID}/schedule/past"
+    # Teams whose schedule still fails after retries are reported and skipped
+    matches, failed_teams = fetch_event_matches(
+        client,
+        event_data,
+        [(team["DivisionID"], team["AESTeamID"]) for team in team_list],
+        source=match_source,
+        max_workers=schedule_workers,
+        return_failures=True,
+    )
+    warehouse_key = event_key(AES_SOURCE, client.event_id)
+    get_warehouse().record_matches(warehouse_key, matches)
+    # matches_started is only passed when the standings (the team list) are complete
+    if matches_started is not None and not failed_teams:
+        get_warehouse().complete_ingest(warehouse_key, MATCHES, matches_started)
+
+    division_names = {division["DivisionId"]: division.get("Name")
+                      for division in event_data.get("Divisions", [])}
+
+    # Iterate through matches and extract details
+    for match in matches:
+        match_id = match["MatchId"]
         
-        response = requests.get(base_url)
-        if response.status_code != 200:
-            print(f"Failed to fetch event details for event ID: {event_id}. Status code: {response.status_code}")
-            return pd.DataFrame()
+        first_team_id = match["FirstTeamId"]
+        first_team_name = match["FirstTeamName"]
+        first_team_won = match["FirstTeamWon"]
         
-        data = response.json()
+        second_team_id = match["SecondTeamId"]
+        second_team_name = match["SecondTeamName"]
         
-        # Iterate through matches and extract details
-        for match_data in data:
-            match = match_data["Match"]
-            
-            match_id = match["MatchId"]
-            
-            first_team_id = match["FirstTeamId"]
-            first_team_name = match["FirstTeamName"]
-            first_team_won = match["FirstTeamWon"]
-            
-            second_team_id = match["SecondTeamId"]
-            second_team_name = match["SecondTeamName"]
-            
-            # Extract set scores
-            set_scores = [set_data["ScoreText"] for set_data in match["Sets"] if set_data["ScoreText"]]
+        # Extract set scores
+        set_scores = [set_data["ScoreText"] for set_data in match["Sets"] if set_data["ScoreText"]]
 
-            # Extract match date
-            match_date = match.get("ScheduledStartDateTime", "")
+        # Extract match date
+        match_date = match.get("ScheduledStartDateTime", "")
 
-            # Determine match result
-            winner = first_team_name if first_team_won else second_team_name
-                
-            match_list.append({
-                "Match ID": match_id,
-                "First Team ID": first_team_id,
-                "First Team Name": first_team_name,
-                "Second Team ID": second_team_id,
-                "Second Team Name": second_team_name,
-                "Winner": winner,
-                "Set Scores": ", ".join(set_scores),
-                "Match Date": match_date
-            })
+        # Determine match result
+        winner = first_team_name if first_team_won else second_team_name
             
+        match_list.append({
+            "Match ID": match_id,
+            "First Team ID": first_team_id,
+            "First Team Name": first_team_name,
+            "Second Team ID": second_team_id,
+            "Second Team Name": second_team_name,
+            "Winner": winner,
+            "Set Scores": ", ".join(set_scores),
+            "Match Date": match_date,
+            "Division": division_names.get(match.get("DivisionId")),
+            "Round": match.get("Round"),
+            "Court": match.get("Court"),
+        })
+        
     # Convert list to DataFrame
     df = pd.DataFrame(match_list)
     
@@ -322,4 +273,24 @@ else:
             print(
                 f"  Sets that went to extra points: {data['extra_point_sets']} / {data['total_sets']} "
                 f"({data['extra_point_set_pct']:.1f}%)"
-            )
\ No newline at end of file
+            )
+
+    # Metrics for every division x day x round x court cell
+    metrics_cube = MetricsCube.from_match_results(aes_match_results)
+    Path(cube_output_path).parent.mkdir(parents=True, exist_ok=True)
+    metrics_cube.export(cube_output_path)
+
+    print("\n" + "="*80)
+    print("Division Summary")
+    print("="*80)
+    for _, data in metrics_cube.slice(by=["Division"]).iterrows():
+        print(
+            f"{data['Division']}: 3rd set {data['third_set_pct']:.1f}% | "
+            f"avg margin {data['avg_margin']:.2f} | "
+            f"2-pt sets {data['two_point_set_pct']:.1f}% | "
+            f"extra-point sets {data['extra_point_set_pct']:.1f}%"
+        )
+    print(f"\nMetrics cube saved to {cube_output_path}")
+
+write_report(fetch_report_path)
+
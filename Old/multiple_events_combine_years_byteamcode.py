@@ -1,6 +1,11 @@
+import sys
+from pathlib import Path
 import requests
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.season_join import season_pivot
+
 # First list of event IDs to process normally - current year's events
 event_ids = [
     "PTAwMDAwMzY3NDY90", # Central Zone
@@ -14,7 +19,7 @@ event_ids = [
     # Add more event IDs here
 ]
 
-# Second list of event IDs where TeamCodes will be incremented - last year's events
+# Second list of event IDs - last year's events, matched to this season's codes when pivoting
 increment_teamcode_event_ids = [
    "PTAwMDAwMzY3MjM90", #2024 NIT
     "PTAwMDAwMzM4MDQ90", #2024 USAV 14-17
@@ -32,16 +37,6 @@ all_data = pd.DataFrame()
 # Dictionary to map event IDs to their Names
 event_id_to_name = {}
 
-# Function to increment TeamCode
-def increment_team_code(team_code):
-    # Find the numeric portion of the team code and increment it by 1
-    import re
-    match = re.search(r"g(\d+)(.+)", team_code)
-    if match:
-        number = int(match.group(1)) + 1  # Increment the numeric portion
-        return f"g{number}{match.group(2)}"
-    return team_code  # Return the original if no match
-
 # Process first list of event IDs
 for event_id in event_ids:
     print(f"Processing event ID: {event_id}")
@@ -77,7 +72,7 @@ for event_id in event_ids:
                     {
                         "TeamName": team["TeamName"],
                         "TeamCode": team["TeamCode"],
-                        "OriginalTeamCode": team["TeamCode"],
+                        "SeasonOffset": 0,
                         "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",  # Add division name with rank
                         "DivisionName": team["Division"]["Name"],
                         "EventName": event_name,  # Use event Name instead of event ID
@@ -94,7 +89,7 @@ for event_id in event_ids:
 
 # Process second list of event IDs
 for event_id in increment_teamcode_event_ids:
-    print(f"Processing event ID with TeamCode increment: {event_id}")
+    print(f"Processing last season's event ID: {event_id}")
     
     # Define the base API endpoint for the event
     base_url = f"https://results.advancedeventsystems.com/api/event/{event_id}"
@@ -122,12 +117,12 @@ for event_id in increment_teamcode_event_ids:
             if response.status_code == 200:
                 standings_data = response.json()
                 
-                # Extract relevant fields, increment TeamCode, and include event Name
+                # Extract relevant fields and include event Name, tagged as last season
                 teams = [
                     {
                         "TeamName": team["TeamName"],
-                        "TeamCode": increment_team_code(team["TeamCode"]),  # Increment TeamCode
-                        "OriginalTeamCode": team["TeamCode"],
+                        "TeamCode": team["TeamCode"],
+                        "SeasonOffset": 1,
                         "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",  # Add division name with rank
                         "DivisionName": team["Division"]["Name"],
                         "EventName": event_name,  # Use event Name instead of event ID
@@ -142,20 +137,9 @@ for event_id in increment_teamcode_event_ids:
     else:
         print(f"Failed to fetch event details for event ID: {event_id}. Status code: {response.status_code}")
 
-# Pivot the data to group by TeamCode and include columns for each event Name
-pivot_data = all_data.pivot_table(
-    index="TeamCode", 
-    columns="EventName", 
-    values="FinishRank", 
-    aggfunc="first"
-).reset_index()
-
-# Pull list of team names from events
-team_names = all_data.groupby("OriginalTeamCode")["TeamName"].first().reset_index()
-team_names.rename(columns={'OriginalTeamCode':'TeamCode'}, inplace=True)
-
-# Add the TeamName as the first column
-pivot_data = pd.merge(team_names, pivot_data, on="TeamCode")
+# One row per team across both seasons, with the TeamName as the first column
+pivot_data = season_pivot(all_data)
+pivot_data = pivot_data[["TeamName", "TeamCode"] + list(pivot_data.columns[2:])]
 
 # Save the consolidated data to a single CSV file
 csv_file_path = "combined_years_all_event_standings.csv"
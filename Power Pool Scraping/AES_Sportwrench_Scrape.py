@@ -1,13 +1,28 @@
+import argparse
 import re
+import sys
+from pathlib import Path
+from urllib.parse import urlsplit
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium import webdriver
-import requests
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.aes_client import AES_BASE_URL, AESClient, AESRequestError, event_id_from_url
+from common.checkpoint import RunCheckpoint
+from common.fetch_metrics import write_report
+from common.driver_pool import DriverPool, load_page, read_table_cells
+from common.esw_client import (ESW_BASE_URL, ESWClient, ESWRequestError, division_finish_ranks,
+                               esw_event_id_from_url)
+from common.http_cache import has_ended
+from common.scheduler import EVENT_PRIORITY, WorkScheduler
+from common.standings_store import StandingsStore, patch_rows
+from common.season_join import season_pivot
+from common.team_codes import load_team_code_conversions, normalize_team_codes
+from common.warehouse import (AES_SOURCE, ESW_SOURCE, STANDINGS, IngestTracker, event_key, get_warehouse,
+                              record_aes_event)
+
 # First list of event IDs to process normally - current year's events
 aes_urls = [
     "https://results.advancedeventsystems.com/event/PTAwMDAwNDIzODM90",  # Tropical Ice
@@ -27,18 +42,21 @@ aes_urls = [
     # Add more event IDs here
 ]
 
-# Second list of event IDs where TeamCodes will be incremented - last year's events
-aes_prev_year_urls = [
-    "https://results.advancedeventsystems.com/event/PTAwMDAwMzgzNjE90",  # 2025 NIT
-    "https://results.advancedeventsystems.com/event/PTAwMDAwMzg4NDA90",  # 2025 SNIT
-    "https://results.advancedeventsystems.com/event/PTAwMDAwMzc4OTU90",  # 2025 USAV 14-17
-    "https://results.advancedeventsystems.com/event/PTAwMDAwMzc4MjM90",  # 2025 USAV 11-13
-    "https://results.advancedeventsystems.com/event/PTAwMDAwNDAzMTI90",  # 2025 AAU Wave 4
-    "https://results.advancedeventsystems.com/event/PTAwMDAwNDAzMTE90",  # 2025 AAU Wave 3
-    "https://results.advancedeventsystems.com/event/PTAwMDAwNDAzMTA90",  # 2025 AAU Wave 2
-    "https://results.advancedeventsystems.com/event/PTAwMDAwNDAzMDk90",  # 2025 AAU Wave 1
-    # Add more event IDs here
-]
+# Event URLs of earlier seasons, keyed by how many seasons back they are (1 = last year's events).
+# Team codes are kept as scraped and matched to this season's codes when pivoting.
+aes_prior_season_urls = {
+    1: [
+        "https://results.advancedeventsystems.com/event/PTAwMDAwMzgzNjE90",  # 2025 NIT
+        "https://results.advancedeventsystems.com/event/PTAwMDAwMzg4NDA90",  # 2025 SNIT
+        "https://results.advancedeventsystems.com/event/PTAwMDAwMzc4OTU90",  # 2025 USAV 14-17
+        "https://results.advancedeventsystems.com/event/PTAwMDAwMzc4MjM90",  # 2025 USAV 11-13
+        "https://results.advancedeventsystems.com/event/PTAwMDAwNDAzMTI90",  # 2025 AAU Wave 4
+        "https://results.advancedeventsystems.com/event/PTAwMDAwNDAzMTE90",  # 2025 AAU Wave 3
+        "https://results.advancedeventsystems.com/event/PTAwMDAwNDAzMTA90",  # 2025 AAU Wave 2
+        "https://results.advancedeventsystems.com/event/PTAwMDAwNDAzMDk90",  # 2025 AAU Wave 1
+        # Add more event IDs here
+    ],
+}
 
 # Sportwrench Event URLs
 sw_event_urls = [
@@ -63,14 +81,45 @@ jotforms_csv_path = "Power Pool Scraping/NIT_jotforms.csv"
 # Path to CSV file with team code conversions for teams that changed codes
 team_code_conversions_path = "Power Pool Scraping/team_code_conversions.csv"
 jacker_filter = True  # Set to True if you want to filter only by teams in the CSV file
+# Path to the raw (non-pivoted) standings written by the previous run
+raw_data_path = "Power Pool Scraping/data/raw_nonpivoted_data.csv"
+# Set to True during a live weekend: only AES divisions still in progress are refetched
+# and the previous raw data is patched. SportWrench rows are reused from the previous run.
+incremental_refresh = False
+# Set to True to refetch only the NIT-list teams' AES standings rows (tIds filter) in
+# divisions already seen; other teams keep their last-seen rows
+targeted_fetch = False
+# "api" reads SportWrench standings from the esw JSON API (Selenium only for events
+# the API refuses); "selenium" always renders the event pages in Chrome
+sw_engine = "api"
+# Number of headless Chrome drivers scraping SportWrench divisions in parallel
+sw_driver_pool_size = 4
+# Event and division requests run at once across all events and both hosts
+# (each host is still capped by the adaptive limit in common.throttle)
+scheduler_workers = 16
+# Set to True to build the pivot from events already in the local results warehouse;
+# events it does not hold in full since they ended are fetched as usual
+read_warehouse = False
+# Every finished event/division task is appended here; run with --resume to skip them
+checkpoint_path = "Power Pool Scraping/data/run_checkpoint.jsonl"
+# Per-endpoint fetch metrics of the run are written here (.json and .md)
+fetch_report_path = "Power Pool Scraping/data/fetch_report"
+
+parser = argparse.ArgumentParser(description="Scrape AES and SportWrench standings into the power pool pivot.")
+parser.add_argument("--resume", action="store_true",
+                    help="Skip the tasks the interrupted previous run finished and reuse their rows")
+args, _ = parser.parse_known_args()
+
+standings_store = StandingsStore()
+checkpoint = RunCheckpoint(checkpoint_path, resume=args.resume)
+if args.resume:
+    print(f"Resuming: {len(checkpoint)} finished tasks in {checkpoint_path}")
 
 # Load team code conversions
 team_code_mapping = {}
 try:
-    conversions_df = pd.read_csv(team_code_conversions_path)
-    # Create a mapping from LastCode to CurrentCode (all lowercase)
-    team_code_mapping = dict(zip(conversions_df['LastCode'].str.lower(), 
-                                 conversions_df['CurrentCode'].str.lower()))
+    # Mapping from LastCode to CurrentCode (all lowercase)
+    team_code_mapping = load_team_code_conversions(team_code_conversions_path)
     print(f"Loaded {len(team_code_mapping)} team code conversions from {team_code_conversions_path}")
 except FileNotFoundError:
     print(f"Team code conversions CSV not found: {team_code_conversions_path}. Proceeding without conversions.")
@@ -78,69 +127,130 @@ except Exception as e:
     print(f"Error reading team code conversions CSV: {e}. Proceeding without conversions.")
 
 
-# Function to increment TeamCode or use conversion mapping
-def increment_team_code(team_code):
-    import re
-    # First check if this team code has a conversion mapping
-    team_code_lower = team_code.lower()
-    if team_code_lower in team_code_mapping:
-        return team_code_mapping[team_code_lower]
-    
-    # Otherwise, use the default increment logic
-    match = re.search(r"g(\d+)(.+)", team_code)
-    if match:
-        number = int(match.group(1)) + 1  # Increment the numeric portion
-        return f"g{number}{match.group(2)}"
-    return team_code  # Return the original if no match
+AES_HOST = urlsplit(AES_BASE_URL).netloc
+ESW_HOST = urlsplit(ESW_BASE_URL).netloc
 
 
-# Function to fetch and process event data
-def process_aes_event(url, increment_code=False):
+def aes_event_task(scheduler, url, season_offset, event_index):
+    """
+    Fetches an AES event's details and queues a task per division, largest first.
 
-    match = re.search(r'/event/([^/]+)$', url)
-    event_id = match.group(1) if match else None
+    Args:
+        scheduler (WorkScheduler): Scheduler the division tasks are queued on.
+        url (str): The AES event URL.
+        season_offset (int): Seasons back from the current one (0 = this season).
+        event_index (int): Position of the event in the run, for ordering rows.
+    """
+    event_id = event_id_from_url(url)
 
     print(f"Processing event ID: {event_id}")
 
-    # Define the base API endpoint for the event
-    base_url = f"https://results.advancedeventsystems.com/api/event/{event_id}"
-    response = requests.get(base_url)
-    if response.status_code != 200:
+    client = AESClient(event_id)
+    try:
+        event_data = client.event()
+    except AESRequestError as e:
         print(f"Failed to fetch event details for event ID: {
-              event_id}. Status code: {response.status_code}")
-        return pd.DataFrame()
+              event_id}. Status code: {e.status_code}")
+        return None
 
-    event_data = response.json()
     event_name = event_data.get("Name", f"Event_{event_id}")
     print(f"Processing {event_name}")
+    warehouse_key = record_aes_event(get_warehouse(), event_id, event_data, {})
+
+    divisions = event_data.get("Divisions", [])
+    pending = [
+        (division_index, division) for division_index, division in enumerate(divisions)
+        if not checkpoint.done(("aes", url, division["DivisionId"]))
+    ]
+    # Divisions restored from a checkpoint were fetched by an earlier run, so
+    # only a run that fetches every division completes the stored event
+    tracker = None
+    if len(pending) == len(divisions):
+        tracker = IngestTracker(get_warehouse(), warehouse_key, STANDINGS, len(divisions))
+    for division_index, division in pending:
+        scheduler.submit(
+            AES_HOST, aes_division_task, client, event_data, division["DivisionId"], season_offset,
+            ("aes", url, division["DivisionId"]), division_index, tracker,
+            priority=division.get("TeamCount") or 0,
+            key=("aes", event_index, division_index, division["DivisionId"]))
+    checkpoint.record(("aes", url, -1), children=[("aes", url, division["DivisionId"]) for division in divisions])
+    return None
+
+
+def aes_division_task(client, event_data, division_id, season_offset, checkpoint_key, position, tracker=None):
+    """
+    Standings rows of one AES division (finished divisions come from the store when incremental).
+
+    The rows are checkpointed under ``checkpoint_key`` (which names the division
+    by ID, so a resumed run is not thrown off by a changed division list) with
+    the division's ``position`` in the event, and reported to the event's
+    ``tracker`` (IngestTracker), if any.
 
-    # Get all division IDs for this event
-    division_ids = [division["DivisionId"]
-                    for division in event_data.get("Divisions", [])]
-
-    # Fetch standings for each division
-    teams = []
-    for division_id in division_ids:
-        standings_url = f"https://results.advancedeventsystems.com/odata/{event_id}/standings(dId={
-            division_id},cId=null,tIds=[])?$orderby=OverallRank,FinishRank,TeamName,TeamCode"
-        response = requests.get(standings_url)
-        if response.status_code == 200:
-            standings_data = response.json()
-            teams.extend([
-                {
-                    "TeamName": team["TeamName"],
-                    "TeamCode": increment_team_code(team["TeamCode"]) if increment_code else team["TeamCode"],
-                    "OriginalTeamCode": team["TeamCode"],
-                    "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
-                    "DivisionName": team["Division"]["Name"],
-                    "EventName": event_name,
-                }
-                for team in standings_data.get("value", [])
-            ])
-        else:
-            print(f"Failed to fetch standings for division ID: {
-                  division_id}. Status code: {response.status_code}")
-    return pd.DataFrame(teams)
+    Returns:
+        pd.DataFrame: TeamName, TeamCode, SeasonOffset, FinishRank,
+            DivisionName and EventName, or None if the division failed.
+    """
+    event_name = event_data.get("Name", f"Event_{client.event_id}")
+    standings, changed = standings_store.refresh_division(
+        client, division_id,
+        event_final=has_ended(event_data.get("EndDate")),
+        incremental=incremental_refresh,
+        team_codes=tracked_team_codes if season_offset == 0 else None)
+    if standings is None:
+        if tracker is not None:
+            tracker.division_done(ok=False)
+        return None
+    if incremental_refresh and changed:
+        print(f"Division {division_id} changed in {event_name}")
+    record_aes_event(get_warehouse(), client.event_id, event_data, {division_id: standings})
+    if tracker is not None:
+        tracker.division_done()
+
+    division_df = pd.DataFrame([
+        {
+            "TeamName": team["TeamName"],
+            "TeamCode": team["TeamCode"],
+            "SeasonOffset": season_offset,
+            "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
+            "DivisionName": team["Division"]["Name"],
+            "EventName": event_name,
+        }
+        for team in standings
+    ])
+    checkpoint.record(checkpoint_key, division_df, position=position)
+    return division_df
+
+
+def load_warehouse_event(source, event_id, season_offset=0):
+    """
+    Rebuilds an event's standings rows from the local results warehouse.
+
+    Args:
+        source (str): Warehouse source of the event (AES_SOURCE or ESW_SOURCE).
+        event_id (str): The event ID at that source.
+        season_offset (int): Seasons back from the current one (0 = this season).
+
+    Returns:
+        pd.DataFrame: Rows shaped like ``aes_division_task`` output, empty if
+            the warehouse does not hold every division of the event as
+            fetched after it ended (such an event is fetched again).
+    """
+    key = event_key(source, event_id)
+    if not get_warehouse().has_final(key, STANDINGS):
+        return pd.DataFrame()
+    standings = get_warehouse().standings([key])
+    if standings.empty:
+        return standings
+    print(f"Loaded {len(standings)} standings rows for {standings['EventName'].iloc[0]} from the warehouse")
+    finish = standings["FinishRank"].map(lambda rank: "None" if pd.isna(rank) else str(int(rank)))
+    return pd.DataFrame({
+        "TeamName": standings["TeamName"],
+        "TeamCode": standings["TeamCode"],
+        "SeasonOffset": season_offset,
+        "FinishRank": finish + " (" + standings["DivisionName"] + ")",
+        "DivisionName": standings["DivisionName"],
+        "EventName": standings["EventName"],
+    })
 
 
 def pull_jacker_teams(csv_file_path):
@@ -159,7 +269,7 @@ def pull_jacker_teams(csv_file_path):
         df = pd.read_csv(csv_file_path)
 
         # Convert TeamCode to lowercase
-        df["Team Code"] = df["Team Code"].str.lower()
+        df["Team Code"] = normalize_team_codes(df["Team Code"])
 
         # Rename the columns to TeamCode and TeamName for consistency
         df.rename(columns={"Team Code": "TeamCode",
@@ -181,39 +291,40 @@ def pull_jacker_teams(csv_file_path):
         return None
 
 
-# Process first list of event IDs
-for url in aes_urls:
-    combined_aes_sw_all_data = pd.concat(
-        [combined_aes_sw_all_data, process_aes_event(url)], ignore_index=True)
-
-# Process second list of event IDs with TeamCode increment
-for url in aes_prev_year_urls:
-    combined_aes_sw_all_data = pd.concat([combined_aes_sw_all_data, process_aes_event(
-        url, increment_code=True)], ignore_index=True)
+# Team codes the targeted fetch resolves to AES team IDs
+tracked_team_codes = None
+if targeted_fetch:
+    tracked_teams = pull_jacker_teams(nit_csv_path)
+    if tracked_teams is not None:
+        tracked_team_codes = set(tracked_teams["TeamCode"].dropna())
+
+# Start from the previous run's rows when refreshing incrementally
+patch_previous_run = incremental_refresh and Path(raw_data_path).exists()
+if patch_previous_run:
+    combined_aes_sw_all_data = pd.read_csv(raw_data_path)
+    if "OriginalTeamCode" in combined_aes_sw_all_data.columns:
+        # Written before rows kept their scraped codes; prior-season codes in it are already incremented
+        print(f"{raw_data_path} has incremented team codes. Running a full refresh instead.")
+        combined_aes_sw_all_data = pd.DataFrame()
+        patch_previous_run = False
+    else:
+        print(f"Patching {len(combined_aes_sw_all_data)} rows from {raw_data_path}")
 
 
 # Start Sportwrench results scraping
-def extract_division_ids_and_names(url):
+def extract_division_ids_and_names(driver, url):
     """
     Uses Selenium to find all division links and extract the division IDs and their names.
 
     Args:
+        driver (WebDriver): Chrome driver borrowed from the DriverPool.
         url (str): The URL of the SportWrench event divisions page.
 
     Returns:
         list: A list of dictionaries containing division IDs and their names.
     """
-    chrome_options = Options()
-    chrome_options.add_argument("--enable-javascript")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--enable-unsafe-swiftshader")
-
-    service = Service(r"C:\Git Repos\chromedriver-win64\chromedriver.exe")
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-
     try:
-        driver.get(url)
+        load_page(driver, url)
         wait = WebDriverWait(driver, 20)
         wait.until(EC.presence_of_all_elements_located(
             (By.CSS_SELECTOR, "a[href*='/divisions/']")))
@@ -233,15 +344,14 @@ def extract_division_ids_and_names(url):
     except Exception as e:
         print(f"An error occurred while extracting divisions: {e}")
         return []
-    finally:
-        driver.quit()
 
 
-def extract_standings(event_id, division_id, division_name, event_name):
+def extract_standings(driver, event_id, division_id, division_name, event_name):
     """
     Extracts the standings (rank, team name, and code) for a given division ID.
 
     Args:
+        driver (WebDriver): Chrome driver borrowed from the DriverPool.
         event_id (str): The event ID.
         division_id (str): The division ID.
         division_name (str): The name of the division.
@@ -250,34 +360,24 @@ def extract_standings(event_id, division_id, division_name, event_name):
     Returns:
         list: A list of dictionaries containing rank, team name, code, division ID, division name, and event name.
     """
-    chrome_options = Options()
-    chrome_options.add_argument("--enable-javascript")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--enable-unsafe-swiftshader")
-
-    service = Service(r"C:\Git Repos\chromedriver-win64\chromedriver.exe")
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-
     try:
         standings_url = f"https://events.sportwrench.com/#/events/{
             event_id}/divisions/{division_id}/standings"
-        driver.get(standings_url)
+        load_page(driver, standings_url)
 
         wait = WebDriverWait(driver, 20)
         wait.until(EC.presence_of_all_elements_located(
             (By.CSS_SELECTOR, ".standings-team-name")))
 
-        rows = driver.find_elements(By.CSS_SELECTOR, "table tr")[
-            1:]  # Skip the header row
+        # One round trip for the whole table instead of one per cell
+        rows = read_table_cells(driver)[1:]  # Skip the header row
 
         standings = []
-        for row in rows:
-            cells = row.find_elements(By.TAG_NAME, "td")
+        for cells in rows:
             if len(cells) >= 3:  # Ensure there are enough cells
-                finish = f"{cells[0].text.strip()} ({division_name})"
-                team_name = cells[1].text.strip()
-                code = cells[-2].text.strip().lower()
+                finish = f"{cells[0]} ({division_name})"
+                team_name = cells[1]
+                code = cells[-2].lower()
                 standings.append({
                     "Finish": finish,
                     "Team Name": team_name,
@@ -291,31 +391,21 @@ def extract_standings(event_id, division_id, division_name, event_name):
     except Exception as e:
         print(f"An error occurred while extracting standings: {e}")
         return []
-    finally:
-        driver.quit()
 
 
-def extract_event_name(url):
+def extract_event_name(driver, url):
     """
     Extracts the event name from the event page.
 
     Args:
+        driver (WebDriver): Chrome driver borrowed from the DriverPool.
         url (str): The URL of the SportWrench event page.
 
     Returns:
         str: The name of the event.
     """
-    chrome_options = Options()
-    chrome_options.add_argument("--enable-javascript")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--enable-unsafe-swiftshader")
-
-    service = Service(r"C:\Git Repos\chromedriver-win64\chromedriver.exe")
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-
     try:
-        driver.get(url)
+        load_page(driver, url)
         wait = WebDriverWait(driver, 20)
         wait.until(EC.presence_of_element_located(
             (By.CLASS_NAME, "esw_title")))
@@ -326,95 +416,317 @@ def extract_event_name(url):
     except Exception as e:
         print(f"An error occurred while extracting the event name: {e}")
         return "Unknown Event"
-    finally:
-        driver.quit()
 
 
-def process_sw_events(urls):
+def scrape_sw_events_selenium(urls, division_jobs=()):
     """
-    Processes multiple event URLs to extract standings and combine them based on team codes.
+    Renders the SportWrench event pages in Chrome and reads their standings tables.
 
     Args:
         urls (list): A list of event URLs.
+        division_jobs (list): Extra (event ID, division ID, division name,
+            event name) divisions to scrape, e.g. ones the esw API refused.
 
     Returns:
-        None
+        list: Standings rows (Finish, Team Name, Code, Division ID, Division Name, Event Name).
     """
     all_data = []  # List to hold all standings data from all events
 
-    for url in urls:
-        event_name = extract_event_name(url)
+    def load_event(driver, url):
+        event_name = extract_event_name(driver, url)
         print(f"Processing Event: {event_name}")
 
         divisions_url = f"{url.rstrip('/')}/divisions"
         print(f"Fetching divisions from: {divisions_url}")
-
-        divisions = extract_division_ids_and_names(divisions_url)
-        if not divisions:
-            print(f"No divisions found for event: {event_name}")
-            continue
-
-        match = re.search(r"events/([a-z0-9]+)", url)
-        if not match:
-            print(f"Invalid event URL format for {
-                  url}. Unable to extract event ID.")
-            continue
-        event_id = match.group(1)
-
-        for division in divisions:
-            division_id = division["Division ID"]
-            division_name = division["Division Name"]
-            print(f"Fetching standings for division: {
-                  division_name} (ID: {division_id}) in event {event_name}")
-            standings = extract_standings(
-                event_id, division_id, division_name, event_name)
+        return event_name, extract_division_ids_and_names(driver, divisions_url)
+
+    def load_standings(driver, job):
+        event_id, division_id, division_name, event_name = job
+        print(f"Fetching standings for division: {
+              division_name} (ID: {division_id}) in event {event_name}")
+        return extract_standings(
+            driver, event_id, division_id, division_name, event_name)
+
+    with DriverPool(size=sw_driver_pool_size) as pool:
+        division_jobs = list(division_jobs)
+        for url, (event_name, divisions) in zip(urls, pool.map(load_event, urls, default=("Unknown Event", []))):
+            if not divisions:
+                print(f"No divisions found for event: {event_name}")
+                continue
+
+            match = re.search(r"events/([a-z0-9]+)", url)
+            if not match:
+                print(f"Invalid event URL format for {
+                      url}. Unable to extract event ID.")
+                continue
+            event_id = match.group(1)
+
+            for division in divisions:
+                division_jobs.append(
+                    (event_id, division["Division ID"], division["Division Name"], event_name))
+
+        # Every division of every event shares the same warm drivers
+        for job, standings in zip(division_jobs, pool.map(load_standings, division_jobs, default=[])):
             if standings:
                 all_data.extend(standings)
             else:
                 print(f"No standings found for Division {
-                      division_name} (ID: {division_id}) in event {event_name}")
+                      job[2]} (ID: {job[1]}) in event {job[3]}")
+
+    return all_data
+
+
+def sw_standings_frame(rows):
+    """Standings rows in the ``extract_standings`` shape, renamed to the combined columns."""
+    return pd.DataFrame(rows).rename(columns={
+        "Code": "TeamCode",
+        "Finish": "FinishRank",
+        "Event Name": "EventName",
+        "Team Name": "TeamName",
+        "Division Name": "DivisionName",
+    })
+
+
+def sw_event_task(scheduler, url, event_index):
+    """
+    Reads a SportWrench event from the esw JSON API and queues a task per division, largest first.
+
+    Events the API refuses are left for Selenium (``selenium_urls``).
 
-    # Combine all standings into a DataFrame
-    df = pd.DataFrame(all_data)
-    if df.empty:
-        print("No standings data collected across events.")
-        return
+    Args:
+        scheduler (WorkScheduler): Scheduler the division tasks are queued on.
+        url (str): The SportWrench event URL.
+        event_index (int): Position of the event in the run, for ordering rows.
+    """
+    client = ESWClient.from_url(url)
+    try:
+        event_data = client.event()
+        divisions = client.divisions()
+    except ESWRequestError as e:
+        print(f"{e}. Falling back to Selenium for {url}")
+        selenium_urls.append((event_index, url))
+        checkpoint.record(("esw", url, -1), selenium_url=[event_index, url])
+        return None
+    event_name = event_data.get("long_name")
+    print(f"Processing Event: {event_name}")
+
+    if not divisions:
+        print(f"No divisions found for event: {event_name}")
+        checkpoint.record(("esw", url, -1))
+        return None
+
+    warehouse_key = get_warehouse().record_event(
+        ESW_SOURCE, client.event_id, event_name, event_data.get("date_start"), event_data.get("date_end"))
+    pending = [
+        (division_index, division) for division_index, division in enumerate(divisions)
+        if not checkpoint.done(("esw", url, division["division_id"]))
+    ]
+    tracker = None
+    if len(pending) == len(divisions):
+        tracker = IngestTracker(get_warehouse(), warehouse_key, STANDINGS, len(divisions))
+    for division_index, division in pending:
+        scheduler.submit(
+            ESW_HOST, sw_division_task, client, warehouse_key, event_name, division,
+            ("esw", url, division["division_id"]), division_index, tracker,
+            priority=division.get("teams_count") or 0,
+            key=("esw", event_index, division_index, division["division_id"]))
+    checkpoint.record(("esw", url, -1), children=[("esw", url, division["division_id"]) for division in divisions])
+    return None
+
+
+def sw_division_task(client, warehouse_key, event_name, division, checkpoint_key, position, tracker=None):
+    """
+    Standings rows of one SportWrench division from the esw JSON API.
 
-    df.rename(columns={'Code': 'TeamCode'}, inplace=True)
-    df.rename(columns={'Finish': 'FinishRank'}, inplace=True)
-    df.rename(columns={'Event Name': 'EventName'}, inplace=True)
-    df.rename(columns={'Team Name': 'TeamName'}, inplace=True)
-    df.rename(columns={'Division Name': 'DivisionName'}, inplace=True)
-    df.drop(columns=["Division ID"])
-    df.drop(columns=["TeamName"])
+    A division the API refuses, or whose payload carries no division finish
+    (see ``division_finish_ranks``), is left for Selenium (``selenium_division_jobs``).
+    Either outcome is checkpointed under ``checkpoint_key`` (with the division's
+    ``position`` in the event) and reported to the
+    event's ``tracker`` (IngestTracker), if any; Selenium rows are not stored.
 
-    # return pivoted_df
-    return df
+    Returns:
+        pd.DataFrame: Rows in the combined columns, or None if left for Selenium.
+    """
+    division_id = division["division_id"]
+    division_name = division.get("name")
+    try:
+        standings_data = client.standings(division_id)
+    except ESWRequestError as e:
+        print(f"{e}. Falling back to Selenium for division {division_name}")
+        selenium_division_jobs.append((client.event_id, division_id, division_name, event_name))
+        checkpoint.record(checkpoint_key, position=position,
+                          selenium_job=[client.event_id, division_id, division_name, event_name])
+        if tracker is not None:
+            tracker.division_done(ok=False)
+        return None
 
+    ranked_teams = division_finish_ranks(standings_data)
+    if ranked_teams is None:
+        # Blank or per-pool finishes would be merged as division results
+        print(f"No division finish in esw standings for Division {
+              division_name} (ID: {division_id}). Falling back to Selenium")
+        selenium_division_jobs.append((client.event_id, division_id, division_name, event_name))
+        checkpoint.record(checkpoint_key, position=position,
+                          selenium_job=[client.event_id, division_id, division_name, event_name])
+        if tracker is not None:
+            tracker.division_done(ok=False)
+        return None
+    if not ranked_teams:
+        print(f"No standings found for Division {
+              division_name} (ID: {division_id}) in event {event_name}")
+    standings = []
+    warehouse_rows = []
+    for team, rank in ranked_teams:
+        standings.append({
+            "Finish": f"{rank} ({division_name})",
+            "Team Name": team.get("team_name"),
+            "Code": (team.get("organization_code") or "").lower(),
+            "Division ID": division_id,
+            "Division Name": division_name,
+            "Event Name": event_name
+        })
+        warehouse_rows.append({
+            "DivisionId": division_id,
+            "DivisionName": division_name,
+            "TeamId": team.get("team_id"),
+            "TeamCode": team.get("organization_code"),
+            "TeamName": team.get("team_name"),
+            "FinishRank": rank,
+        })
+
+    get_warehouse().record_standings(warehouse_key, warehouse_rows)
+    if tracker is not None:
+        tracker.division_done()
+    division_df = sw_standings_frame(standings)
+    checkpoint.record(checkpoint_key, division_df, position=position)
+    return division_df
+
+
+def load_warehouse_sw_event(url):
+    """SportWrench rows of an event stored in full after it ended, or None if the warehouse does not hold it so."""
+    key = event_key(ESW_SOURCE, esw_event_id_from_url(url))
+    if not get_warehouse().has_final(key, STANDINGS):
+        return None
+    stored = get_warehouse().standings([key])
+    if stored.empty:
+        return None
+    print(f"Loaded {len(stored)} standings rows for {stored['EventName'].iloc[0]} from the warehouse")
+    return sw_standings_frame([{
+        "Finish": f"{'' if pd.isna(row.FinishRank) else int(row.FinishRank)} ({row.DivisionName})",
+        "Team Name": row.TeamName,
+        "Code": row.TeamCode,
+        "Division ID": row.DivisionId,
+        "Division Name": row.DivisionName,
+        "Event Name": row.EventName,
+    } for row in stored.itertuples()])
+
+
+# Every event of every season and host goes into one scheduler: event tasks queue
+# their divisions, AES and SportWrench requests run side by side, and divisions
+# are merged as they finish instead of one event after another
+scheduler = WorkScheduler(max_workers=scheduler_workers)
+# (event index, division index, division ID) -> rows; a division index of -1 marks a
+# whole event read from the warehouse
+aes_frames = {}
+sw_frames = {}
+# Filled in by the SportWrench tasks when the esw API refuses an event or a division
+selenium_urls = []
+selenium_division_jobs = []
+
+
+def restore_checkpointed(source, url, event_index, frames):
+    """
+    Puts an event's checkpointed division rows into ``frames``.
 
-# Scrape Sportwrench data
-sportwrench_data = process_sw_events(sw_event_urls)
+    Returns:
+        bool: True if the event and all its divisions finished already, so
+            nothing of it needs to be fetched again.
+    """
+    for key, info in checkpoint.items():
+        if key[:2] != (source, url):
+            continue
+        division_df = checkpoint.frame(key)
+        if division_df is not None:
+            frames[(event_index, info.get("position", -1), key[2])] = division_df
+        # Work the interrupted run had left for Selenium
+        if "selenium_url" in info:
+            selenium_urls.append(tuple(info["selenium_url"]))
+        if "selenium_job" in info:
+            selenium_division_jobs.append(tuple(info["selenium_job"]))
+    return checkpoint.is_complete((source, url, -1))
+
+
+aes_events = [(url, 0) for url in aes_urls] + [
+    (url, season_offset) for season_offset, season_urls in aes_prior_season_urls.items() for url in season_urls
+]
+for event_index, (url, season_offset) in enumerate(aes_events):
+    if read_warehouse:
+        event_df = load_warehouse_event(AES_SOURCE, event_id_from_url(url), season_offset)
+        if not event_df.empty:
+            aes_frames[(event_index, -1, None)] = event_df
+            continue
+    if restore_checkpointed("aes", url, event_index, aes_frames):
+        continue
+    scheduler.submit(AES_HOST, aes_event_task, scheduler, url, season_offset, event_index,
+                     priority=EVENT_PRIORITY, key=("aes", event_index, -1, None))
+
+# Scrape Sportwrench data (already part of the previous rows when patching)
+if not patch_previous_run:
+    for event_index, url in enumerate(sw_event_urls):
+        if read_warehouse:
+            event_df = load_warehouse_sw_event(url)
+            if event_df is not None:
+                sw_frames[(event_index, -1, None)] = event_df
+                continue
+        if restore_checkpointed("esw", url, event_index, sw_frames):
+            continue
+        if sw_engine != "api":
+            selenium_urls.append((event_index, url))
+            continue
+        scheduler.submit(ESW_HOST, sw_event_task, scheduler, url, event_index,
+                         priority=EVENT_PRIORITY, key=("esw", event_index, -1, None))
+
+for (source, event_index, division_index, division_id), division_df in scheduler.run():
+    if division_df is not None:
+        (aes_frames if source == "aes" else sw_frames)[(event_index, division_index, division_id)] = division_df
+
+# Selenium batches the interrupted run already scraped, and the events/divisions they covered
+selenium_batches = [key for key, _ in checkpoint.items() if key[:2] == ("esw", "selenium")]
+covered_urls = set()
+covered_jobs = set()
+for key in selenium_batches:
+    sw_frames[(len(sw_event_urls), key[2], None)] = checkpoint.frame(key)
+    covered_urls.update(checkpoint.info(key)["urls"])
+    covered_jobs.update(tuple(job) for job in checkpoint.info(key)["jobs"])
+pending_selenium_urls = [url for _, url in sorted(set(selenium_urls)) if url not in covered_urls]
+pending_selenium_jobs = sorted((job for job in set(selenium_division_jobs) if job not in covered_jobs), key=str)
+if pending_selenium_urls or pending_selenium_jobs:
+    batch_key = ("esw", "selenium", len(selenium_batches))
+    sw_frames[(len(sw_event_urls), batch_key[2], None)] = sw_standings_frame(
+        scrape_sw_events_selenium(pending_selenium_urls, pending_selenium_jobs))
+    checkpoint.record(batch_key, sw_frames[(len(sw_event_urls), batch_key[2], None)],
+                      urls=pending_selenium_urls, jobs=pending_selenium_jobs)
+
+# Rows are put back in configuration order, so the output does not depend on
+# which division happened to finish first
+if aes_frames:
+    combined_aes_sw_all_data = patch_rows(
+        combined_aes_sw_all_data,
+        pd.concat([aes_frames[key] for key in sorted(aes_frames)], ignore_index=True),
+        keys=["EventName"])
+if sw_frames:
+    sportwrench_data = pd.concat([sw_frames[key] for key in sorted(sw_frames)], ignore_index=True)
+elif not patch_previous_run:
+    print("No standings data collected across events.")
 
 # Combine Sportwrench and AES data
 combined_aes_sw_all_data = pd.concat(
     [combined_aes_sw_all_data, sportwrench_data], ignore_index=True)
-combined_aes_sw_all_data.to_csv("Power Pool Scraping/data/raw_nonpivoted_data.csv", index=False)
-
-# Pivot the data to group by TeamCode and include columns for each event Name
-pivot_data = combined_aes_sw_all_data.pivot_table(
-    index="TeamCode",
-    columns="EventName",
-    values="FinishRank",
-    aggfunc="first"
-).reset_index()
-
-# Pull list of team names from events
-team_names = combined_aes_sw_all_data.groupby("OriginalTeamCode")[
-    "TeamName"].first().reset_index()
-team_names.rename(columns={'OriginalTeamCode': 'TeamCode'}, inplace=True)
-
-# Add TeamName from scraped data without dropping teams missing a name
-pivot_data = pd.merge(pivot_data, team_names, on="TeamCode", how="left")
+combined_aes_sw_all_data.to_csv(raw_data_path, index=False)
+
+# One row per team across all seasons (keyed by this season's normalized code, so
+# AES, SportWrench and CSV codes line up) with a column for each event Name
+pivot_data = season_pivot(combined_aes_sw_all_data, team_code_mapping)
 pivot_data.to_csv(
     "Power Pool Scraping/data/nonfiltered_all_event_standings.csv", index=False)
 
@@ -436,7 +748,7 @@ if jacker_filter == True:
 # Load and merge jotform status data
 try:
     jotforms_df = pd.read_csv(jotforms_csv_path)
-    jotforms_df["Team Code"] = jotforms_df["Team Code"].str.lower()
+    jotforms_df["Team Code"] = normalize_team_codes(jotforms_df["Team Code"])
     jotforms_df.rename(columns={"Team Code": "TeamCode"}, inplace=True)
 
     # Keep only TeamCode and Power Pool Jotform columns
@@ -469,4 +781,5 @@ pivot_data = pivot_data[column_order]
 csv_file_path = "Power Pool Scraping/data/combined_years_all_event_standings.csv"
 pivot_data.to_csv(csv_file_path, index=False)
 
-print(f"Consolidated standings saved to {csv_file_path}")
\ No newline at end of file
+print(f"Consolidated standings saved to {csv_file_path}")
+write_report(fetch_report_path)
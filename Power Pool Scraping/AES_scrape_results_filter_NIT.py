@@ -1,6 +1,11 @@
-import requests
+import sys
+from pathlib import Path
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.aes_client import AESClient, AESRequestError
+from common.team_codes import increment_team_code, normalize_team_codes
+
 # First list of event IDs to process normally - current year's events
 event_ids = [
     "PTAwMDAwMzY3NDY90", # Central Zone
@@ -32,27 +37,17 @@ jacker_teams = pd.DataFrame()
 nit_csv_path = "NIT_team_codes.csv"  # Path to CSV file with NIT team codes
 jacker_filter = True # Set to True if you want to filter only by teams in the CSV file
 
-# Function to increment TeamCode
-def increment_team_code(team_code):
-    import re
-    match = re.search(r"g(\d+)(.+)", team_code)
-    if match:
-        number = int(match.group(1)) + 1  # Increment the numeric portion
-        return f"g{number}{match.group(2)}"
-    return team_code  # Return the original if no match
-
 # Function to fetch and process event data
 def process_event(event_id, increment_code=False):
     print(f"Processing event ID: {event_id}")
     
-    # Define the base API endpoint for the event
-    base_url = f"https://results.advancedeventsystems.com/api/event/{event_id}"
-    response = requests.get(base_url)
-    if response.status_code != 200:
-        print(f"Failed to fetch event details for event ID: {event_id}. Status code: {response.status_code}")
+    client = AESClient(event_id)
+    try:
+        event_data = client.event()
+    except AESRequestError as e:
+        print(f"Failed to fetch event details for event ID: {event_id}. Status code: {e.status_code}")
         return pd.DataFrame()
     
-    event_data = response.json()
     event_name = event_data.get("Name", f"Event_{event_id}")
     print(f"Processing {event_name}")
     
@@ -62,23 +57,22 @@ def process_event(event_id, increment_code=False):
     # Fetch standings for each division
     teams = []
     for division_id in division_ids:
-        standings_url = f"https://results.advancedeventsystems.com/odata/{event_id}/standings(dId={division_id},cId=null,tIds=[])?$orderby=OverallRank,FinishRank,TeamName,TeamCode"
-        response = requests.get(standings_url)
-        if response.status_code == 200:
-            standings_data = response.json()
-            teams.extend([
-                {
-                    "TeamName": team["TeamName"],
-                    "TeamCode": increment_team_code(team["TeamCode"]) if increment_code else team["TeamCode"],
-                    "OriginalTeamCode": team["TeamCode"],
-                    "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
-                    "DivisionName": team["Division"]["Name"],
-                    "EventName": event_name,
-                }
-                for team in standings_data.get("value", [])
-            ])
-        else:
-            print(f"Failed to fetch standings for division ID: {division_id}. Status code: {response.status_code}")
+        try:
+            standings = client.standings(division_id)
+        except AESRequestError as e:
+            print(f"Failed to fetch standings for division ID: {division_id}. Status code: {e.status_code}")
+            continue
+        teams.extend([
+            {
+                "TeamName": team["TeamName"],
+                "TeamCode": increment_team_code(team["TeamCode"]) if increment_code else team["TeamCode"],
+                "OriginalTeamCode": team["TeamCode"],
+                "FinishRank": f"{team['FinishRank']} ({team['Division']['Name']})",
+                "DivisionName": team["Division"]["Name"],
+                "EventName": event_name,
+            }
+            for team in standings
+        ])
     return pd.DataFrame(teams)
 
 def pull_jacker_teams(csv_file_path):
@@ -97,7 +91,7 @@ def pull_jacker_teams(csv_file_path):
         df = pd.read_csv(csv_file_path)
         
         # Convert TeamCode to lowercase
-        df["Team Code"] = df["Team Code"].str.lower()
+        df["Team Code"] = normalize_team_codes(df["Team Code"])
         
         # Rename the column to TeamCode for consistency
         df.rename(columns={"Team Code": "TeamCode"}, inplace=True)
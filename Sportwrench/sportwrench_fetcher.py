@@ -1,7 +1,15 @@
+import json
+import sys
+from pathlib import Path
 from scrapling import StealthyFetcher
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.http_cache import HttpCache
+from common.resilience import fetch_page
+
 fetcher = StealthyFetcher(auto_match=False)
+cache = HttpCache()
 sportwrench_data = pd.DataFrame()
 
 # Sportwrench Event URLs
@@ -16,35 +24,47 @@ sw_event_urls = [
 ]
 
 
+def fetch_json(url, cache_scope):
+    """Returns (status, parsed JSON) for an esw API URL, using the disk cache when fresh."""
+    cached = cache.load("GET", url)
+    if cached is not None:
+        return 200, json.loads(cached)
+
+    page = fetch_page(fetcher, url)
+    if page.status != 200:
+        return page.status, None
+    content = page.json()
+    cache.store("GET", url, json.dumps(content), scope=cache_scope)
+    return 200, content
+
+
 def process_event(url):
     event_id = url.rsplit("/", 1)[-1]
     
     # Define the base API endpoint for the event 
     base_url = f"https://events.sportwrench.com/api/esw/{event_id}"
+    cache_scope = f"esw:{event_id}"
     
-    page = fetcher.fetch(base_url)
-    if (page.status != 200):
+    status, content = fetch_json(base_url, cache_scope)
+    if (status != 200):
         print(f"Failed to fetch event details for event ID: {
-              event_id}. Status code: {page.status}")
+              event_id}. Status code: {status}")
         return pd.DataFrame()
     
-    content = page.json()
+    cache.record_event_end(cache_scope, content.get('date_end'))
     event_name = content.get('long_name')
     print(f"Processing {event_name} / ID: {event_id}")
     
     #Get all divisions and IDs for event
     division_url = f"https://events.sportwrench.com/api/esw/{event_id}/divisions"
-    div_page = fetcher.fetch(division_url)
-    if (div_page.status == 200):
-        division_content = div_page.json()
+    status, division_content = fetch_json(division_url, cache_scope)
+    if (status == 200):
         division_ids = [division["division_id"] for division in division_content]
         
         for division_id in division_ids:
             standings_url =f"https://events.sportwrench.com/api/esw/{event_id}/divisions/{division_id}/standings"
-            standings_page = fetcher.fetch(standings_url)
-            if (standings_page.status == 200):
-                standings_content = standings_page.json()
-                
+            status, standings_content = fetch_json(standings_url, cache_scope)
+            if (status == 200):
                 # Extract data into a list
                 teams_list = []
                 for division, teams in standings_content["teams"].items():
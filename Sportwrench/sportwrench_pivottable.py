@@ -1,37 +1,32 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import re
+import sys
+from pathlib import Path
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.driver_pool import DriverPool, load_page, read_table_cells
 
-def extract_division_ids(url):
+# Number of headless Chrome drivers scraping divisions in parallel
+driver_pool_size = 4
+
+
+def extract_division_ids(driver, url):
     """
     Uses Selenium to find all division links on the given page and extract the division IDs.
 
     Args:
+        driver (WebDriver): Chrome driver borrowed from the DriverPool.
         url (str): The URL of the SportWrench event divisions page.
 
     Returns:
         list: A list of extracted division IDs.
     """
-    # Set up Selenium WebDriver
-    chrome_options = Options()
-    chrome_options.add_argument("--enable-javascript")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--enable-unsafe-swiftshader")
-
-    # Specify the path to your ChromeDriver
-    service = Service(r"C:\Git Repos\chromedriver-win64\chromedriver.exe")
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-
     try:
         # Navigate to the URL
-        driver.get(url)
+        load_page(driver, url)
 
         # Wait for the page to load completely (adjust timeout as necessary)
         wait = WebDriverWait(driver, 20)
@@ -53,54 +48,39 @@ def extract_division_ids(url):
     except Exception as e:
         print(f"An error occurred: {e}")
         return []
-    finally:
-        # Quit the driver
-        driver.quit()
 
 
-def extract_standings(event_id, division_id):
+def extract_standings(driver, event_id, division_id):
     """
     Extracts the standings (rank and team name) for a given division ID.
 
     Args:
+        driver (WebDriver): Chrome driver borrowed from the DriverPool.
         event_id (str): The event ID.
         division_id (str): The division ID.
 
     Returns:
         list: A list of dictionaries containing rank and team name.
     """
-    # Set up Selenium WebDriver
-    chrome_options = Options()
-    chrome_options.add_argument("--enable-javascript")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--enable-unsafe-swiftshader")
-
-    # Specify the path to your ChromeDriver
-    service = Service(r"C:\Git Repos\chromedriver-win64\chromedriver.exe")
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-
     try:
         standings_url = f"https://events.sportwrench.com/#/events/{
             event_id}/divisions/{division_id}/standings"
-        driver.get(standings_url)
+        load_page(driver, standings_url)
 
         wait = WebDriverWait(driver, 20)
         wait.until(EC.presence_of_all_elements_located(
             (By.CSS_SELECTOR, ".standings-team-name")))
 
-       # Find all rows in the table (except the header row)
-        rows = driver.find_elements(By.CSS_SELECTOR, "table tr")[
-            1:]  # Skip header row
+        # One round trip for the whole table instead of one per cell
+        rows = read_table_cells(driver)[1:]  # Skip the header row
 
         standings = []
-        for row in rows:
-            cells = row.find_elements(By.TAG_NAME, "td")
+        for cells in rows:
             if len(cells) >= 3:  # Ensure there are enough cells
-                finish = cells[0].text.strip()  # First column: Finish
-                team_name = cells[1].text.strip()  # Second column: Team Name
+                finish = cells[0]  # First column: Finish
+                team_name = cells[1]  # Second column: Team Name
                 # Second to Last column: Code
-                code = cells[-2].text.strip().lower()
+                code = cells[-2].lower()
                 standings.append({
                     "Finish": finish,
                     "Team Name": team_name,
@@ -111,31 +91,21 @@ def extract_standings(event_id, division_id):
     except Exception as e:
         print(f"An error occurred while extracting standings: {e}")
         return []
-    finally:
-        driver.quit()
 
 
-def extract_event_name(url):
+def extract_event_name(driver, url):
     """
     Extracts the event name from the event page.
 
     Args:
+        driver (WebDriver): Chrome driver borrowed from the DriverPool.
         url (str): The URL of the SportWrench event page.
 
     Returns:
         str: The name of the event.
     """
-    chrome_options = Options()
-    chrome_options.add_argument("--enable-javascript")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--enable-unsafe-swiftshader")
-
-    service = Service(r"C:\Git Repos\chromedriver-win64\chromedriver.exe")
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-
     try:
-        driver.get(url)
+        load_page(driver, url)
 
         wait = WebDriverWait(driver, 20)
         wait.until(EC.presence_of_element_located(
@@ -149,8 +119,6 @@ def extract_event_name(url):
     except Exception as e:
         print(f"An error occurred while extracting the event name: {e}")
         return "Unknown Event"
-    finally:
-        driver.quit()
 
 
 def process_event(url):
@@ -163,33 +131,39 @@ def process_event(url):
     Returns:
         None
     """
-    # Extract the event name
-    event_name = extract_event_name(url)
-    print(f"Extracted Event Name: {event_name}")
+    with DriverPool(size=driver_pool_size) as pool:
+        with pool.driver() as driver:
+            # Extract the event name
+            event_name = extract_event_name(driver, url)
+            print(f"Extracted Event Name: {event_name}")
 
-    # Append '/divisions' to the event URL
-    divisions_url = f"{url.rstrip('/')}/divisions"
-    print(f"Fetching divisions from: {divisions_url}")
+            # Append '/divisions' to the event URL
+            divisions_url = f"{url.rstrip('/')}/divisions"
+            print(f"Fetching divisions from: {divisions_url}")
 
-    # Extract division IDs
-    division_ids = extract_division_ids(divisions_url)
+            # Extract division IDs
+            division_ids = extract_division_ids(driver, divisions_url)
 
-    if not division_ids:
-        print("No division IDs found.")
-        return
+        if not division_ids:
+            print("No division IDs found.")
+            return
 
-    # Extract the event ID from the URL
-    match = re.search(r"events/([a-z0-9]+)", url)
-    if not match:
-        print("Invalid event URL format. Unable to extract event ID.")
-        return
-    event_id = match.group(1)
+        # Extract the event ID from the URL
+        match = re.search(r"events/([a-z0-9]+)", url)
+        if not match:
+            print("Invalid event URL format. Unable to extract event ID.")
+            return
+        event_id = match.group(1)
+
+        def load_standings(driver, division_id):
+            print(f"Fetching standings for division ID: {division_id}")
+            return extract_standings(driver, event_id, division_id)
+
+        division_standings = pool.map(load_standings, division_ids, default=[])
 
     # Collect all standings data
     all_standings = []
-    for division_id in division_ids:
-        print(f"Fetching standings for division ID: {division_id}")
-        standings = extract_standings(event_id, division_id)
+    for division_id, standings in zip(division_ids, division_standings):
         if standings:
             # Add division ID and event name to each standing
             for standing in standings:
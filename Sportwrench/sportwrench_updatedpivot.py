@@ -1,34 +1,31 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import re
+import sys
+from pathlib import Path
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.driver_pool import DriverPool, load_page, read_table_cells
 
-def extract_division_ids_and_names(url):
+# Number of headless Chrome drivers scraping divisions in parallel
+driver_pool_size = 4
+
+
+def extract_division_ids_and_names(driver, url):
     """
     Uses Selenium to find all division links and extract the division IDs and their names.
 
     Args:
+        driver (WebDriver): Chrome driver borrowed from the DriverPool.
         url (str): The URL of the SportWrench event divisions page.
 
     Returns:
         list: A list of dictionaries containing division IDs and their names.
     """
-    chrome_options = Options()
-    chrome_options.add_argument("--enable-javascript")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--enable-unsafe-swiftshader")
-
-    service = Service(r"C:\Git Repos\chromedriver-win64\chromedriver.exe")
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-
     try:
-        driver.get(url)
+        load_page(driver, url)
         wait = WebDriverWait(driver, 20)
         wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a[href*='/divisions/']")))
 
@@ -46,15 +43,14 @@ def extract_division_ids_and_names(url):
     except Exception as e:
         print(f"An error occurred while extracting divisions: {e}")
         return []
-    finally:
-        driver.quit()
 
 
-def extract_standings(event_id, division_id, division_name, event_name):
+def extract_standings(driver, event_id, division_id, division_name, event_name):
     """
     Extracts the standings (rank, team name, and code) for a given division ID.
 
     Args:
+        driver (WebDriver): Chrome driver borrowed from the DriverPool.
         event_id (str): The event ID.
         division_id (str): The division ID.
         division_name (str): The name of the division.
@@ -63,31 +59,22 @@ def extract_standings(event_id, division_id, division_name, event_name):
     Returns:
         list: A list of dictionaries containing rank, team name, code, division ID, division name, and event name.
     """
-    chrome_options = Options()
-    chrome_options.add_argument("--enable-javascript")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--enable-unsafe-swiftshader")
-
-    service = Service(r"C:\Git Repos\chromedriver-win64\chromedriver.exe")
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-
     try:
         standings_url = f"https://events.sportwrench.com/#/events/{event_id}/divisions/{division_id}/standings"
-        driver.get(standings_url)
+        load_page(driver, standings_url)
 
         wait = WebDriverWait(driver, 20)
         wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".standings-team-name")))
 
-        rows = driver.find_elements(By.CSS_SELECTOR, "table tr")[1:]  # Skip the header row
+        # One round trip for the whole table instead of one per cell
+        rows = read_table_cells(driver)[1:]  # Skip the header row
 
         standings = []
-        for row in rows:
-            cells = row.find_elements(By.TAG_NAME, "td")
+        for cells in rows:
             if len(cells) >= 3:  # Ensure there are enough cells
-                finish = f"{cells[0].text.strip()} ({division_name})"  # Add division name in parentheses
-                team_name = cells[1].text.strip()
-                code = cells[-2].text.strip().lower()
+                finish = f"{cells[0]} ({division_name})"  # Add division name in parentheses
+                team_name = cells[1]
+                code = cells[-2].lower()
                 standings.append({
                     "Finish": finish,
                     "Team Name": team_name,
@@ -101,31 +88,21 @@ def extract_standings(event_id, division_id, division_name, event_name):
     except Exception as e:
         print(f"An error occurred while extracting standings: {e}")
         return []
-    finally:
-        driver.quit()
 
 
-def extract_event_name(url):
+def extract_event_name(driver, url):
     """
     Extracts the event name from the event page.
 
     Args:
+        driver (WebDriver): Chrome driver borrowed from the DriverPool.
         url (str): The URL of the SportWrench event page.
 
     Returns:
         str: The name of the event.
     """
-    chrome_options = Options()
-    chrome_options.add_argument("--enable-javascript")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--enable-unsafe-swiftshader")
-
-    service = Service(r"C:\Git Repos\chromedriver-win64\chromedriver.exe")
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-
     try:
-        driver.get(url)
+        load_page(driver, url)
         wait = WebDriverWait(driver, 20)
         wait.until(EC.presence_of_element_located((By.CLASS_NAME, "esw_title")))
 
@@ -134,8 +111,6 @@ def extract_event_name(url):
     except Exception as e:
         print(f"An error occurred while extracting the event name: {e}")
         return "Unknown Event"
-    finally:
-        driver.quit()
 
 
 def process_event(url):
@@ -148,33 +123,40 @@ def process_event(url):
     Returns:
         None
     """
-    event_name = extract_event_name(url)
-    print(f"Extracted Event Name: {event_name}")
+    with DriverPool(size=driver_pool_size) as pool:
+        with pool.driver() as driver:
+            event_name = extract_event_name(driver, url)
+            print(f"Extracted Event Name: {event_name}")
 
-    divisions_url = f"{url.rstrip('/')}/divisions"
-    print(f"Fetching divisions from: {divisions_url}")
+            divisions_url = f"{url.rstrip('/')}/divisions"
+            print(f"Fetching divisions from: {divisions_url}")
 
-    divisions = extract_division_ids_and_names(divisions_url)
-    if not divisions:
-        print("No divisions found.")
-        return
+            divisions = extract_division_ids_and_names(driver, divisions_url)
 
-    match = re.search(r"events/([a-z0-9]+)", url)
-    if not match:
-        print("Invalid event URL format. Unable to extract event ID.")
-        return
-    event_id = match.group(1)
+        if not divisions:
+            print("No divisions found.")
+            return
+
+        match = re.search(r"events/([a-z0-9]+)", url)
+        if not match:
+            print("Invalid event URL format. Unable to extract event ID.")
+            return
+        event_id = match.group(1)
+
+        def load_standings(driver, division):
+            division_id = division["Division ID"]
+            division_name = division["Division Name"]
+            print(f"Fetching standings for division: {division_name} (ID: {division_id})")
+            return extract_standings(driver, event_id, division_id, division_name, event_name)
+
+        division_standings = pool.map(load_standings, divisions, default=[])
 
     all_standings = []
-    for division in divisions:
-        division_id = division["Division ID"]
-        division_name = division["Division Name"]
-        print(f"Fetching standings for division: {division_name} (ID: {division_id})")
-        standings = extract_standings(event_id, division_id, division_name, event_name)
+    for division, standings in zip(divisions, division_standings):
         if standings:
             all_standings.extend(standings)
         else:
-            print(f"No standings found for Division {division_name} (ID: {division_id})")
+            print(f"No standings found for Division {division['Division Name']} (ID: {division['Division ID']})")
 
     df = pd.DataFrame(all_standings)
     if df.empty:
@@ -1,13 +1,235 @@
 import asyncio
 import json
+import sys
+import time
+from pathlib import Path
 
 from playwright.async_api import async_playwright
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.fetch_metrics import get_metrics, write_report
+from common.http_cache import HttpCache
+from common.resilience import DEFAULT_POLICY, PAGE_TIMEOUT, parse_retry_after
+
 EVENT_ESW_ID = "bc1b1a9e9"
+# Divisions whose standings are requested in one aliased GraphQL query
+STANDINGS_BATCH_SIZE = 40
+# Per-endpoint fetch metrics of the run are written here (.json and .md)
+FETCH_REPORT_PATH = "Sportwrench/data/fetch_report"
+
+cache = HttpCache()
+
+GRAPHQL_URL = "https://events2.sportwrench.com/api/esw/graphql"
+
+# Runs one GraphQL POST from inside the page so it carries the site's cookies
+_FETCH_SCRIPT = """async ({ url, query, variables }) => {
+    const res = await fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        },
+        body: JSON.stringify({ query, variables })
+    });
+
+    const contentType = res.headers.get('content-type') || '';
+    const text = await res.text();
+
+    return {
+        ok: res.ok,
+        status: res.status,
+        retryAfter: res.headers.get('retry-after'),
+        contentType,
+        text
+    };
+}"""
+
+
+class GraphQLSession:
+    """
+    Long-lived browser page that runs SportWrench GraphQL queries.
+
+    Chromium is launched and the event page is loaded once, on the first
+    query (so fully cached runs never start a browser); every query after
+    that is a single in-page fetch.
+
+    Args:
+        event_id (str): The SportWrench (esw) event ID whose page is opened.
+        headless (bool): Run Chromium without a window.
+    """
+
+    def __init__(self, event_id: str, headless: bool = False):
+        self.event_id = event_id
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        self._page = None
+
+    async def start(self) -> "GraphQLSession":
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        context = await self._browser.new_context()
+        self._page = await context.new_page()
+        await self._page.goto(
+            f"https://events2.sportwrench.com/events/{self.event_id}/divisions",
+            wait_until="domcontentloaded",
+            timeout=PAGE_TIMEOUT * 1000,
+        )
+        # Wait for the app's own startup requests instead of a fixed sleep
+        await self._page.wait_for_load_state("networkidle")
+        return self
+
+    async def close(self) -> None:
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = self._playwright = self._page = None
+
+    async def __aenter__(self) -> "GraphQLSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def _fetch_with_retries(self, request: dict) -> dict:
+        """Runs the in-page fetch with a timeout, retrying like ``common.resilience``."""
+        policy = DEFAULT_POLICY
+        last_attempt = policy.max_attempts - 1
+        for attempt in range(policy.max_attempts):
+            started = time.monotonic()
+            try:
+                fetch_result = await asyncio.wait_for(
+                    self._page.evaluate(_FETCH_SCRIPT, request), PAGE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                get_metrics().record_request(request["url"], "TimeoutError", 0, time.monotonic() - started)
+                if attempt == last_attempt:
+                    raise
+                await asyncio.sleep(policy.delay(attempt))
+                continue
+            get_metrics().record_request(
+                request["url"], fetch_result["status"], len(fetch_result["text"]), time.monotonic() - started
+            )
+            if fetch_result["status"] not in policy.retry_statuses or attempt == last_attempt:
+                return fetch_result
+            await asyncio.sleep(policy.delay(attempt, parse_retry_after(fetch_result.get("retryAfter"))))
+
+    async def query(self, gql_query: str, gql_variables: dict) -> dict:
+        """Runs one GraphQL query and returns the parsed JSON response."""
+        if self._page is None:
+            await self.start()
+        fetch_result = await self._fetch_with_retries(
+            {"url": GRAPHQL_URL, "query": gql_query, "variables": gql_variables}
+        )
+
+        content_type = fetch_result["contentType"].lower()
+        body_text = fetch_result["text"]
+
+        if "application/json" in content_type:
+            try:
+                return json.loads(body_text)
+            except json.JSONDecodeError:
+                pass
+
+        snippet = body_text[:500].replace("\n", " ").strip()
+        raise RuntimeError(
+            "GraphQL endpoint returned non-JSON response "
+            f"(status={fetch_result['status']}, content-type='{fetch_result['contentType']}'). "
+            f"Body starts with: {snippet}"
+        )
+
+
+# Selection set of one divisionTeamsStanding field
+_STANDING_FIELDS = """
+        team_id
+        team_name
+        team_code
+        extra {
+          show_previously_accepted_bid
+          show_accepted_bid
+          __typename
+        }
+        division_standing {
+          matches_won
+          matches_lost
+          sets_won
+          sets_lost
+          sets_pct
+          points_ratio
+          points
+          rank
+          seed
+          heading
+          __typename
+        }
+        __typename
+"""
+
+
+def build_standings_batch_query(division_count: int) -> str:
+    """
+    Builds one query with an aliased ``divisionTeamsStanding`` per division.
+
+    The aliases are ``d0``..``dN`` and read their division from the matching
+    ``$d0``..``$dN`` variable, so the document only depends on the batch size.
+    """
+    variable_defs = "".join(f", $d{i}: ID!" for i in range(division_count))
+    fields = "".join(
+        f"""
+      d{i}: divisionTeamsStanding(eventKey: $eswId, divisionId: $d{i}) {{{_STANDING_FIELDS}      }}"""
+        for i in range(division_count)
+    )
+    return f"""
+    query DivisionTeamsStandingBatch($eswId: ID!{variable_defs}) {{{fields}
+    }}
+    """
+
+
+async def fetch_standings_batched(run_query, event_id: str, division_ids: list,
+                                  batch_size: int = STANDINGS_BATCH_SIZE) -> dict:
+    """
+    Fetches standings for many divisions with aliased batch queries.
+
+    A batch the server rejects (GraphQL errors, missing aliases or a non-JSON
+    answer) is split in half and retried, down to single divisions.
+
+    Args:
+        run_query: Coroutine ``(query, variables) -> dict`` that runs one query.
+        event_id (str): The SportWrench (esw) event ID.
+        division_ids (list): Divisions to fetch.
+        batch_size (int): Divisions per query.
+
+    Returns:
+        dict: division_id -> list of team standings (empty if it never loaded).
+    """
+    results = {}
+    pending = [division_ids[i:i + batch_size] for i in range(0, len(division_ids), batch_size)]
+    while pending:
+        batch = pending.pop(0)
+        variables = {"eswId": event_id}
+        variables.update({f"d{i}": division_id for i, division_id in enumerate(batch)})
+        try:
+            response = await run_query(build_standings_batch_query(len(batch)), variables)
+            data = response.get("data") or {}
+            rejected = bool(response.get("errors")) or any(data.get(f"d{i}") is None for i in range(len(batch)))
+        except RuntimeError as e:
+            data, rejected = {}, True
+            print(f"Standings batch of {len(batch)} divisions failed: {e}")
+
+        if rejected and len(batch) > 1:
+            middle = len(batch) // 2
+            pending[:0] = [batch[:middle], batch[middle:]]
+            continue
+        if rejected:
+            print(f"Failed to fetch standings for division ID: {batch[0]}")
+        for i, division_id in enumerate(batch):
+            results[division_id] = data.get(f"d{i}") or []
+    return results
 
 
 async def fetch_graphql():
-    url = "https://events2.sportwrench.com/api/esw/graphql"
+    url = GRAPHQL_URL
 
     event_query = """
     query EventDetails($eswId: ID!) {
@@ -71,127 +293,49 @@ async def fetch_graphql():
     }
     """
 
-    division_standings_query = """
-    query DivisionTeamsStanding($eswId: ID!, $divisionId: ID!) {
-      divisionTeamsStanding(eventKey: $eswId, divisionId: $divisionId) {
-        team_id
-        team_name
-        team_code
-        extra {
-          show_previously_accepted_bid
-          show_accepted_bid
-          __typename
-        }
-        division_standing {
-          matches_won
-          matches_lost
-          sets_won
-          sets_lost
-          sets_pct
-          points_ratio
-          points
-          rank
-          seed
-          heading
-          __typename
-        }
-        __typename
-      }
-    }
-    """
-
     event_variables = {"eswId": EVENT_ESW_ID}
     event_id = event_variables["eswId"]
     headless = False
 
-    async def run_once(headless: bool, gql_query: str, gql_variables: dict) -> dict:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=headless)
-            try:
-                context = await browser.new_context()
-                page = await context.new_page()
-
-                await page.goto(
-                    f"https://events2.sportwrench.com/events/{event_id}/divisions",
-                    wait_until="domcontentloaded",
-                )
-                await page.wait_for_timeout(1500)
-
-                fetch_result = await page.evaluate(
-                    """async ({ url, query, variables }) => {
-                        const res = await fetch(url, {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json',
-                                'Accept': 'application/json'
-                            },
-                            body: JSON.stringify({ query, variables })
-                        });
-
-                        const contentType = res.headers.get('content-type') || '';
-                        const text = await res.text();
-
-                        return {
-                            ok: res.ok,
-                            status: res.status,
-                            contentType,
-                            text
-                        };
-                    }""",
-                    {"url": url, "query": gql_query, "variables": gql_variables},
-                )
-            finally:
-                await browser.close()
-
-        content_type = fetch_result["contentType"].lower()
-        body_text = fetch_result["text"]
-
-        if "application/json" in content_type:
-            try:
-                return json.loads(body_text)
-            except json.JSONDecodeError:
-                pass
+    cache_scope = f"esw:{event_id}"
 
-        snippet = body_text[:500].replace("\n", " ").strip()
-        raise RuntimeError(
-            "GraphQL endpoint returned non-JSON response "
-            f"(status={fetch_result['status']}, content-type='{fetch_result['contentType']}'). "
-            f"Body starts with: {snippet}"
-        )
+    async def cached_query(gql_query: str, gql_variables: dict) -> dict:
+        # GraphQL is POST-only, so the cache key includes the query and variables
+        body = json.dumps({"query": gql_query, "variables": gql_variables}, sort_keys=True)
+        cached = cache.load("POST", url, body=body)
+        if cached is not None:
+            return json.loads(cached)
 
-    response_json = await run_once(
-        headless=headless,
-        gql_query=event_query,
-        gql_variables=event_variables,
-    )
+        result = await session.query(gql_query, gql_variables)
+        # Rejected queries are retried in smaller batches, so never cache them
+        if not result.get("errors"):
+            cache.store("POST", url, json.dumps(result), body=body, scope=cache_scope)
+        return result
 
-    divisions = response_json.get("data", {}).get("divisions", [])
-    division_ids = [division.get("division_id") for division in divisions if division.get("division_id")]
-    print("Division IDs:", division_ids)
+    async with GraphQLSession(event_id, headless=headless) as session:
+        response_json = await cached_query(event_query, event_variables)
 
-    division_standings = []
-    for division_id in division_ids:
-        standing_variables = {
-            "eswId": EVENT_ESW_ID,
-            "divisionId": division_id,
-        }
+        event_days = (response_json.get("data", {}).get("event") or {}).get("days") or []
+        if event_days:
+            cache.record_event_end(cache_scope, max(event_days))
 
-        standings_response = await run_once(
-            headless=headless,
-            gql_query=division_standings_query,
-            gql_variables=standing_variables,
-        )
+        divisions = response_json.get("data", {}).get("divisions", [])
+        division_ids = [division.get("division_id") for division in divisions if division.get("division_id")]
+        print("Division IDs:", division_ids)
 
-        teams = standings_response.get("data", {}).get("divisionTeamsStanding", [])
-        division_standings.append(
+        standings_by_division = await fetch_standings_batched(cached_query, EVENT_ESW_ID, division_ids)
+        division_standings = [
             {
                 "division_id": division_id,
-                "teams": teams,
+                "teams": standings_by_division[division_id],
             }
-        )
+            for division_id in division_ids
+        ]
 
-    print(f"Fetched standings for {len(division_standings)} divisions")
-    print(json.dumps(division_standings, indent=2))
+        print(f"Fetched standings for {len(division_standings)} divisions")
+        print(json.dumps(division_standings, indent=2))
 
 
 asyncio.run(fetch_graphql())
+write_report(FETCH_REPORT_PATH)
+
@@ -1,9 +1,19 @@
 import argparse
+import base64
 import csv
-import re
-from collections import defaultdict
+import hashlib
+import io
+import json
+import sys
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.team_codes import PARSED_FIELDS, extract_age_group, is_canonical_team_code, normalize_team_code, parse_team_code
+from common.warehouse import WAREHOUSE_PATH, Warehouse
+
 INPUT_PATH = r"C:\Git Repos\AES-Results-Scraping\Team Results Comparison\2026 Triple Crown NIT - TeamResults.csv"
 NIT_CODES_PATH = r"C:\Git Repos\AES-Results-Scraping\Team Results Comparison\NIT_team_codes.csv"
 
@@ -14,203 +24,531 @@ def normalize_result(value: str) -> str:
 	return value.strip().lower()
 
 
-def is_canonical_team_code(team_code: str) -> bool:
-	value = (team_code or "").strip().lower()
-	return bool(re.match(r"^[a-z]\d{2}[a-z]+\d[a-z]{2}$", value))
-
-
-def extract_age_group(team_code: str) -> str:
-	value = (team_code or "").strip().lower()
-	if len(value) >= 3 and value[0].isalpha() and value[1:3].isdigit():
-		return value[:3]
-	return ""
-
-
-def normalize_code(value: str) -> str:
-	return (value or "").strip().lower()
-
-
 def load_team_code_set(path: Path) -> set[str]:
 	if not path.exists():
 		return set()
 	with path.open("r", newline="", encoding="utf-8") as handle:
 		reader = csv.DictReader(handle)
-		return {normalize_code(row.get("Team Code")) for row in reader if row.get("Team Code")}
+		return {normalize_team_code(row.get("Team Code")) for row in reader if row.get("Team Code")}
+
+
+# Counter columns of the summary, in output order after the key/team/code/age columns
+COUNTER_FIELDS = [
+	"matches",
+	"wins",
+	"losses",
+	"same_age_matches",
+	"same_age_wins",
+	"same_age_losses",
+	"nit_matches",
+	"nit_wins",
+	"nit_losses",
+	"nit_same_age_matches",
+	"nit_same_age_wins",
+	"nit_same_age_losses",
+]
+COUNTER_HEADERS = [
+	"Matches",
+	"Wins",
+	"Losses",
+	"Same-Age Matches",
+	"Same-Age Wins",
+	"Same-Age Losses",
+	"NIT Matches",
+	"NIT Wins",
+	"NIT Losses",
+	"NIT Same-Age Matches",
+	"NIT Same-Age Wins",
+	"NIT Same-Age Losses",
+]
+
+
+# Match-results columns the aggregation reads (plus the group key)
+USED_COLUMNS = {"Team", "Team Code", "Result", "Opponent Team Code"}
+
+
+def load_match_results(path: Path, group_key: str, all_columns: bool = False) -> pd.DataFrame:
+	"""Reads the columns the aggregation needs (or every column) from the match-results CSV, as text."""
+	used = USED_COLUMNS | {group_key}
+	usecols = None if all_columns else (lambda name: name in used)
+	return pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8", usecols=usecols)
+
+
+def factorize_column(frame: pd.DataFrame, name: str) -> tuple[np.ndarray, list[str]]:
+	"""
+	Splits a text column into per-row integer codes and its distinct values.
+
+	Team codes, names and results repeat heavily, so string work is done once
+	per distinct value and mapped back to the rows through the codes.
+	"""
+	if name not in frame.columns:
+		return np.zeros(len(frame), dtype=np.intp), [""]
+	codes, uniques = pd.factorize(frame[name], use_na_sentinel=False)
+	# Short rows leave trailing fields missing; they read as ''
+	return codes, [value if isinstance(value, str) else "" for value in uniques] or [""]
+
+
+def first_row_per_group(group_ids: np.ndarray, candidates: np.ndarray, group_count: int) -> np.ndarray:
+	"""Index of the first candidate row of every group, or -1 if it has none."""
+	rows = np.flatnonzero(candidates)
+	result = np.full(group_count, len(group_ids), dtype=np.intp)
+	np.minimum.at(result, group_ids[rows], rows)
+	result[result == len(group_ids)] = -1
+	return result
+
+
+def values_per_row(column: tuple[np.ndarray, list[str]], transform) -> np.ndarray:
+	"""Applies ``transform`` once per distinct value of a factorized column and maps it back to the rows."""
+	codes, values = column
+	return np.array([transform(value) for value in values], dtype=object)[codes]
+
+
+def group_rows(frame: pd.DataFrame, group_key: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+	"""
+	Group ID of every row, in order of first appearance of each (stripped) key.
+
+	Returns:
+		tuple: Group IDs of the rows with a non-empty key, the distinct keys,
+			and the mask of those rows over ``frame``.
+	"""
+	key_codes, key_values = factorize_column(frame, group_key)
+	key_ids, keys = pd.factorize(pd.Series([value.strip() for value in key_values], dtype=object))
+	row_keys = key_ids[key_codes]
+	has_key = np.array([key != "" for key in keys], dtype=bool)[row_keys]
+	return row_keys[has_key], keys, has_key
+
+
+def team_field_rows(row_keys: np.ndarray, team: np.ndarray, team_code: np.ndarray, is_canonical: np.ndarray, group_count: int):
+	"""Row of every group's team name (first non-empty) and team code (first canonical, else first non-empty), or -1."""
+	first_team = first_row_per_group(row_keys, team != "", group_count)
+	first_canonical = first_row_per_group(row_keys, is_canonical, group_count)
+	first_code = first_row_per_group(row_keys, team_code != "", group_count)
+	return first_team, np.where(first_canonical >= 0, first_canonical, first_code)
+
+
+def extract_club(team_code: str) -> str:
+	"""Club letters of a canonical team code (``g15abcde1nt`` -> ``abcde``), else ''."""
+	return parse_team_code(team_code)[PARSED_FIELDS.index("Club")] or ""
+
+
+def match_features(frame: pd.DataFrame, opponent_code_set: set[str]) -> dict[str, np.ndarray]:
+	"""
+	Per-row team fields and result masks shared by every aggregation.
+
+	Text columns are factorized so each distinct value is normalized once.
+	"""
+	team_code_column = factorize_column(frame, "Team Code")
+	opp_code_column = factorize_column(frame, "Opponent Team Code")
+	team_age = values_per_row(team_code_column, extract_age_group)
+	opp_age = values_per_row(opp_code_column, extract_age_group)
+	opp_code = values_per_row(opp_code_column, normalize_team_code)
+	result = values_per_row(factorize_column(frame, "Result"), normalize_result)
+	won = result == "won"
+	lost = result == "lost"
+	return {
+		"team": values_per_row(factorize_column(frame, "Team"), str.strip),
+		"team_code": values_per_row(team_code_column, str.strip),
+		"club": values_per_row(team_code_column, extract_club),
+		"team_age": team_age,
+		"opp_age": opp_age,
+		"is_canonical": values_per_row(team_code_column, is_canonical_team_code).astype(bool),
+		"same_age": (team_age != "") & (team_age == opp_age),
+		"in_nit_list": np.isin(opp_code, list(opponent_code_set)) if opponent_code_set else np.zeros(len(frame), dtype=bool),
+		"won": won,
+		"lost": lost,
+		"other": ~(won | lost),
+	}
+
+
+def count_records(row_keys: np.ndarray, features: dict[str, np.ndarray], group_count: int) -> dict[str, np.ndarray]:
+	"""Record counters of every group, one ``np.bincount`` per counter."""
+	same_age = features["same_age"]
+	in_nit_list = features["in_nit_list"]
+	won, lost, other = features["won"], features["lost"], features["other"]
+
+	def count(mask=None):
+		return np.bincount(row_keys, weights=mask, minlength=group_count).astype(np.int64)
+
+	return {
+		"matches": count(),
+		"wins": count(won),
+		"losses": count(lost),
+		"other": count(other),
+		"same_age_matches": count(same_age),
+		"same_age_wins": count(same_age & won),
+		"same_age_losses": count(same_age & lost),
+		"same_age_other": count(same_age & other),
+		"nit_matches": count(in_nit_list),
+		"nit_wins": count(in_nit_list & won),
+		"nit_losses": count(in_nit_list & lost),
+		"nit_other": count(in_nit_list & other),
+		"nit_same_age_matches": count(in_nit_list & same_age),
+		"nit_same_age_wins": count(in_nit_list & same_age & won),
+		"nit_same_age_losses": count(in_nit_list & same_age & lost),
+		"nit_same_age_other": count(in_nit_list & same_age & other),
+	}
 
 
 def aggregate_team_results(rows, group_key: str, opponent_code_set: set[str]):
-	stats = defaultdict(
-		lambda: {
-			"team": "",
-			"age_division": "",
-			"team_code": "",
-			"matches": 0,
-			"wins": 0,
-			"losses": 0,
-			"other": 0,
-			"same_age_matches": 0,
-			"same_age_wins": 0,
-			"same_age_losses": 0,
-			"same_age_other": 0,
-			"nit_matches": 0,
-			"nit_wins": 0,
-			"nit_losses": 0,
-			"nit_other": 0,
-			"nit_same_age_matches": 0,
-			"nit_same_age_wins": 0,
-			"nit_same_age_losses": 0,
-			"nit_same_age_other": 0,
-		}
-	)
+	frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
 
-	for row in rows:
-		key = (row.get(group_key) or "").strip()
-		if not key:
-			continue
+	row_keys, keys, has_key = group_rows(frame, group_key)
+	group_count = len(keys)
+
+	features = {name: values[has_key] for name, values in match_features(frame, opponent_code_set).items()}
+	counters = count_records(row_keys, features, group_count)
+	team = features["team"]
+	team_code = features["team_code"]
+
+	first_team, code_row = team_field_rows(row_keys, team, team_code, features["is_canonical"], group_count)
+
+	stats = {}
+	for group_id in np.flatnonzero(counters["matches"]):
+		entry = {name: int(values[group_id]) for name, values in counters.items()}
+		entry["team"] = team[first_team[group_id]] if first_team[group_id] >= 0 else ""
+		entry["team_code"] = team_code[code_row[group_id]] if code_row[group_id] >= 0 else ""
+		entry["age_division"] = extract_age_group(entry["team_code"])
+		stats[keys[group_id]] = entry
+	return stats
+
+
+STATE_VERSION = 1
+
+
+def row_fingerprints(frame: pd.DataFrame) -> np.ndarray:
+	"""
+	64-bit hash of every row over all of its columns.
+
+	Match rows carry no ID; team, event, date, result and opponent together
+	identify a match side, so the hash of the whole row stands in for one.
+	"""
+	columns = sorted(frame.columns)
+	return pd.util.hash_pandas_object(frame[columns].fillna(""), index=False).to_numpy(dtype=np.uint64)
 
-		entry = stats[key]
-		if not entry["team"]:
-			entry["team"] = (row.get("Team") or "").strip()
 
-		team_code = (row.get("Team Code") or "").strip()
-		if (not entry["team_code"]) or (
-			not is_canonical_team_code(entry["team_code"]) and is_canonical_team_code(team_code)
+def occurrence_counts(fingerprints: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+	"""Distinct fingerprints (sorted) and how many rows have each one."""
+	return np.unique(fingerprints, return_counts=True)
+
+
+def count_lookup(keys: np.ndarray, values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+	"""Count stored for each key in the sorted ``values``, 0 where it is absent."""
+	if not len(values):
+		return np.zeros(len(keys), dtype=np.int64)
+	position = np.searchsorted(values, keys).clip(max=len(values) - 1)
+	return np.where(values[position] == keys, counts[position], 0)
+
+
+def unseen_rows(fingerprints: np.ndarray, seen: np.ndarray, seen_counts: np.ndarray) -> np.ndarray | None:
+	"""
+	Mask of rows not yet counted, given the fingerprint counts already folded in.
+
+	Identical rows (e.g. a rematch with the same result) are tracked as a
+	count, so the n-th copy of a row is new once n exceeds the stored count.
+
+	Returns:
+		np.ndarray: Boolean mask over ``fingerprints``, or None when rows that
+			were counted before are gone and the state no longer applies.
+	"""
+	values, counts = occurrence_counts(fingerprints)
+	if np.any(count_lookup(seen, values, counts) < seen_counts):
+		return None
+
+	# Occurrence number of every row among rows with the same fingerprint
+	order = np.argsort(fingerprints, kind="stable")
+	sorted_fingerprints = fingerprints[order]
+	occurrence = np.empty(len(fingerprints), dtype=np.int64)
+	occurrence[order] = np.arange(len(fingerprints)) - np.searchsorted(sorted_fingerprints, sorted_fingerprints)
+	return occurrence >= count_lookup(fingerprints, seen, seen_counts)
+
+
+def merge_team_stats(stats: dict, new_stats: dict) -> dict:
+	"""
+	Folds the counters of newly seen rows into a previous summary.
+
+	Team names and codes follow the full-recompute rule: the earliest
+	non-empty name, and the earliest canonical code, else the earliest code.
+	That only holds when the new rows come after every counted row, as
+	appended rows do; otherwise ``refresh_team_fields`` must follow.
+	"""
+	for key, new_entry in new_stats.items():
+		entry = stats.get(key)
+		if entry is None:
+			stats[key] = new_entry
+			continue
+		for field in new_entry:
+			if field not in ("team", "team_code", "age_division"):
+				entry[field] += new_entry[field]
+		if not entry["team"]:
+			entry["team"] = new_entry["team"]
+		if not is_canonical_team_code(entry["team_code"]) and (
+			is_canonical_team_code(new_entry["team_code"]) or not entry["team_code"]
 		):
-			entry["team_code"] = team_code
-			entry["age_division"] = extract_age_group(team_code)
-
-		entry["matches"] += 1
-
-		team_age = extract_age_group(row.get("Team Code"))
-		opp_code = normalize_code(row.get("Opponent Team Code"))
-		opp_age = extract_age_group(row.get("Opponent Team Code"))
-		same_age = team_age and opp_age and team_age == opp_age
-		in_nit_list = bool(opponent_code_set) and opp_code in opponent_code_set
-
-		result = normalize_result(row.get("Result"))
-		if result == "won":
-			entry["wins"] += 1
-			if same_age:
-				entry["same_age_wins"] += 1
-			if in_nit_list:
-				entry["nit_wins"] += 1
-				if same_age:
-					entry["nit_same_age_wins"] += 1
-		elif result == "lost":
-			entry["losses"] += 1
-			if same_age:
-				entry["same_age_losses"] += 1
-			if in_nit_list:
-				entry["nit_losses"] += 1
-				if same_age:
-					entry["nit_same_age_losses"] += 1
-		else:
-			entry["other"] += 1
-			if same_age:
-				entry["same_age_other"] += 1
-			if in_nit_list:
-				entry["nit_other"] += 1
-				if same_age:
-					entry["nit_same_age_other"] += 1
-
-		if same_age:
-			entry["same_age_matches"] += 1
-		if in_nit_list:
-			entry["nit_matches"] += 1
-			if same_age:
-				entry["nit_same_age_matches"] += 1
+			entry["team_code"] = new_entry["team_code"]
+			entry["age_division"] = extract_age_group(entry["team_code"])
+	return stats
+
 
+def refresh_team_fields(stats: dict, rows: pd.DataFrame, group_key: str) -> dict:
+	"""
+	Re-picks every group's team name and code from all ``rows`` in their current order.
+
+	Rows that were rewritten or reordered can move a group's earliest name or
+	code, so the choice is redone as a full recompute would make it.
+	"""
+	row_keys, keys, has_key = group_rows(rows, group_key)
+	team_code_column = factorize_column(rows, "Team Code")
+	team = values_per_row(factorize_column(rows, "Team"), str.strip)[has_key]
+	team_code = values_per_row(team_code_column, str.strip)[has_key]
+	is_canonical = values_per_row(team_code_column, is_canonical_team_code).astype(bool)[has_key]
+	first_team, code_row = team_field_rows(row_keys, team, team_code, is_canonical, len(keys))
+	for group_id, key in enumerate(keys):
+		entry = stats.get(key)
+		if entry is None:
+			continue
+		entry["team"] = team[first_team[group_id]] if first_team[group_id] >= 0 else ""
+		entry["team_code"] = team_code[code_row[group_id]] if code_row[group_id] >= 0 else ""
+		entry["age_division"] = extract_age_group(entry["team_code"])
 	return stats
 
 
+def encode_array(values: np.ndarray) -> str:
+	return base64.b64encode(values.astype("<u8").tobytes()).decode("ascii")
+
+
+def decode_array(text: str) -> np.ndarray:
+	return np.frombuffer(base64.b64decode(text), dtype="<u8").astype(np.uint64)
+
+
+def file_watermark(path: Path, size: int | None = None) -> dict:
+	"""Byte length and SHA-256 of the first ``size`` bytes (default: all) of a file."""
+	with path.open("rb") as handle:
+		content = handle.read() if size is None else handle.read(size)
+	return {"size": len(content), "sha256": hashlib.sha256(content).hexdigest()}
+
+
+def read_appended_rows(path: Path, watermark: dict) -> pd.DataFrame | None:
+	"""
+	Rows appended to a CSV since ``watermark`` was taken.
+
+	Returns:
+		pd.DataFrame: The appended rows (possibly none), or None when the file
+			no longer starts with the bytes the watermark describes.
+	"""
+	if path.stat().st_size < watermark["size"] or file_watermark(path, watermark["size"]) != watermark:
+		return None
+	with path.open("rb") as handle:
+		header = handle.readline()
+		handle.seek(max(watermark["size"] - 1, 0))
+		# Appends are only safe to parse alone if the old content ended a line
+		if handle.read(1) != b"\n":
+			return None
+		tail = handle.read()
+	return pd.read_csv(io.BytesIO(header + tail), dtype=str, keep_default_na=False, encoding="utf-8")
+
+
+def load_state(path: Path, group_key: str, opponent_code_set: set[str]) -> dict | None:
+	"""Returns the saved aggregation state, or None if missing or built with other settings."""
+	if not path.exists():
+		return None
+	state = json.loads(path.read_text(encoding="utf-8"))
+	if (
+		state.get("version") != STATE_VERSION
+		or state.get("group") != group_key
+		or state.get("nit_codes") != sorted(opponent_code_set)
+	):
+		return None
+	state["seen"] = decode_array(state.pop("fingerprints"))
+	state["seen_counts"] = decode_array(state.pop("fingerprint_counts")).astype(np.int64)
+	return state
+
+
+def save_state(
+	path: Path,
+	group_key: str,
+	opponent_code_set: set[str],
+	seen: np.ndarray,
+	seen_counts: np.ndarray,
+	stats: dict,
+	watermark: dict | None,
+):
+	state = {
+		"version": STATE_VERSION,
+		"group": group_key,
+		"nit_codes": sorted(opponent_code_set),
+		"watermark": watermark,
+		"fingerprints": encode_array(seen),
+		"fingerprint_counts": encode_array(seen_counts),
+		"stats": stats,
+	}
+	path.parent.mkdir(parents=True, exist_ok=True)
+	tmp_path = path.with_suffix(".tmp")
+	tmp_path.write_text(json.dumps(state), encoding="utf-8")
+	tmp_path.replace(path)
+
+
+def add_occurrences(seen: np.ndarray, seen_counts: np.ndarray, fingerprints: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+	"""Adds the rows of ``fingerprints`` to the stored fingerprint counts."""
+	values, inverse = np.unique(np.concatenate([seen, fingerprints]), return_inverse=True)
+	weights = np.concatenate([seen_counts, np.ones(len(fingerprints), dtype=np.int64)])
+	return values, np.bincount(inverse, weights=weights, minlength=len(values)).astype(np.int64)
+
+
+def aggregate_incremental(
+	input_path: Path,
+	group_key: str,
+	opponent_code_set: set[str],
+	state_path: Path,
+	rows: pd.DataFrame | None = None,
+) -> dict:
+	"""
+	Aggregates only the rows not counted by the previous run, then saves the state.
+
+	When the CSV only grew since the last run, just the appended bytes are
+	parsed. Otherwise every row is fingerprinted, the rows whose
+	fingerprints were already counted are skipped, and team names and codes
+	are re-picked from all rows since their order may have changed. A full
+	aggregation is done when there is no usable state or counted rows have
+	disappeared.
+
+	Args:
+		input_path (Path): Match-results CSV (ignored when ``rows`` is given).
+		group_key (str): Field to group by.
+		opponent_code_set (set): NIT-list opponent team codes.
+		state_path (Path): State file written by the previous run.
+		rows (pd.DataFrame): Rows from another source (e.g. the warehouse).
+
+	Returns:
+		dict: The same key -> entry summary as ``aggregate_team_results``.
+	"""
+	state = load_state(state_path, group_key, opponent_code_set)
+	watermark = file_watermark(input_path) if rows is None else None
+
+	if state is not None and rows is None and state.get("watermark"):
+		appended = read_appended_rows(input_path, state["watermark"])
+		if appended is not None:
+			print(f"Folding in {len(appended)} appended rows.")
+			stats = merge_team_stats(state["stats"], aggregate_team_results(appended, group_key, opponent_code_set))
+			seen, seen_counts = add_occurrences(state["seen"], state["seen_counts"], row_fingerprints(appended))
+			save_state(state_path, group_key, opponent_code_set, seen, seen_counts, stats, watermark)
+			return stats
+
+	if rows is None:
+		# Fingerprints cover every column, so all of them are read
+		rows = load_match_results(input_path, group_key, all_columns=True)
+	fingerprints = row_fingerprints(rows)
+	new_rows = None
+	if state is not None:
+		new_rows = unseen_rows(fingerprints, state["seen"], state["seen_counts"])
+		if new_rows is None:
+			print(f"Rows counted in {state_path} are missing from the input; recomputing from scratch.")
+
+	if new_rows is None:
+		stats = aggregate_team_results(rows, group_key, opponent_code_set)
+	else:
+		print(f"Folding in {int(new_rows.sum())} new of {len(rows)} rows.")
+		stats = merge_team_stats(state["stats"], aggregate_team_results(rows[new_rows], group_key, opponent_code_set))
+		stats = refresh_team_fields(stats, rows, group_key)
+	seen, seen_counts = occurrence_counts(fingerprints)
+	save_state(state_path, group_key, opponent_code_set, seen, seen_counts, stats, watermark)
+	return stats
+
+
+# Rollup levels in output order -> label written to the Level column
+ROLLUP_LEVELS = {
+	"team": "Team",
+	"team_code": "Team Code",
+	"club": "Club",
+	"age_division": "Age Division",
+	"nit": "NIT Opponent",
+	"opponent_age": "Opponent Age",
+}
+
+
+def opponent_age_bucket(features: dict[str, np.ndarray]) -> np.ndarray:
+	"""Opponent's age group relative to the team's: Same Age, Older, Younger or ''."""
+	def age_number(age_groups):
+		return np.array([int(age[1:]) if age else -1 for age in age_groups], dtype=np.int64)
+
+	team_age_values, team_age_codes = np.unique(features["team_age"].astype(str), return_inverse=True)
+	opp_age_values, opp_age_codes = np.unique(features["opp_age"].astype(str), return_inverse=True)
+	team_age = age_number(team_age_values)[team_age_codes]
+	opp_age = age_number(opp_age_values)[opp_age_codes]
+	known = (team_age >= 0) & (opp_age >= 0)
+	return np.select(
+		[known & (opp_age == team_age), known & (opp_age > team_age), known & (opp_age < team_age)],
+		["Same Age", "Older", "Younger"],
+		default="",
+	).astype(object)
+
+
+def rollup_labels(level: str, features: dict[str, np.ndarray]) -> np.ndarray:
+	"""Group label of every row for a rollup level ('' rows are left out)."""
+	if level == "age_division":
+		return features["team_age"]
+	if level == "nit":
+		return np.where(features["in_nit_list"], "NIT", "Non-NIT").astype(object)
+	if level == "opponent_age":
+		return opponent_age_bucket(features)
+	return features[level]
+
+
+def rollup_team_results(rows, levels: list[str], opponent_code_set: set[str]) -> list[list]:
+	"""
+	Record counters for several grouping levels from a single pass over the rows.
+
+	Row fields and result masks are computed once; each level only adds a
+	factorize of its labels and the per-counter bincounts.
+
+	Returns:
+		list: Tidy rows of [Level, Group] + counters, levels in ``ROLLUP_LEVELS``
+			order and groups sorted by wins, matches, then name.
+	"""
+	frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+	features = match_features(frame, opponent_code_set)
+
+	table = []
+	for level in [name for name in ROLLUP_LEVELS if name in levels]:
+		labels = rollup_labels(level, features)
+		has_label = labels != ""
+		label_ids, label_values = pd.factorize(labels[has_label])
+		counters = count_records(
+			label_ids,
+			{name: values[has_label] for name, values in features.items()},
+			len(label_values),
+		)
+		groups = sorted(
+			np.flatnonzero(counters["matches"]),
+			key=lambda group_id: (-counters["wins"][group_id], -counters["matches"][group_id], label_values[group_id].lower()),
+		)
+		table.extend(
+			[ROLLUP_LEVELS[level], label_values[group_id]] + [int(counters[field][group_id]) for field in COUNTER_FIELDS]
+			for group_id in groups
+		)
+	return table
+
+
 def write_csv(output_path: Path, stats, group_key: str):
 	output_path.parent.mkdir(parents=True, exist_ok=True)
+	if group_key == "Team":
+		header = ["Team", "Team Code", "Age Division"] + COUNTER_HEADERS
+		fields = ["team_code", "age_division"] + COUNTER_FIELDS
+	else:
+		header = [group_key, "Team", "Team Code", "Age Division"] + COUNTER_HEADERS
+		fields = ["team", "team_code", "age_division"] + COUNTER_FIELDS
+
 	with output_path.open("w", newline="", encoding="utf-8") as handle:
 		writer = csv.writer(handle)
-		if group_key == "Team":
-			writer.writerow(
-				[
-					"Team",
-					"Team Code",
-					"Age Division",
-					"Matches",
-					"Wins",
-					"Losses",
-					"Same-Age Matches",
-					"Same-Age Wins",
-					"Same-Age Losses",
-					"NIT Matches",
-					"NIT Wins",
-					"NIT Losses",
-					"NIT Same-Age Matches",
-					"NIT Same-Age Wins",
-					"NIT Same-Age Losses",
-				]
-			)
-		else:
-			writer.writerow(
-				[
-					group_key,
-					"Team",
-					"Team Code",
-					"Age Division",
-					"Matches",
-					"Wins",
-					"Losses",
-					"Same-Age Matches",
-					"Same-Age Wins",
-					"Same-Age Losses",
-					"NIT Matches",
-					"NIT Wins",
-					"NIT Losses",
-					"NIT Same-Age Matches",
-					"NIT Same-Age Wins",
-					"NIT Same-Age Losses",
-				]
-			)
-
-		for key, data in stats:
-			if group_key == "Team":
-				writer.writerow(
-					[
-						key,
-						data["team_code"],
-						data["age_division"],
-						data["matches"],
-						data["wins"],
-						data["losses"],
-						data["same_age_matches"],
-						data["same_age_wins"],
-						data["same_age_losses"],
-						data["nit_matches"],
-						data["nit_wins"],
-						data["nit_losses"],
-						data["nit_same_age_matches"],
-						data["nit_same_age_wins"],
-						data["nit_same_age_losses"],
-					]
-				)
-			else:
-				writer.writerow(
-					[
-						key,
-						data["team"],
-						data["team_code"],
-						data["age_division"],
-						data["matches"],
-						data["wins"],
-						data["losses"],
-						data["same_age_matches"],
-						data["same_age_wins"],
-						data["same_age_losses"],
-						data["nit_matches"],
-						data["nit_wins"],
-						data["nit_losses"],
-						data["nit_same_age_matches"],
-						data["nit_same_age_wins"],
-						data["nit_same_age_losses"],
-					]
-				)
+		writer.writerow(header)
+		writer.writerows([key] + [data[field] for field in fields] for key, data in stats)
+
+
+def write_rollup_csv(output_path: Path, table: list[list]):
+	output_path.parent.mkdir(parents=True, exist_ok=True)
+	with output_path.open("w", newline="", encoding="utf-8") as handle:
+		writer = csv.writer(handle)
+		writer.writerow(["Level", "Group"] + COUNTER_HEADERS)
+		writer.writerows(table)
 
 
 def print_summary(stats, group_key: str):
@@ -243,21 +581,75 @@ def main() -> int:
 		default=NIT_CODES_PATH,
 		help="Optional path to CSV with the list of opponent team codes (Team Code column).",
 	)
+	parser.add_argument(
+		"--warehouse",
+		nargs="?",
+		const=str(WAREHOUSE_PATH),
+		default=None,
+		help="Read match results from the local results warehouse (optionally at this path) instead of --input.",
+	)
+	parser.add_argument(
+		"--event",
+		default=None,
+		help="With --warehouse, only include events whose name contains this text.",
+	)
+	parser.add_argument(
+		"--rollup",
+		nargs="*",
+		choices=list(ROLLUP_LEVELS),
+		default=None,
+		help="Write one table of counters for these grouping levels (all levels if none are given) instead of the --group summary.",
+	)
+	parser.add_argument(
+		"--incremental",
+		action="store_true",
+		help="Only aggregate rows not counted by the previous --incremental run, using the saved state file.",
+	)
+	parser.add_argument(
+		"--state",
+		default=None,
+		help="With --incremental, path of the state file. Defaults to '<input>_<group>_state.json'.",
+	)
 	parser.add_argument(
 		"--output",
 		default=None,
-		help="Optional output CSV path. Defaults to '<input>_team_summary.csv'.",
+		help="Optional output CSV path. Defaults to '<input>_team_summary.csv' ('<input>_rollup.csv' with --rollup).",
 	)
 
 	args = parser.parse_args()
-	input_path = Path(args.input)
+	input_path = Path(args.warehouse) if args.warehouse else Path(args.input)
 	if not input_path.exists():
 		raise FileNotFoundError(f"Input file not found: {input_path}")
 
 	nit_codes = load_team_code_set(Path(args.nit_codes))
-	with input_path.open("r", newline="", encoding="utf-8") as handle:
-		reader = csv.DictReader(handle)
-		stats_map = aggregate_team_results(reader, args.group, nit_codes)
+	if args.rollup is not None:
+		if args.warehouse:
+			warehouse = Warehouse(input_path)
+			rows = warehouse.team_results(args.event)
+		else:
+			rows = load_match_results(input_path, "Team")
+		table = rollup_team_results(rows, args.rollup or list(ROLLUP_LEVELS), nit_codes)
+		if args.warehouse:
+			warehouse.close()
+		output_path = Path(args.output) if args.output else input_path.with_name(f"{input_path.stem}_rollup.csv")
+		write_rollup_csv(output_path, table)
+		print(f"Wrote rollup CSV to: {output_path}")
+		return 0
+
+	rows = None
+	if args.warehouse:
+		warehouse = Warehouse(input_path)
+		rows = pd.DataFrame(list(warehouse.team_results(args.event)))
+		warehouse.close()
+
+	if args.incremental:
+		group_slug = args.group.lower().replace(" ", "_")
+		state_path = Path(args.state) if args.state else input_path.with_name(f"{input_path.stem}_{group_slug}_state.json")
+		stats_map = aggregate_incremental(input_path, args.group, nit_codes, state_path, rows=rows)
+	else:
+		if rows is None:
+			rows = load_match_results(input_path, args.group)
+		stats_map = aggregate_team_results(rows, args.group, nit_codes)
 
 	stats_list = sorted(
 		stats_map.items(),
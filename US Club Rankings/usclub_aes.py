@@ -1,30 +1,43 @@
-import requests
+import sys
+from pathlib import Path
 import pandas as pd
 import re
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.aes_client import AESClient, AESRequestError, event_id_from_url
+from common.fetch_metrics import write_report
+from common.http_cache import has_ended
+from common.standings_store import StandingsStore
+from common.warehouse import get_warehouse, record_aes_event
+
 # List of event URLs to process for US Club Rankings import
 event_urls = [
     "https://results.advancedeventsystems.com/event/PTAwMDAwNDI3Nzk90", #2026 NIT
 ]
 
+# Set to True during a live weekend to refetch only divisions that are still in progress
+incremental_refresh = False
+# Per-endpoint fetch metrics of the run are written here (.json and .md)
+fetch_report_path = "US Club Rankings/data/aes_fetch_report"
+
 # Initialize an empty DataFrame to hold all data
 all_data = pd.DataFrame()
+standings_store = StandingsStore()
+warehouse = get_warehouse()
 
 # Function to fetch and process event data
 def process_event(event_url, increment_code=False):
-    match = re.search(r'/event/([^/]+)$', event_url)
-    event_id = match.group(1) if match else None
+    event_id = event_id_from_url(event_url)
     
     print(f"Processing event ID: {event_id}")
     
-    # Define the base API endpoint for the event
-    base_url = f"https://results.advancedeventsystems.com/api/event/{event_id}"
-    response = requests.get(base_url)
-    if response.status_code != 200:
-        print(f"Failed to fetch event details for event ID: {event_id}. Status code: {response.status_code}")
+    client = AESClient(event_id)
+    try:
+        event_data = client.event()
+    except AESRequestError as e:
+        print(f"Failed to fetch event details for event ID: {event_id}. Status code: {e.status_code}")
         return
     
-    event_data = response.json()
     event_name = event_data.get("Name", f"Event_{event_id}")
     event_date = event_data.get("StartDate", "Unknown Date").split("T")[0]
     print(f"Processing {event_name}")
@@ -32,26 +45,30 @@ def process_event(event_url, increment_code=False):
     # Get all division IDs for this event
     division_ids = [division["DivisionId"] for division in event_data.get("Divisions", [])]
     
-    # Fetch standings for each division
+    # Fetch standings for each division (finished divisions come from the store when incremental)
+    standings_by_division, changed_divisions = standings_store.refresh(
+        client, division_ids,
+        event_final=has_ended(event_data.get("EndDate")),
+        incremental=incremental_refresh)
+    record_aes_event(warehouse, event_id, event_data, standings_by_division)
+    existing_files = list(Path("US Club Rankings", "data").glob(f"*_{event_id}_standings*.csv"))
+    if incremental_refresh and not changed_divisions and existing_files:
+        print(f"No standings changed for {event_name}; keeping existing files")
+        return
+
     teams = []
-    for division_id in division_ids:
-        standings_url = f"https://results.advancedeventsystems.com/odata/{event_id}/standings(dId={division_id},cId=null,tIds=[])?$orderby=OverallRank,FinishRank,TeamName,TeamCode"
-        response = requests.get(standings_url)
-        if response.status_code == 200:
-            standings_data = response.json()
-            teams.extend([
-            {
-                "DivisionName": team["Division"]["Name"],
-                "FinishRank": f"{team['FinishRank']}",
-                "TeamName": team["TeamText"],
-                "TeamCode": team["TeamCode"],
-            }
-            for team in standings_data.get("value", [])
-            if team.get("TeamCode") and str(team.get("TeamCode")).strip() not in ['', 'None', 'null']
-            and team.get("FinishRank") != 'None'
-            ])
-        else:
-            print(f"Failed to fetch standings for division ID: {division_id}. Status code: {response.status_code}")
+    for standings in standings_by_division.values():
+        teams.extend([
+        {
+            "DivisionName": team["Division"]["Name"],
+            "FinishRank": f"{team['FinishRank']}",
+            "TeamName": team["TeamText"],
+            "TeamCode": team["TeamCode"],
+        }
+        for team in standings
+        if team.get("TeamCode") and str(team.get("TeamCode")).strip() not in ['', 'None', 'null']
+        and team.get("FinishRank") != 'None'
+        ])
             
     event_data = pd.DataFrame(teams)
     event_name_sanitized = re.sub(r'[<>:"/\\|?*]', '', event_name)  # Remove invalid characters
@@ -121,4 +138,6 @@ def process_event(event_url, increment_code=False):
 
 # Process first list of event IDs
 for event_url in event_urls:
-    process_event(event_url)
\ No newline at end of file
+    process_event(event_url)
+
+write_report(fetch_report_path)
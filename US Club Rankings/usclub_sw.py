@@ -1,11 +1,24 @@
+import sys
+from pathlib import Path
 from scrapling import StealthyFetcher
 import pandas as pd
 from bs4 import BeautifulSoup
 import json
 import re
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.esw_client import division_finish_ranks
+from common.fetch_metrics import write_report
+from common.http_cache import HttpCache
+from common.resilience import fetch_page
+from common.warehouse import ESW_SOURCE, get_warehouse
+
 fetcher = StealthyFetcher(auto_match=False)
+cache = HttpCache()
+warehouse = get_warehouse()
 sportwrench_data = pd.DataFrame()
+# Per-endpoint fetch metrics of the run are written here (.json and .md)
+fetch_report_path = "US Club Rankings/data/sw_fetch_report"
 
 # Sportwrench Event URLs
 sw_event_urls = [
@@ -16,22 +29,44 @@ sw_event_urls = [
 ]
 
 
+def fetch_json_text(url, cache_scope):
+    """
+    Returns the JSON text of an esw API page, served from the disk cache when fresh.
+
+    Args:
+        url (str): The esw API URL.
+        cache_scope (str): Cache scope of the event the URL belongs to.
+
+    Returns:
+        tuple: (status code, JSON text or None).
+    """
+    cached = cache.load("GET", url)
+    if cached is not None:
+        return 200, cached.decode("utf-8")
+
+    page = fetch_page(fetcher, url)
+    if page.status != 200:
+        return page.status, None
+    soup = BeautifulSoup(page.html_content, "html.parser")
+    json_text = soup.find("pre").text
+    cache.store("GET", url, json_text, scope=cache_scope)
+    return 200, json_text
+
+
 def process_event(url):
     df = pd.DataFrame() # create empty dataframe for each event
     event_id = url.rsplit("/", 1)[-1]
     
     # Define the base API endpoint for the event 
     base_url = f"https://events.sportwrench.com/api/esw/{event_id}"
+    cache_scope = f"esw:{event_id}"
     
-    page = fetcher.fetch(base_url)
-    if (page.status != 200):
+    status, json_text = fetch_json_text(base_url, cache_scope)
+    if (status != 200):
         print(f"Failed to fetch event details for event ID: {
-              event_id}. Status code: {page.status}")
+              event_id}. Status code: {status}")
         return pd.DataFrame()
 
-    soup = BeautifulSoup(page.html_content, "html.parser")
-    json_text = soup.find("pre").text
-    
     try:
         data = json.loads(json_text)  # this converts the text into a Python dict
     except json.JSONDecodeError as e:
@@ -40,14 +75,16 @@ def process_event(url):
 
     event_name = data.get('long_name')
     event_date = data.get('date_start').replace("/", "-")
+    cache.record_event_end(cache_scope, data.get('date_end'))
     print(f"Processing {event_name} / ID: {event_id}")
     
+    warehouse_key = warehouse.record_event(
+        ESW_SOURCE, event_id, event_name, data.get('date_start'), data.get('date_end'))
+
     #Get all divisions and IDs for event
     division_url = f"https://events.sportwrench.com/api/esw/{event_id}/divisions"
-    div_page = fetcher.fetch(division_url)
-    if (div_page.status == 200):
-        div_soup = BeautifulSoup(div_page.html_content, "html.parser")
-        json_text = div_soup.find("pre").text
+    status, json_text = fetch_json_text(division_url, cache_scope)
+    if (status == 200):
         try:
             div_data = json.loads(json_text) 
         except json.JSONDecodeError as e:
@@ -58,10 +95,8 @@ def process_event(url):
         
         for division_id in division_ids:
             standings_url =f"https://events.sportwrench.com/api/esw/{event_id}/divisions/{division_id}/standings"
-            standings_page = fetcher.fetch(standings_url)
-            if (standings_page.status == 200):
-                standings_soup = BeautifulSoup(standings_page.html_content, "html.parser")
-                json_text = standings_soup.find("pre").text
+            status, json_text = fetch_json_text(standings_url, cache_scope)
+            if (status == 200):
                 try:
                     standings_data = json.loads(json_text) 
                 except json.JSONDecodeError as e:
@@ -79,6 +114,20 @@ def process_event(url):
                             "Team Code": team["organization_code"].lower(),
                          })
                 df = pd.concat([df, pd.DataFrame(teams_list)], ignore_index=True)
+                # Finishes are stored only when the payload carries a division-wide rank
+                finish_ranks = {id(team): rank for team, rank in division_finish_ranks(standings_data) or []}
+                warehouse.record_standings(warehouse_key, [
+                    {
+                        "DivisionId": division_id,
+                        "DivisionName": team["division_name"],
+                        "TeamId": team.get("team_id"),
+                        "TeamCode": team["organization_code"],
+                        "TeamName": team["team_name"],
+                        "FinishRank": finish_ranks.get(id(team)),
+                    }
+                    for teams in standings_data["teams"].values()
+                    for team in teams
+                ])
     
     event_name_sanitized = re.sub(r'[<>:"/\\|?*]', '', event_name)  # Remove invalid characters
     df.to_csv(f'US Club Rankings\data\{event_date}_{event_name_sanitized}_{event_id}_standings.csv', index=False, header=False)
@@ -86,4 +135,6 @@ def process_event(url):
 
 # Process URLs in Sportwrench list    
 for url in sw_event_urls:
-    process_event(url)
\ No newline at end of file
+    process_event(url)
+
+write_report(fetch_report_path)
@@ -1,8 +1,22 @@
-import requests
-import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 import pandas as pd
 import re
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.fetch_metrics import write_report
+from common.session import get_session
+from common.warehouse import VBSCHEDULE_SOURCE, get_warehouse
+
+session = get_session()
+warehouse = get_warehouse()
+
+# Parallel division team requests (capped per host by the adaptive limit in common.throttle)
+division_workers = 8
+# Per-endpoint fetch metrics of the run are written here (.json and .md)
+fetch_report_path = "US Club Rankings/data/vbschedule_fetch_report"
+
 # List of event URLs to process
 event_urls = [
     "https://vbschedule.com/app/results/event/97/divisions",
@@ -24,8 +38,9 @@ def process_event(event_url):
     # API endpoint for event details
     api_url = f"https://api.vbschedule.com/results/event/{event_id}"
     
-    # Make the API call
-    response = requests.get(api_url)
+    # Make the API call; responses are cached per event until it has finished
+    cache_scope = f"vbschedule:{event_id}"
+    response = session.get(api_url, scope=cache_scope)
     
     if response.status_code != 200:
         print(f"Failed to fetch event data for event ID: {event_id}. Status code: {response.status_code}")
@@ -41,6 +56,7 @@ def process_event(event_url):
     event_name = event_info.get("name", f"Event_{event_id}")
     event_dates = event_info.get("event_dates", [])
     event_date = event_dates[0] if event_dates else "Unknown_Date"
+    session.record_event_end(cache_scope, event_dates[-1] if event_dates else None)
     
     print(f"Processing: {event_name}")
     
@@ -61,12 +77,17 @@ def process_event(event_url):
     
     # Now fetch teams for each division
     all_teams = []
+    warehouse_rows = []
     
-    for division_id in division_ids:
+    def fetch_division_teams(division_id):
         teams_url = f"https://api.vbschedule.com/results/event-division/{division_id}/teams"
         print(f"Fetching teams for division {division_id} ({division_names[division_id]})...")
-        
-        teams_response = requests.get(teams_url)
+        return session.get(teams_url, scope=cache_scope)
+
+    with ThreadPoolExecutor(max_workers=division_workers) as executor:
+        teams_responses = list(executor.map(fetch_division_teams, division_ids))
+
+    for division_id, teams_response in zip(division_ids, teams_responses):
         if teams_response.status_code == 200:
             teams_data = teams_response.json()
             teams = teams_data.get("teams", [])
@@ -85,11 +106,23 @@ def process_event(event_url):
                     "TeamName": team.get("name"),
                     "AlternateIdentifier": alternate_id.lower()
                 })
+                warehouse_rows.append({
+                    "DivisionId": division_id,
+                    "DivisionName": division_names[division_id],
+                    "TeamId": team.get("id"),
+                    "TeamCode": alternate_id,
+                    "TeamName": team.get("name"),
+                    "FinishRank": final_finish,
+                })
             
             print(f"Found {len(teams)} teams in {division_names[division_id]}")
         else:
             print(f"Failed to fetch teams for division {division_id}. Status code: {teams_response.status_code}")
     
+    warehouse.record_standings(warehouse.record_event(
+        VBSCHEDULE_SOURCE, event_id, event_name,
+        event_dates[0] if event_dates else None, event_dates[-1] if event_dates else None), warehouse_rows)
+
     # Create DataFrame
     teams_df = pd.DataFrame(all_teams)
     
@@ -110,4 +143,6 @@ def process_event(event_url):
 
 # Process all events
 for event_url in event_urls:
-    process_event(event_url)
\ No newline at end of file
+    process_event(event_url)
+
+write_report(fetch_report_path)
@@ -0,0 +1,5 @@
+"""Shared helpers used by the scraping scripts in this repository.
+
+Scripts live in folders with spaces in their names, so they are not packages.
+Each script adds the repository root to ``sys.path`` before importing from here.
+"""
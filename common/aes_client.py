@@ -0,0 +1,178 @@
+"""Client for the AES (results.advancedeventsystems.com) results API.
+
+Every script used to call ``requests.get`` directly, which opened a new
+TCP+TLS connection per URL. All AES calls now go through the shared pooled
+session from ``common.session`` so connections are kept alive and reused
+across events, and responses of finished events are served from disk.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from common.resilience import RETRY_EXCEPTIONS
+from common.session import get_session
+
+AES_BASE_URL = "https://results.advancedeventsystems.com"
+STANDINGS_ORDER_BY = "OverallRank,FinishRank,TeamName,TeamCode"
+
+# Worker threads used when fanning out per-team schedule requests
+DEFAULT_SCHEDULE_WORKERS = 16
+
+# Status codes with which a standings query refuses its tIds/cId filter
+FILTER_REFUSED_STATUSES = {400, 404, 501}
+
+
+class AESRequestError(Exception):
+    """
+    Raised when the AES API answers with a non-200 status code, or not at all.
+
+    ``status_code`` is None when every attempt timed out or failed to connect.
+    """
+
+    def __init__(self, url, status_code, reason=None):
+        super().__init__(f"AES request failed ({reason or status_code}): {url}")
+        self.url = url
+        self.status_code = status_code
+
+
+def event_id_from_url(url):
+    """
+    Extracts the AES event ID from a results URL.
+
+    Args:
+        url (str): URL like https://results.advancedeventsystems.com/event/<id>
+
+    Returns:
+        str: The event ID, or None if the URL does not match.
+    """
+    match = re.search(r'/event/([^/]+)$', url)
+    return match.group(1) if match else None
+
+
+class AESClient:
+    """
+    Typed access to the AES endpoints used by the scripts for one event.
+
+    Args:
+        event_id (str): The AES event ID.
+        session (CachedSession): Optional session; defaults to the shared one.
+        hedge_after (float): Seconds after which a slow standings or
+            ``schedule/past`` request gets a duplicate; None disables hedging.
+    """
+
+    def __init__(self, event_id, session=None, hedge_after=None):
+        self.event_id = event_id
+        self.session = session or get_session()
+        # The per-team fan-outs are where the slowest responses hold a run up
+        self.hedge_after = hedge_after
+        # None until a team-filtered standings query shows whether tIds is honored
+        self.team_filter_supported = None
+
+    @classmethod
+    def from_url(cls, url, session=None, hedge_after=None):
+        return cls(event_id_from_url(url), session=session, hedge_after=hedge_after)
+
+    def _get_json(self, url, hedge_after=None):
+        try:
+            response = self.session.get(url, scope=self.event_id, hedge_after=hedge_after)
+        except RETRY_EXCEPTIONS as e:
+            raise AESRequestError(url, None, reason=type(e).__name__) from e
+        if response.status_code != 200:
+            raise AESRequestError(url, response.status_code)
+        return response.json()
+
+    def event(self):
+        """Event details, including ``Name``, ``StartDate`` and ``Divisions``."""
+        event_data = self._get_json(f"{AES_BASE_URL}/api/event/{self.event_id}")
+        # Once an event is over its responses are cached permanently
+        self.session.record_event_end(self.event_id, event_data.get("EndDate"))
+        return event_data
+
+    def standings(self, division_id, team_ids=None, club_id=None):
+        """
+        List of team standings rows for a division.
+
+        Args:
+            division_id (int): The division ID.
+            team_ids (list): Only return these teams (the ``tIds`` filter).
+            club_id (int): Only return this club's teams (the ``cId`` filter).
+        """
+        team_filter = ",".join(str(team_id) for team_id in team_ids or [])
+        club_filter = "null" if club_id is None else club_id
+        url = (
+            f"{AES_BASE_URL}/odata/{self.event_id}/standings"
+            f"(dId={division_id},cId={club_filter},tIds=[{team_filter}])?$orderby={STANDINGS_ORDER_BY}"
+        )
+        return self._get_json(url, hedge_after=self.hedge_after).get("value", [])
+
+    def team_standings(self, division_id, team_ids):
+        """
+        Standings rows of selected teams, filtered by the server when it can.
+
+        Falls back to the full division, filtered here, when the ``tIds``
+        query is refused or comes back with teams that were not asked for.
+
+        Args:
+            division_id (int): The division ID.
+            team_ids (list): AES team IDs in the division.
+
+        Returns:
+            list: Standings rows of the requested teams.
+        """
+        wanted = {str(team_id) for team_id in team_ids}
+        if self.team_filter_supported is not False:
+            try:
+                rows = self.standings(division_id, team_ids=sorted(wanted))
+            except AESRequestError as e:
+                if e.status_code not in FILTER_REFUSED_STATUSES:
+                    raise
+                self.team_filter_supported = False
+            else:
+                self.team_filter_supported = all(str(row.get("TeamId")) in wanted for row in rows)
+                # An ignored filter returns the whole division, which already holds the teams
+                return [row for row in rows if str(row.get("TeamId")) in wanted]
+        return [row for row in self.standings(division_id) if str(row.get("TeamId")) in wanted]
+
+    def team_schedule_past(self, division_id, team_id):
+        """Completed matches for one team, as returned by ``schedule/past``."""
+        url = (
+            f"{AES_BASE_URL}/api/event/{self.event_id}/division/{division_id}"
+            f"/team/{team_id}/schedule/past"
+        )
+        return self._get_json(url, hedge_after=self.hedge_after)
+
+    def team_schedules_past(self, teams, max_workers=DEFAULT_SCHEDULE_WORKERS, return_exceptions=False):
+        """
+        Fetches ``schedule/past`` for many teams in parallel.
+
+        Args:
+            teams (list): (division_id, team_id) pairs.
+            max_workers (int): Number of requests allowed to run at once.
+            return_exceptions (bool): Put the AESRequestError of a team that
+                failed (after retries) in its place instead of raising it.
+
+        Returns:
+            list: One schedule per pair, in the same order as ``teams``.
+
+        Raises:
+            AESRequestError: For the first team (in input order) that failed,
+                unless ``return_exceptions`` is set.
+        """
+        def fetch(team):
+            try:
+                return self.team_schedule_past(*team)
+            except AESRequestError as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(fetch, teams))
+
+    def plays(self, division_id, date):
+        """Pools and brackets played in a division on ``date`` (YYYY-MM-DD)."""
+        url = f"{AES_BASE_URL}/api/event/{self.event_id}/division/{division_id}/plays/{date}"
+        return self._get_json(url)
+
+    def poolsheet(self, play_id):
+        """Pool sheet (teams and matches) for a pool play."""
+        return self._get_json(f"{AES_BASE_URL}/api/event/{self.event_id}/poolsheet/{play_id}")
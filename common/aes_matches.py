@@ -0,0 +1,271 @@
+"""Builds the set of played matches for an AES event.
+
+Per-team ``schedule/past`` returns every match once for each team that played
+in it, so crawling it downloads each match at least twice. The division-level
+``plays/{date}`` and ``poolsheet/{play_id}`` endpoints return whole pools and
+brackets instead, so each match is fetched once. Per-team requests are only
+made for teams that do not appear in any pool or bracket match, or whose
+division's plays could not be fetched.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from common.aes_client import DEFAULT_SCHEDULE_WORKERS, AESRequestError
+
+# Match ingestion modes accepted by fetch_event_matches
+DIVISION_SOURCE = "division"
+TEAM_SOURCE = "team"
+
+# Status with which plays/{date} answers for a day the division does not play
+NO_PLAYS_STATUS = 404
+
+
+def event_dates(event_data):
+    """
+    Lists every day of an event as YYYY-MM-DD strings.
+
+    Args:
+        event_data (dict): Payload returned by ``AESClient.event()``.
+
+    Returns:
+        list: Dates from StartDate through EndDate (inclusive).
+    """
+    start_text = (event_data.get("StartDate") or "").split("T")[0]
+    end_text = (event_data.get("EndDate") or start_text).split("T")[0]
+    try:
+        start = date.fromisoformat(start_text)
+        end = date.fromisoformat(end_text)
+    except ValueError:
+        return []
+    return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+
+def play_name(play):
+    """Display name of a pool or bracket play (e.g. "Pool 3", "Gold Bracket")."""
+    play = play or {}
+    return play.get("FullName") or play.get("Name") or play.get("ShortName")
+
+
+def court_name(court):
+    """Display name of a match court, or None when unassigned."""
+    if isinstance(court, dict):
+        return court.get("Name") or court.get("ShortName")
+    return court
+
+
+def _match_team(match, side):
+    """
+    (team ID, name) of the ``"First"`` or ``"Second"`` team of a match.
+
+    Poolsheet matches carry flat ``FirstTeamId``/``FirstTeamName`` keys, bracket
+    matches a ``FirstTeam`` object instead (None until the team is known).
+    """
+    team = match.get(f"{side}Team") or {}
+    team_id = match.get(f"{side}TeamId")
+    if team_id is None:
+        team_id = team.get("TeamId")
+    name = match.get(f"{side}TeamName") or team.get("Name") or match.get(f"{side}TeamText")
+    return team_id, name
+
+
+def normalize_match(match, division_id=None, round_name=None):
+    """
+    Converts a pool or bracket match into the ``schedule/past`` match shape.
+
+    Args:
+        match (dict): Match object from a poolsheet or bracket node.
+        division_id (int): Division the match belongs to, if known.
+        round_name (str): Pool or bracket the match was played in, if known.
+
+    Returns:
+        dict: Match with MatchId, team IDs/names, FirstTeamWon, Sets,
+            ScheduledStartDateTime, DivisionId, Round and Court, or None if
+            it has not been played to a result yet.
+    """
+    if not match or match.get("MatchId") is None:
+        return None
+    first_team_id, first_team_name = _match_team(match, "First")
+    second_team_id, second_team_name = _match_team(match, "Second")
+    if first_team_id is None or second_team_id is None:
+        return None
+
+    sets = []
+    for set_data in match.get("Sets") or []:
+        score_text = set_data.get("ScoreText")
+        if not score_text and set_data.get("FirstTeamScore") is not None:
+            score_text = f"{set_data['FirstTeamScore']}-{set_data.get('SecondTeamScore')}"
+        sets.append({"ScoreText": score_text or ""})
+    if not any(set_data["ScoreText"] for set_data in sets):
+        return None
+
+    # A match in progress has scores but no winner yet
+    first_team_won = bool(match.get("FirstTeamWon"))
+    if first_team_won == bool(match.get("SecondTeamWon")):
+        return None
+
+    return {
+        "MatchId": match["MatchId"],
+        "FirstTeamId": first_team_id,
+        "FirstTeamName": first_team_name,
+        "FirstTeamWon": first_team_won,
+        "SecondTeamId": second_team_id,
+        "SecondTeamName": second_team_name,
+        "Sets": sets,
+        "ScheduledStartDateTime": match.get("ScheduledStartDateTime", ""),
+        "DivisionId": division_id,
+        "Round": round_name,
+        "Court": court_name(match.get("Court")),
+    }
+
+
+def iter_bracket_matches(node):
+    """Yields every match in a bracket tree, walking TopSource/BottomSource."""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if not isinstance(current, dict):
+            continue
+        if "Match" in current:
+            yield current["Match"]
+        # Push bottom first so the top half is visited first
+        stack.append(current.get("BottomSource"))
+        stack.append(current.get("TopSource"))
+
+
+def _division_plays(client, division_id, dates):
+    """Plays of a division on every date, or None if any day failed to load."""
+    plays = []
+    for play_date in dates:
+        try:
+            plays.extend(client.plays(division_id, play_date) or [])
+        except AESRequestError as e:
+            if e.status_code == NO_PLAYS_STATUS:
+                continue
+            print(f"Failed to fetch plays for division {division_id} on {play_date}: {e}")
+            return None
+    return plays
+
+
+def collect_division_matches(client, event_data, max_workers=DEFAULT_SCHEDULE_WORKERS):
+    """
+    Collects played matches from every pool and bracket in the event.
+
+    Args:
+        client (AESClient): Client for the event.
+        event_data (dict): Payload returned by ``client.event()``.
+        max_workers (int): Number of requests allowed to run at once.
+
+    Returns:
+        tuple: (matches, failed_division_ids). Matches are normalized,
+            de-duplicated by MatchId, in division/day order. A division whose
+            plays or a pool sheet could not be fetched is listed in
+            ``failed_division_ids``; its matches may be incomplete.
+    """
+    dates = event_dates(event_data)
+    division_ids = [division["DivisionId"] for division in event_data.get("Divisions", [])]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        division_plays = list(executor.map(
+            lambda division_id: _division_plays(client, division_id, dates), division_ids))
+
+        pool_ids = []
+        for plays in division_plays:
+            for play in plays or []:
+                if "Teams" in play and "Roots" not in play and play.get("PlayId") not in pool_ids:
+                    pool_ids.append(play.get("PlayId"))
+
+        def fetch_pool(play_id):
+            try:
+                return client.poolsheet(play_id)
+            except AESRequestError as e:
+                print(f"Failed to fetch pool sheet {play_id}: {e}")
+                return None
+
+        poolsheets = dict(zip(pool_ids, executor.map(fetch_pool, pool_ids)))
+
+    matches = {}
+    failed_division_ids = set()
+    for division_id, plays in zip(division_ids, division_plays):
+        if plays is None:
+            failed_division_ids.add(division_id)
+            continue
+        for play in plays:
+            if "Roots" in play:
+                raw_matches = [m for root in play.get("Roots") or [] for m in iter_bracket_matches(root)]
+            elif play.get("PlayId") in poolsheets:
+                poolsheet = poolsheets[play.get("PlayId")]
+                if poolsheet is None:
+                    failed_division_ids.add(division_id)
+                    continue
+                raw_matches = poolsheet.get("Matches", [])
+            else:
+                # Placeholder plays (no teams assigned yet) have no pool sheet
+                continue
+            for raw_match in raw_matches:
+                match = normalize_match(raw_match, division_id, play_name(play))
+                if match and match["MatchId"] not in matches:
+                    matches[match["MatchId"]] = match
+    return list(matches.values()), failed_division_ids
+
+
+def fetch_event_matches(client, event_data, teams, source=DIVISION_SOURCE,
+                        max_workers=DEFAULT_SCHEDULE_WORKERS, return_failures=False):
+    """
+    Returns every played match of an event, each exactly once.
+
+    Args:
+        client (AESClient): Client for the event.
+        event_data (dict): Payload returned by ``client.event()``.
+        teams (list): (division_id, team_id) pairs from the standings.
+        source (str): ``"division"`` to read pools and brackets first, or
+            ``"team"`` to crawl every team's ``schedule/past``.
+        max_workers (int): Number of requests allowed to run at once.
+        return_failures (bool): Also return the teams whose schedule failed.
+
+    Returns:
+        list: Matches in the ``schedule/past`` shape, de-duplicated by MatchId,
+            with DivisionId, Round and Court added. A team whose schedule
+            still fails after retries is reported and skipped; its matches
+            are usually still found through its opponents' schedules. With
+            ``return_failures``, a tuple (matches, failed (division_id,
+            team_id) pairs) instead.
+    """
+    matches = {}
+    failed_division_ids = set()
+    if source == DIVISION_SOURCE:
+        division_matches, failed_division_ids = collect_division_matches(
+            client, event_data, max_workers=max_workers)
+        for match in division_matches:
+            matches[match["MatchId"]] = match
+
+    covered_team_ids = set()
+    for match in matches.values():
+        covered_team_ids.update((match["FirstTeamId"], match["SecondTeamId"]))
+    # Teams of a division that failed to load may be missing matches even when
+    # they show up in another division's pools
+    fallback_teams = [
+        team for team in teams
+        if team[0] in failed_division_ids or team[1] not in covered_team_ids
+    ]
+    if source == DIVISION_SOURCE and fallback_teams:
+        print(f"Falling back to per-team schedules for {len(fallback_teams)} teams")
+
+    failed_teams = []
+    schedules = client.team_schedules_past(fallback_teams, max_workers=max_workers, return_exceptions=True)
+    for (division_id, team_id), schedule in zip(fallback_teams, schedules):
+        if isinstance(schedule, AESRequestError):
+            print(f"Failed to fetch schedule for team {team_id} in division {division_id}: {schedule}")
+            failed_teams.append((division_id, team_id))
+            continue
+        for match_data in schedule:
+            match = match_data["Match"]
+            if match["MatchId"] not in matches:
+                matches[match["MatchId"]] = dict(
+                    match,
+                    DivisionId=division_id,
+                    Round=play_name(match_data.get("Play")),
+                    Court=court_name(match_data.get("Court") or match.get("Court")),
+                )
+    if return_failures:
+        return list(matches.values()), failed_teams
+    return list(matches.values())
@@ -0,0 +1,116 @@
+"""Durable per-task checkpoints for long scrapes.
+
+A run appends one JSON line per finished task (event, division or team) to a
+checkpoint file and flushes it to disk straight away, so a crash, a network
+outage or Ctrl-C loses at most the tasks still in flight. A resumed run loads
+the file, skips every task it lists and rebuilds its output from the stored
+rows. A half-written last line (the process died mid-write) is ignored.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+# Records of another version (e.g. keyed by division position) are ignored
+CHECKPOINT_VERSION = 2
+
+
+def _key(key):
+    return tuple(key)
+
+
+class RunCheckpoint:
+    """
+    Finished tasks of a run, keyed by tuples such as ("aes", url, division_id).
+
+    Key tasks by stable IDs rather than list positions: the event's division
+    list can change between the interrupted run and the resumed one.
+
+    Args:
+        path (Path): Checkpoint file (JSON lines).
+        resume (bool): Keep and load the tasks of the previous run; otherwise
+            the file is started over.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self._records = {}
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.path.exists():
+            self._load()
+        else:
+            self.path.write_text("", encoding="utf-8")
+
+    def _load(self):
+        valid_end = 0
+        with open(self.path, "rb") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Only the last line can be cut short; nothing after it was written
+                    break
+                valid_end += len(line)
+                if record.get("version") == CHECKPOINT_VERSION:
+                    self._records[_key(record["key"])] = record
+        # Drop a torn last line so new records do not get appended to it
+        if valid_end < self.path.stat().st_size:
+            with open(self.path, "r+b") as handle:
+                handle.truncate(valid_end)
+
+    def __len__(self):
+        return len(self._records)
+
+    def done(self, key):
+        return _key(key) in self._records
+
+    def info(self, key):
+        """Extra values stored with a finished task, or None if it has not finished."""
+        record = self._records.get(_key(key))
+        return None if record is None else record["info"]
+
+    def is_complete(self, key):
+        """True when the task and every child task it queued have finished."""
+        record = self._records.get(_key(key))
+        return record is not None and all(self.done(child) for child in record["info"].get("children", []))
+
+    def frame(self, key):
+        """Rows stored with a finished task, or None if it stored none."""
+        record = self._records.get(_key(key))
+        if record is None or record["rows"] is None:
+            return None
+        return pd.DataFrame(record["rows"]["data"], columns=record["rows"]["columns"])
+
+    def items(self):
+        """(key, info) of every finished task."""
+        return [(key, record["info"]) for key, record in self._records.items()]
+
+    def record(self, key, rows=None, **info):
+        """
+        Marks a task finished and writes it to disk before returning.
+
+        Args:
+            key (tuple): The task's key (JSON-serializable parts).
+            rows (pd.DataFrame): Output of the task, if any.
+            **info: Extra JSON-serializable values, e.g. ``children`` (keys
+                of the tasks it queued).
+        """
+        record = {
+            "version": CHECKPOINT_VERSION,
+            "key": list(key),
+            "rows": None if rows is None else {
+                "columns": list(rows.columns),
+                "data": json.loads(rows.to_json(orient="values", date_format="iso")),
+            },
+            "info": info,
+        }
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._records[_key(key)] = record
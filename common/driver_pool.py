@@ -0,0 +1,183 @@
+"""Pool of reusable headless Chrome drivers for the SportWrench scrapers.
+
+Booting Chrome takes seconds, and the scrapers used to boot one browser per
+division. A pool starts a few drivers once, hands them to event and division
+jobs running in parallel, and puts each driver back for the next job.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from common.resilience import PAGE_TIMEOUT
+
+CHROMEDRIVER_PATH = r"C:\Git Repos\chromedriver-win64\chromedriver.exe"
+DEFAULT_POOL_SIZE = 4
+
+# Returns the trimmed text of every cell of every matching row in one call
+_TABLE_CELLS_SCRIPT = """
+return Array.from(document.querySelectorAll(arguments[0])).map(
+    row => Array.from(row.querySelectorAll("td")).map(cell => cell.innerText.trim())
+);
+"""
+
+
+def new_chrome_driver(headless=True):
+    """Starts a Chrome driver with the options the scrapers have always used."""
+    chrome_options = Options()
+    chrome_options.add_argument("--enable-javascript")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--enable-unsafe-swiftshader")
+    if headless:
+        chrome_options.add_argument("--headless=new")
+
+    service = Service(CHROMEDRIVER_PATH)
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # A hung page load raises TimeoutException instead of blocking the job forever
+    driver.set_page_load_timeout(PAGE_TIMEOUT)
+    return driver
+
+
+def load_page(driver, url):
+    """
+    Opens ``url`` in a driver that may still show a previous job's page.
+
+    SportWrench is a single-page app: two of its URLs that differ only after
+    the ``#`` load as an in-page navigation, and the previous page's elements
+    would satisfy the next wait straight away. Going through ``about:blank``
+    first makes every load start from an empty document.
+    """
+    driver.get("about:blank")
+    driver.get(url)
+
+
+def read_table_cells(driver, row_selector="table tr"):
+    """
+    Reads the cell texts of a rendered table with a single WebDriver call.
+
+    Walking rows with ``find_elements`` and reading ``.text`` per cell costs
+    one round trip per cell; this runs the walk inside the page instead.
+
+    Args:
+        driver (WebDriver): Driver with the page already loaded.
+        row_selector (str): CSS selector matching the table rows.
+
+    Returns:
+        list: One list of cell strings per row, header row included.
+    """
+    return driver.execute_script(_TABLE_CELLS_SCRIPT, row_selector) or []
+
+
+class DriverPool:
+    """
+    Fixed-size pool of Chrome drivers, started on first use and reused.
+
+    Args:
+        size (int): Maximum number of drivers (and parallel jobs).
+        headless (bool): Run Chrome without a window.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, headless=True):
+        self.size = size
+        self.headless = headless
+        self._idle = queue.Queue()
+        self._all = []
+        self._started = 0
+        self._lock = threading.Lock()
+
+    def _start_driver(self):
+        try:
+            driver = new_chrome_driver(self.headless)
+        except WebDriverException:
+            # Hand the slot back so waiting jobs can try again
+            self._idle.put(None)
+            raise
+        with self._lock:
+            self._all.append(driver)
+        return driver
+
+    def _acquire(self):
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_start = self._started < self.size
+                if can_start:
+                    self._started += 1
+            driver = None if can_start else self._idle.get()
+        # None is a free slot left behind by a crashed driver (or a new one)
+        return driver if driver is not None else self._start_driver()
+
+    def _release(self, driver):
+        try:
+            # Cheap round trip that fails if the browser crashed during the job
+            driver.current_url
+        except WebDriverException:
+            with self._lock:
+                self._all.remove(driver)
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+            self._idle.put(None)
+            return
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self):
+        """Borrows a driver for the duration of the ``with`` block."""
+        driver = self._acquire()
+        try:
+            yield driver
+        finally:
+            self._release(driver)
+
+    def map(self, job, items, default=None):
+        """
+        Runs ``job(driver, item)`` for every item, in parallel across the pool.
+
+        Args:
+            job (callable): Called with a borrowed driver and one item.
+            items (list): Items to run the job for.
+            default: Result of an item whose driver failed to start, e.g. the
+                job's own empty result.
+
+        Returns:
+            list: Job results in the same order as ``items``.
+        """
+        def run(item):
+            try:
+                driver = self._acquire()
+            except WebDriverException as e:
+                # Like a failed job: the other items keep going
+                print(f"Failed to start Chrome for {item}: {e}")
+                return default
+            try:
+                return job(driver, item)
+            finally:
+                self._release(driver)
+
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(run, items))
+
+    def close(self):
+        with self._lock:
+            drivers, self._all = self._all, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
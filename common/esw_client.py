@@ -0,0 +1,139 @@
+"""Client for the SportWrench esw JSON API (events.sportwrench.com/api/esw).
+
+The SportWrench event pages are an Angular app that reads these endpoints, so
+rendering them in a browser only to scrape the tables back out is avoidable.
+Requests go through the shared pooled session and disk cache like AES calls.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from common.resilience import RETRY_EXCEPTIONS
+from common.session import get_session
+
+ESW_BASE_URL = "https://events.sportwrench.com/api/esw"
+
+# Worker threads used when fanning out per-division standings requests
+DEFAULT_DIVISION_WORKERS = 4
+
+
+class ESWRequestError(Exception):
+    """
+    Raised when the esw API refuses a request, answers with non-JSON, or not at all.
+
+    ``status_code`` is None when every attempt timed out or failed to connect.
+    """
+
+    def __init__(self, url, status_code, reason=None):
+        super().__init__(f"esw request failed ({reason or status_code}): {url}")
+        self.url = url
+        self.status_code = status_code
+
+
+def esw_event_id_from_url(url):
+    """
+    Extracts the SportWrench event ID from an event URL.
+
+    Args:
+        url (str): URL like https://events.sportwrench.com/#/events/<id>
+
+    Returns:
+        str: The event ID, or None if the URL does not match.
+    """
+    match = re.search(r"events/([a-z0-9]+)", url)
+    return match.group(1) if match else None
+
+
+def division_finish_ranks(standings_data):
+    """
+    Pairs each team of an esw standings payload with its division finish.
+
+    The payload's ``teams`` are grouped (by pool or bracket) and the ``rank``
+    field is not confirmed to be a division-wide finish rather than a place
+    within its group, so ranks are only used when the payload is a single
+    group whose ranks run 1..n without gaps or ties.
+
+    Args:
+        standings_data (dict): Payload from ``ESWClient.standings``.
+
+    Returns:
+        list: (team, rank) pairs, an empty list if the division has no teams,
+        or None if the payload does not carry a usable division finish.
+    """
+    groups = [group for group in (standings_data.get("teams") or {}).values() if group]
+    if not groups:
+        return []
+    if len(groups) > 1:
+        return None
+    teams = groups[0]
+    try:
+        ranks = [int(team["rank"]) for team in teams]
+    except (KeyError, TypeError, ValueError):
+        return None
+    if sorted(ranks) != list(range(1, len(teams) + 1)):
+        return None
+    return list(zip(teams, ranks))
+
+
+class ESWClient:
+    """
+    Access to the esw endpoints for one SportWrench event.
+
+    Args:
+        event_id (str): The SportWrench event ID.
+        session (CachedSession): Optional session; defaults to the shared one.
+    """
+
+    def __init__(self, event_id, session=None):
+        self.event_id = event_id
+        self.session = session or get_session()
+        # Same scope the scrapling-based fetchers use for this event
+        self.cache_scope = f"esw:{event_id}"
+
+    @classmethod
+    def from_url(cls, url, session=None):
+        return cls(esw_event_id_from_url(url), session=session)
+
+    def _get_json(self, url):
+        try:
+            response = self.session.get(
+                url, scope=self.cache_scope, headers={"Accept": "application/json"}, expect_json=True)
+        except RETRY_EXCEPTIONS as e:
+            raise ESWRequestError(url, None, reason=type(e).__name__) from e
+        if response.status_code != 200:
+            raise ESWRequestError(url, response.status_code)
+        try:
+            return response.json()
+        except ValueError:
+            # Bot-protection pages come back as HTML with a 200
+            raise ESWRequestError(url, response.status_code)
+
+    def event(self):
+        """Event details, including ``long_name``, ``date_start`` and ``date_end``."""
+        event_data = self._get_json(f"{ESW_BASE_URL}/{self.event_id}")
+        self.session.record_event_end(self.cache_scope, event_data.get("date_end"))
+        return event_data
+
+    def divisions(self):
+        """List of divisions, each with ``division_id`` and ``name``."""
+        return self._get_json(f"{ESW_BASE_URL}/{self.event_id}/divisions")
+
+    def standings(self, division_id):
+        """Standings payload for a division; ``teams`` maps group -> team rows."""
+        return self._get_json(f"{ESW_BASE_URL}/{self.event_id}/divisions/{division_id}/standings")
+
+    def division_standings(self, division_ids, max_workers=DEFAULT_DIVISION_WORKERS):
+        """
+        Fetches standings for many divisions in parallel.
+
+        Args:
+            division_ids (list): Division IDs of the event.
+            max_workers (int): Number of requests allowed to run at once.
+
+        Returns:
+            list: One standings payload per division, in the same order.
+
+        Raises:
+            ESWRequestError: For the first division (in input order) that failed.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.standings, division_ids))
@@ -0,0 +1,193 @@
+"""Per-endpoint-family fetch metrics and the end-of-run report.
+
+Every request the shared session, the browser fetchers and the GraphQL
+session make is recorded against its endpoint family (AES event, standings,
+schedule/past, plays, poolsheet, esw, GraphQL, vbschedule, Jacker): request
+count, status codes, bytes, cache hits and latency. ``write_report`` turns
+that into a JSON file and a Markdown table, so a slow refresh shows which
+stage it spent its time in.
+"""
+import json
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from common import throttle
+
+# (family, host pattern, path pattern), first match wins
+ENDPOINT_FAMILIES = [
+    ("schedule/past", r"advancedeventsystems\.com$", r"/schedule/past"),
+    ("standings", r"advancedeventsystems\.com$", r"/standings\("),
+    ("plays", r"advancedeventsystems\.com$", r"/plays/"),
+    ("poolsheet", r"advancedeventsystems\.com$", r"/poolsheet/"),
+    ("event", r"advancedeventsystems\.com$", r"^/api/event/[^/]+/?$"),
+    ("graphql", r"sportwrench\.com$", r"/graphql"),
+    ("esw", r"sportwrench\.com$", r"/api/esw/"),
+    ("vbschedule", r"vbschedule\.com$", r""),
+    ("jacker", r"triplecrownsports\.com$", r""),
+]
+LATENCY_PERCENTILES = (50, 90, 99)
+
+_FAMILY_PATTERNS = [
+    (family, re.compile(host_pattern), re.compile(path_pattern))
+    for family, host_pattern, path_pattern in ENDPOINT_FAMILIES
+]
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def endpoint_family(url):
+    """Endpoint family of ``url``; URLs outside the known families are grouped by host."""
+    parts = urlsplit(url)
+    for family, host_pattern, path_pattern in _FAMILY_PATTERNS:
+        if host_pattern.search(parts.netloc) and path_pattern.search(parts.path):
+            return family
+    return parts.netloc or "other"
+
+
+class _FamilyStats:
+    def __init__(self):
+        self.requests = 0
+        self.cache_hits = 0
+        self.bytes = 0
+        self.cached_bytes = 0
+        self.statuses = Counter()
+        self.latencies = []
+
+
+class FetchMetrics:
+    """Thread-safe counters for every endpoint family seen in the run."""
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def _stats(self, url):
+        family = endpoint_family(url)
+        stats = self._families.get(family)
+        if stats is None:
+            stats = self._families[family] = _FamilyStats()
+        return stats
+
+    def record_request(self, url, status, size, latency):
+        """
+        Records one request that went to the network.
+
+        Args:
+            url (str): Requested URL.
+            status: Status code, or the exception name when it failed.
+            size (int): Response body bytes.
+            latency (float): Seconds from start to full response.
+        """
+        with self._lock:
+            stats = self._stats(url)
+            stats.requests += 1
+            stats.statuses[str(status)] += 1
+            stats.bytes += size
+            stats.latencies.append(latency)
+
+    def record_cache_hit(self, url, size):
+        """Records a response served from the disk cache without a request (a 304 counts as a request)."""
+        with self._lock:
+            stats = self._stats(url)
+            stats.cache_hits += 1
+            stats.cached_bytes += size
+
+    def summary(self):
+        """
+        Metrics of every family.
+
+        Returns:
+            dict: family -> requests, cache_hits, cache_hit_rate, bytes,
+                cached_bytes, statuses and latency (seconds: mean, p50, p90,
+                p99, max, total).
+        """
+        with self._lock:
+            families = {}
+            for family, stats in sorted(self._families.items()):
+                lookups = stats.requests + stats.cache_hits
+                latency = {}
+                if stats.latencies:
+                    values = np.array(stats.latencies)
+                    latency = {"mean": round(float(values.mean()), 4)}
+                    for percentile, value in zip(LATENCY_PERCENTILES, np.percentile(values, LATENCY_PERCENTILES)):
+                        latency[f"p{percentile}"] = round(float(value), 4)
+                    latency["max"] = round(float(values.max()), 4)
+                    latency["total"] = round(float(values.sum()), 3)
+                families[family] = {
+                    "requests": stats.requests,
+                    "cache_hits": stats.cache_hits,
+                    "cache_hit_rate": round(stats.cache_hits / lookups, 4) if lookups else 0.0,
+                    "bytes": stats.bytes,
+                    "cached_bytes": stats.cached_bytes,
+                    "statuses": dict(sorted(stats.statuses.items())),
+                    "latency": latency,
+                }
+            return families
+
+    def report(self):
+        """Summary plus run duration and the adaptive per-host limits at the end of the run."""
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "duration_seconds": round(time.time() - self.started, 3),
+            "families": self.summary(),
+            "host_limits": throttle.current_limits(),
+        }
+
+
+def get_metrics():
+    """Returns the process-wide metrics shared by every fetcher."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = FetchMetrics()
+        return _metrics
+
+
+def report_markdown(report):
+    """Renders a report from ``FetchMetrics.report`` as a Markdown table."""
+    lines = [
+        f"# Fetch report ({report['started']}, {report['duration_seconds']} s)",
+        "",
+        "| Family | Requests | Cache hits | Hit rate | MB | p50 s | p90 s | p99 s | Max s | Total s | Statuses |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|---|",
+    ]
+    for family, stats in report["families"].items():
+        latency = stats["latency"]
+        statuses = ", ".join(f"{status}: {count}" for status, count in stats["statuses"].items())
+        lines.append(
+            f"| {family} | {stats['requests']} | {stats['cache_hits']} | {stats['cache_hit_rate']:.0%} "
+            f"| {stats['bytes'] / 1e6:.2f} | "
+            + " | ".join(str(latency.get(name, "")) for name in ("p50", "p90", "p99", "max", "total"))
+            + f" | {statuses} |"
+        )
+    if report["host_limits"]:
+        lines += ["", "| Host | Concurrency limit at end |", "|---|---:|"]
+        lines += [f"| {host} | {limit} |" for host, limit in sorted(report["host_limits"].items())]
+    return "\n".join(lines) + "\n"
+
+
+def write_report(path):
+    """
+    Writes the run's fetch report as ``<path>.json`` and ``<path>.md``.
+
+    Args:
+        path (str): Report path without extension.
+
+    Returns:
+        dict: The report that was written.
+    """
+    report = get_metrics().report()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.with_suffix(".json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+    path.with_suffix(".md").write_text(report_markdown(report), encoding="utf-8")
+    print(f"Fetch report saved to {path.with_suffix('.md')}")
+    return report
@@ -0,0 +1,313 @@
+"""Persistent on-disk cache for HTTP responses.
+
+Entries are keyed by method, normalized URL and request body. Responses that
+belong to an event ("scope") and were stored after the event ended never
+expire, so re-running an analysis over last season's events makes no network
+calls. Live, unscoped or mid-event entries expire after a short TTL and are
+revalidated with ETag / Last-Modified when the server sent them; once
+revalidated after the end, they become final too.
+"""
+import base64
+import hashlib
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from common import throttle
+from common.fetch_metrics import get_metrics
+from common.resilience import DEFAULT_POLICY, call_with_retries, hedged, response_retry_after
+
+CACHE_DIR = Path(__file__).resolve().parents[1] / ".http_cache"
+
+# Seconds a cached response is served without revalidation
+LIVE_TTL = 2 * 60
+DEFAULT_TTL = 15 * 60
+
+# Cache-busting query parameters (e.g. jQuery's "_" timestamp) left out of keys
+IGNORED_QUERY_PARAMS = {"_"}
+
+_FINAL_SCOPES_FILE = "final_scopes.json"
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d")
+
+
+def normalize_url(url, params=None):
+    """Lower-cases the host, drops fragments and sorts the query string."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((str(k), str(v)) for k, v in dict(params).items())
+    query = sorted((k, v) for k, v in query if k not in IGNORED_QUERY_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
+def parse_end_date(value):
+    """Parses an event end date in any of the formats the APIs use."""
+    if not value:
+        return None
+    text = str(value).split("T")[0].strip()
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def has_ended(end_date):
+    """True once the day after ``end_date`` has started."""
+    parsed = parse_end_date(end_date)
+    return parsed is not None and parsed < date.today()
+
+
+def end_timestamp(end_date):
+    """Epoch seconds at which an event ending on ``end_date`` counts as ended, or None."""
+    parsed = parse_end_date(end_date)
+    if parsed is None:
+        return None
+    return datetime.combine(parsed + timedelta(days=1), datetime.min.time()).timestamp()
+
+
+class HttpCache:
+    """
+    File-backed response store.
+
+    Args:
+        directory (Path): Folder that holds one JSON file per cached response.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # scope -> epoch seconds at which the event ended
+        self._final_scopes = {}
+        final_path = self.directory / _FINAL_SCOPES_FILE
+        if final_path.exists():
+            final_scopes = json.loads(final_path.read_text(encoding="utf-8"))
+            # Older caches stored a plain list without end times; those scopes
+            # are marked again the next time their event details are fetched
+            if isinstance(final_scopes, dict):
+                self._final_scopes = final_scopes
+
+    @staticmethod
+    def key(method, url, body=None, params=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        digest = hashlib.sha256()
+        digest.update(method.upper().encode("ascii"))
+        digest.update(b"\n")
+        digest.update(normalize_url(url, params).encode("utf-8"))
+        digest.update(b"\n")
+        digest.update(body or b"")
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def mark_final(self, scope, ended_at):
+        """
+        Marks ``scope`` (an event) as over.
+
+        Its entries stored after ``ended_at`` never expire; entries stored
+        while it was live keep their TTL until they are fetched or revalidated
+        again.
+
+        Args:
+            scope (str): The event's cache scope.
+            ended_at (float): Epoch seconds at which the event ended.
+        """
+        if not scope or self._final_scopes.get(scope) == ended_at:
+            return
+        with self._lock:
+            self._final_scopes[scope] = ended_at
+            final_path = self.directory / _FINAL_SCOPES_FILE
+            final_path.write_text(json.dumps(self._final_scopes, sort_keys=True), encoding="utf-8")
+
+    def record_event_end(self, scope, end_date):
+        """Marks ``scope`` final if the event's end date has passed."""
+        if has_ended(end_date):
+            self.mark_final(scope, end_timestamp(end_date))
+
+    def is_final(self, scope):
+        return scope in self._final_scopes
+
+    def is_final_entry(self, entry):
+        """True if the entry belongs to an ended event and was stored after it ended."""
+        ended_at = self._final_scopes.get(entry.get("scope"))
+        return ended_at is not None and entry["stored_at"] >= ended_at
+
+    def get(self, key):
+        """Returns the stored entry for ``key`` or None."""
+        path = self._path(key)
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def is_fresh(self, entry):
+        if self.is_final_entry(entry):
+            return True
+        return time.time() - entry["stored_at"] < entry.get("ttl", DEFAULT_TTL)
+
+    def put(self, key, content, status=200, headers=None, scope=None, url=None, ttl=None):
+        """Stores a response body and the headers needed to revalidate it."""
+        headers = CaseInsensitiveDict(headers or {})
+        entry = {
+            "url": url,
+            "scope": scope,
+            "status": status,
+            "stored_at": time.time(),
+            "ttl": ttl if ttl is not None else (LIVE_TTL if scope else DEFAULT_TTL),
+            "headers": {
+                name: headers[name]
+                for name in ("Content-Type", "ETag", "Last-Modified")
+                if name in headers
+            },
+            "content": base64.b64encode(content).decode("ascii"),
+        }
+        self._write(key, entry)
+        return entry
+
+    def delete(self, key):
+        """Drops the entry for ``key``, if any."""
+        self._path(key).unlink(missing_ok=True)
+
+    def touch(self, key, entry):
+        """Restarts the TTL of an entry the server confirmed is unchanged."""
+        entry["stored_at"] = time.time()
+        self._write(key, entry)
+
+    def _write(self, key, entry):
+        # Write then rename so parallel readers never see a partial file
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(entry), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def load(self, method, url, body=None, params=None):
+        """Returns cached content if a fresh entry exists, else None."""
+        entry = self.get(self.key(method, url, body, params))
+        if entry is None or not self.is_fresh(entry):
+            return None
+        content = base64.b64decode(entry["content"])
+        get_metrics().record_cache_hit(url, len(content))
+        return content
+
+    def store(self, method, url, content, body=None, params=None, scope=None):
+        """Stores content fetched outside of requests (e.g. through a browser)."""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        return self.put(self.key(method, url, body, params), content, scope=scope, url=url)
+
+
+def is_json(content):
+    """True if ``content`` (bytes) parses as JSON."""
+    try:
+        json.loads(content)
+    except ValueError:
+        return False
+    return True
+
+
+def response_from_entry(entry, url):
+    """Builds a ``requests.Response`` from a cache entry."""
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response._content = base64.b64decode(entry["content"])
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.url = url
+    response.encoding = "utf-8"
+    response.from_cache = True
+    return response
+
+
+class CachedSession(requests.Session):
+    """
+    ``requests.Session`` that serves and stores responses through an HttpCache.
+
+    Callers may pass ``scope=<event key>`` to tie a request to an event; once
+    that event is marked final its responses are served from disk forever.
+    With ``cache=None`` it behaves like a plain session that accepts ``scope``.
+
+    Requests that reach the network get the policy's timeout and retries;
+    GETs may pass ``hedge_after=<seconds>`` to start a duplicate request when
+    the first one is slow (see ``common.resilience``). With
+    ``expect_json=True`` a 200 whose body is not JSON (e.g. a bot-challenge
+    page) is returned but not stored, and such a stored entry is dropped.
+    """
+
+    def __init__(self, cache=None, policy=None):
+        super().__init__()
+        self.cache = cache
+        self.policy = policy or DEFAULT_POLICY
+
+    def request(self, method, url, *args, scope=None, hedge_after=None, expect_json=False, **kwargs):
+        if self.cache is None:
+            return self._send_throttled(method, url, *args, hedge_after=hedge_after, **kwargs)
+        body = kwargs.get("data")
+        if body is None and kwargs.get("json") is not None:
+            body = json.dumps(kwargs["json"], sort_keys=True)
+        key = self.cache.key(method, url, body, kwargs.get("params"))
+        entry = self.cache.get(key)
+        if entry is not None and expect_json and not is_json(base64.b64decode(entry["content"])):
+            # Stored before non-JSON 200s were refused; final scopes would keep it forever
+            self.cache.delete(key)
+            entry = None
+        if entry is not None and self.cache.is_fresh(entry):
+            response = response_from_entry(entry, url)
+            get_metrics().record_cache_hit(url, len(response.content))
+            return response
+
+        if entry is not None:
+            headers = dict(kwargs.pop("headers", None) or {})
+            if "ETag" in entry["headers"]:
+                headers["If-None-Match"] = entry["headers"]["ETag"]
+            if "Last-Modified" in entry["headers"]:
+                headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+            kwargs["headers"] = headers
+
+        response = self._send_throttled(method, url, *args, hedge_after=hedge_after, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            # Already counted as a network request by _send_throttled
+            self.cache.touch(key, entry)
+            return response_from_entry(entry, url)
+        if response.status_code == 200 and (not expect_json or is_json(response.content)):
+            self.cache.put(key, response.content, headers=response.headers, scope=scope, url=url)
+        response.from_cache = False
+        return response
+
+    def _send_throttled(self, method, url, *args, hedge_after=None, **kwargs):
+        kwargs.setdefault("timeout", self.policy.timeout)
+
+        def send(on_start=None):
+            # Only requests that reach the network count against the host limits;
+            # backoff sleeps happen outside, so a waiting retry holds no slot
+            with throttle.for_url(url).slot() as slot:
+                if on_start is not None:
+                    on_start()
+                started = time.monotonic()
+                try:
+                    response = super(CachedSession, self).request(method, url, *args, **kwargs)
+                except Exception as e:
+                    get_metrics().record_request(url, type(e).__name__, 0, time.monotonic() - started)
+                    raise
+                get_metrics().record_request(
+                    url, response.status_code, len(response.content), time.monotonic() - started)
+                slot.record(response.status_code, response_retry_after(response))
+                return response
+
+        attempt = send
+        if hedge_after is not None and method.upper() == "GET":
+            attempt = lambda: hedged(send, hedge_after)
+        return call_with_retries(attempt, self.policy)
+
+    def record_event_end(self, scope, end_date):
+        if self.cache is not None:
+            self.cache.record_event_end(scope, end_date)
@@ -0,0 +1,192 @@
+"""Set-score metrics for AES match results, and a cube of them by match context.
+
+The "Set Scores" column ("25-21, 23-25, 15-12") is parsed once into integer
+arrays and every metric (third-set rate, set margin, two-point and
+extra-point sets) is computed from them with NumPy. ``MetricsCube`` keeps
+the additive counters for every division x day x round x court cell, so any
+slice or rollup is a sum over cells rather than a pass over the matches.
+"""
+import numpy as np
+import pandas as pd
+
+# One "25-21" set inside a comma-separated "Set Scores" string
+SET_SCORE_PATTERN = r"(?:^|,)\s*(\d+)\s*-\s*(\d+)\s*(?=,|$)"
+
+
+def parse_set_score_array(set_scores):
+    """
+    Parses a "Set Scores" column once into integer arrays.
+
+    Args:
+        set_scores (pd.Series): Strings like "25-21, 23-25, 15-12".
+
+    Returns:
+        tuple: (scores, played). ``scores`` has shape (matches, sets, 2) with
+            each side's points; ``played`` has shape (matches, sets) and marks
+            the sets that exist. Malformed sets are skipped.
+    """
+    set_scores = pd.Series(set_scores, dtype=object).reset_index(drop=True)
+    is_text = set_scores.map(lambda value: isinstance(value, str))
+    parsed = set_scores.where(is_text, "").str.extractall(SET_SCORE_PATTERN)
+
+    match_index = parsed.index.get_level_values(0).to_numpy(dtype=np.intp)
+    set_index = parsed.index.get_level_values("match").to_numpy(dtype=np.intp)
+    max_sets = int(set_index.max()) + 1 if len(set_index) else 0
+
+    scores = np.zeros((len(set_scores), max_sets, 2), dtype=np.int64)
+    played = np.zeros((len(set_scores), max_sets), dtype=bool)
+    scores[match_index, set_index] = parsed.to_numpy(dtype=np.int64)
+    played[match_index, set_index] = True
+    return scores, played
+
+
+def set_score_counts(scores, played):
+    """
+    Per-match metric counters from parsed set scores.
+
+    Returns:
+        pd.DataFrame: One row per match with total_matches,
+            matches_went_three_sets, total_set_margin, total_sets,
+            two_point_sets and extra_point_sets.
+    """
+    margin = np.abs(scores[..., 0] - scores[..., 1])
+    # A set went to extra points past 25 (sets 1-2) or 15 (set 3)
+    thresholds = np.where(np.arange(played.shape[1]) == 2, 15, 25)
+    extra_points = (scores.max(axis=2, initial=0) > thresholds) & played
+    sets_played = played.sum(axis=1)
+
+    return pd.DataFrame({
+        "total_matches": np.ones(len(played), dtype=np.int64),
+        "matches_went_three_sets": (sets_played >= 3).astype(np.int64),
+        "total_set_margin": np.where(played, margin, 0).sum(axis=1),
+        "total_sets": sets_played,
+        "two_point_sets": ((margin == 2) & played).sum(axis=1),
+        "extra_point_sets": extra_points.sum(axis=1),
+    })
+
+
+def add_metric_rates(totals):
+    """Adds the percentage and average columns to summed counters."""
+    def rate(numerator, denominator, scale=100):
+        return (totals[numerator] / totals[denominator] * scale).where(totals[denominator] > 0, 0)
+
+    totals["third_set_pct"] = rate("matches_went_three_sets", "total_matches")
+    totals["avg_margin"] = rate("total_set_margin", "total_sets", scale=1)
+    totals["two_point_set_pct"] = rate("two_point_sets", "total_sets")
+    totals["extra_point_set_pct"] = rate("extra_point_sets", "total_sets")
+    return totals
+
+
+def parse_match_dates(match_dates):
+    """
+    Parses "Match Date" values (ISO datetimes or YYYY-MM-DD) into dates.
+
+    Returns:
+        pd.Series: Date strings (YYYY-MM-DD), NaN where the value is missing or invalid.
+    """
+    match_dates = pd.Series(match_dates, dtype=object).reset_index(drop=True)
+    text = match_dates.where(match_dates.map(lambda value: isinstance(value, str)), "")
+    # ISO datetimes keep their own calendar date; plain dates must be exactly YYYY-MM-DD
+    candidate = text.str.slice(0, 10).where(text.str.contains("T", regex=False) | (text.str.len() == 10))
+    parsed = pd.to_datetime(candidate, format="%Y-%m-%d", errors="coerce")
+    return parsed.dt.strftime("%Y-%m-%d")
+
+
+# Dimensions of the metrics cube and the match-results columns they come from
+CUBE_DIMENSIONS = ["Division", "Day", "Round", "Court"]
+UNKNOWN_DIMENSION = "Unknown"
+
+# Additive per-match counters; every rate is derived from their sums
+COUNTER_COLUMNS = [
+    "total_matches",
+    "matches_went_three_sets",
+    "total_set_margin",
+    "total_sets",
+    "two_point_sets",
+    "extra_point_sets",
+]
+
+
+class MetricsCube:
+    """
+    Match metrics summed for every combination of the cube dimensions.
+
+    Args:
+        cells (pd.DataFrame): One row per populated cell with the dimension
+            columns and the additive counter columns.
+    """
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    @classmethod
+    def from_match_results(cls, match_results_df):
+        """
+        Builds the cube from match results in one grouped pass.
+
+        Args:
+            match_results_df (pd.DataFrame): Match results with Set Scores and
+                Match Date, plus Division, Round and Court when known.
+
+        Returns:
+            MetricsCube: The populated cube.
+        """
+        empty = pd.Series(dtype=object)
+        scores, played = parse_set_score_array(match_results_df.get("Set Scores", empty))
+        counts = set_score_counts(scores, played)
+        counts["Day"] = parse_match_dates(match_results_df.get("Match Date", empty))
+        for dimension in ("Division", "Round", "Court"):
+            values = match_results_df.get(dimension)
+            counts[dimension] = empty if values is None else values.reset_index(drop=True)
+        counts[CUBE_DIMENSIONS] = counts[CUBE_DIMENSIONS].fillna(UNKNOWN_DIMENSION).astype(str)
+
+        cells = counts.groupby(CUBE_DIMENSIONS, sort=True)[COUNTER_COLUMNS].sum().reset_index()
+        return cls(cells)
+
+    def slice(self, by=(), **filters):
+        """
+        Metrics for a slice of the cube, rolled up to the ``by`` dimensions.
+
+        Args:
+            by (list): Dimensions to keep; the others are summed over.
+            **filters: Dimension values to keep, e.g. ``Division="18 Open"``
+                or ``Day=["2026-01-17", "2026-01-18"]``.
+
+        Returns:
+            pd.DataFrame: One row per combination of ``by`` with the counters
+                and the rate columns.
+        """
+        cells = self.cells
+        for dimension, value in filters.items():
+            if dimension not in CUBE_DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {dimension}")
+            values = [value] if isinstance(value, str) else list(value)
+            cells = cells[cells[dimension].isin(values)]
+
+        by = list(by)
+        if by:
+            totals = cells.groupby(by, sort=True)[COUNTER_COLUMNS].sum().reset_index()
+        else:
+            totals = cells[COUNTER_COLUMNS].sum().to_frame().T.reset_index(drop=True)
+        return add_metric_rates(totals)
+
+    def table(self):
+        """Every cell of the cube with its counters and rates."""
+        return self.slice(by=CUBE_DIMENSIONS)
+
+    def export(self, path):
+        """Writes ``table()`` to CSV, or Parquet when the path ends in .parquet."""
+        table = self.table()
+        if str(path).lower().endswith(".parquet"):
+            table.to_parquet(path, index=False)
+        else:
+            table.to_csv(path, index=False)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a cube written by ``export`` back for further slicing."""
+        if str(path).lower().endswith(".parquet"):
+            table = pd.read_parquet(path)
+        else:
+            table = pd.read_csv(path, dtype={dimension: str for dimension in CUBE_DIMENSIONS})
+        return cls(table[CUBE_DIMENSIONS + COUNTER_COLUMNS])
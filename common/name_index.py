@@ -0,0 +1,199 @@
+"""Fuzzy team-name matching through a character-trigram index.
+
+Registration lists, Jacker team lists and AES/SportWrench standings spell the
+same team slightly differently ("208 U14 Elite" vs "208 14U Elite"), so exact
+joins on the name silently drop teams. Names are normalized, split into
+trigrams and indexed; a lookup only scores the names that share a trigram
+with the query (and the same block), never the whole list.
+
+Numbers in a name (age, team number) are part of the block: "Elite 14" and
+"Elite 15" look alike but are different teams.
+"""
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Lowest Dice similarity of trigram sets accepted as a match
+DEFAULT_MIN_SCORE = 0.75
+
+_AGE_FORMS = re.compile(r"\b(?:u(\d+)|(\d+)(?:u|s|'s|’s))\b")
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+_NUMBERS = re.compile(r"\d+")
+
+
+def normalize_team_name(name):
+    """Lower-case ASCII name with punctuation dropped and age forms (14U, U14, 14's) reduced to the number."""
+    if not isinstance(name, str):
+        return ""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    text = text.replace("&", " and ")
+    text = _AGE_FORMS.sub(lambda match: match.group(1) or match.group(2), text)
+    text = _NON_ALPHANUMERIC.sub(" ", text)
+    return " ".join(text.split())
+
+
+def name_trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def number_key(normalized):
+    """Numbers in the name, in order; names only match within the same key."""
+    return " ".join(_NUMBERS.findall(normalized))
+
+
+class TeamNameIndex:
+    """
+    Trigram index over a list of team names.
+
+    Args:
+        names (Iterable): Team names, one per record (duplicates are fine).
+        blocks (Iterable): Optional extra block label per record (e.g. the
+            gender); a query only matches records with the same label.
+    """
+
+    def __init__(self, names, blocks=None):
+        names = list(names)
+        blocks = [None] * len(names) if blocks is None else list(blocks)
+
+        # Index distinct (normalized name, block) keys; records point at them
+        self._key_ids = {}
+        self._block_lookup = {}
+        first_record = []
+        key_blocks = []
+        key_trigrams = []
+        normalized_names = {}
+        for position, (name, block) in enumerate(zip(names, blocks)):
+            if name not in normalized_names:
+                normalized_names[name] = normalize_team_name(name)
+            normalized = normalized_names[name]
+            if not normalized:
+                continue
+            block_key = (number_key(normalized), block)
+            key = (normalized, block_key)
+            if key in self._key_ids:
+                continue
+            self._key_ids[key] = len(first_record)
+            first_record.append(position)
+            key_blocks.append(self._block_lookup.setdefault(block_key, len(self._block_lookup)))
+            key_trigrams.append(name_trigrams(normalized))
+
+        self._first_record = np.array(first_record, dtype=np.intp)
+        self._sizes = np.array([len(trigrams) for trigrams in key_trigrams], dtype=np.float64)
+
+        # Postings are kept per (block, trigram), so a lookup never reads other blocks' names.
+        # They are grouped with one sort instead of appending to a list per pair.
+        flat_trigrams = [trigram for trigrams in key_trigrams for trigram in trigrams]
+        flat_keys = np.repeat(np.arange(len(key_trigrams), dtype=np.intp), self._sizes.astype(np.intp))
+        trigram_codes, trigram_values = pd.factorize(pd.Series(flat_trigrams, dtype=object))
+        posting_codes = np.repeat(np.array(key_blocks, dtype=np.int64), self._sizes.astype(np.intp)) * max(
+            len(trigram_values), 1
+        ) + trigram_codes
+        order = np.argsort(posting_codes, kind="stable")
+        posting_codes, flat_keys = posting_codes[order], flat_keys[order]
+        starts = np.flatnonzero(np.r_[True, posting_codes[1:] != posting_codes[:-1]]) if len(order) else order
+        block_ids, trigram_ids = np.divmod(posting_codes[starts], max(len(trigram_values), 1))
+        # (block, trigram) -> (start, stop) slice of the sorted key IDs
+        self._posting_keys = flat_keys
+        self._postings = dict(zip(
+            zip(block_ids.tolist(), trigram_values[trigram_ids].tolist()),
+            zip(starts.tolist(), np.r_[starts[1:], len(flat_keys)].tolist()),
+        ))
+
+    def __len__(self):
+        return len(self._first_record)
+
+    def match(self, name, block=None, min_score=DEFAULT_MIN_SCORE):
+        """
+        Finds the indexed record whose name is most like ``name``.
+
+        Args:
+            name (str): Name to look up.
+            block: Block label the match must share (see ``blocks``).
+            min_score (float): Lowest similarity (0-1) accepted.
+
+        Returns:
+            tuple: (record position, score), or (None, 0.0) if nothing scores
+                at least ``min_score``.
+        """
+        normalized = normalize_team_name(name)
+        if not normalized:
+            return None, 0.0
+        block_key = (number_key(normalized), block)
+        key_id = self._key_ids.get((normalized, block_key))
+        if key_id is not None:
+            return int(self._first_record[key_id]), 1.0
+
+        block_id = self._block_lookup.get(block_key)
+        trigrams = name_trigrams(normalized)
+        spans = [self._postings.get((block_id, trigram)) for trigram in trigrams]
+        lists = [self._posting_keys[span[0]:span[1]] for span in spans if span is not None]
+        if not lists:
+            return None, 0.0
+        candidates, shared = np.unique(np.concatenate(lists), return_counts=True)
+        scores = 2.0 * shared / (len(trigrams) + self._sizes[candidates])
+        best = int(np.argmax(scores))
+        if scores[best] < min_score:
+            return None, 0.0
+        return int(self._first_record[candidates[best]]), float(scores[best])
+
+    def match_many(self, names, blocks=None, min_score=DEFAULT_MIN_SCORE):
+        """
+        Looks up many names.
+
+        Returns:
+            tuple: (positions, scores) arrays; position -1 where nothing matched.
+        """
+        names = list(names)
+        blocks = [None] * len(names) if blocks is None else list(blocks)
+        positions = np.full(len(names), -1, dtype=np.intp)
+        scores = np.zeros(len(names), dtype=np.float64)
+        # Lists repeat names (one row per event); look each one up once
+        cache = {}
+        for row, (name, block) in enumerate(zip(names, blocks)):
+            if (name, block) not in cache:
+                cache[(name, block)] = self.match(name, block, min_score)
+            position, score = cache[(name, block)]
+            if position is not None:
+                positions[row], scores[row] = position, score
+        return positions, scores
+
+
+def fuzzy_merge(left, right, left_on, right_on, how="inner", left_block=None, right_block=None,
+                min_score=DEFAULT_MIN_SCORE, score_column="MatchScore"):
+    """
+    Joins two DataFrames on similar (not identical) team names.
+
+    Every ``left`` row is matched to its most similar ``right`` row.
+
+    Args:
+        left (pd.DataFrame): Rows to match (e.g. registrations).
+        right (pd.DataFrame): Rows to match against (e.g. standings, team lists).
+        left_on (str): Name column of ``left``.
+        right_on (str): Name column of ``right``.
+        how (str): "inner" keeps matched rows only; "left" keeps every left row.
+        left_block (str): Optional column of ``left`` that must equal ...
+        right_block (str): ... this column of ``right`` for a match.
+        min_score (float): Lowest similarity (0-1) accepted.
+        score_column (str): Name of the added similarity column.
+
+    Returns:
+        pd.DataFrame: ``left`` columns, then ``right`` columns (suffixed "_right"
+            where the names clash), then the similarity score.
+    """
+    index = TeamNameIndex(right[right_on], None if right_block is None else right[right_block])
+    positions, scores = index.match_many(
+        left[left_on], None if left_block is None else left[left_block], min_score=min_score
+    )
+    matched = positions >= 0
+    left = left.reset_index(drop=True)
+    left["_match_position"] = positions
+    if how == "inner":
+        left, scores, matched = left[matched], scores[matched], matched[matched]
+    merged = left.merge(
+        right.reset_index(drop=True), left_on="_match_position", right_index=True, how="left", suffixes=("", "_right")
+    ).drop(columns="_match_position")
+    merged[score_column] = np.where(matched, np.round(scores, 3), np.nan)
+    return merged
@@ -0,0 +1,224 @@
+"""Timeouts, retries and hedged requests for every fetcher.
+
+A request without a timeout can hang a worker thread for the rest of the run,
+and one 502 from AES used to fail a whole division or event. Calls made here
+get a (connect, read) timeout, are retried a bounded number of times with
+full-jitter exponential backoff (or after the server's ``Retry-After``), and
+can optionally be hedged: if the first attempt has not answered after a few
+seconds a duplicate is started and whichever answers first is used.
+"""
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from common.fetch_metrics import get_metrics
+
+# (connect, read) seconds before a request is abandoned
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_MAX_ATTEMPTS = 4
+# Backoff before retry n is uniform in [0, min(cap, base * 2 ** n)] seconds
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30
+# Longest Retry-After honored; a server asking for more is retried after this
+MAX_RETRY_AFTER = 120
+
+# Statuses worth another attempt: rate limited or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+
+# Browser-based fetches (scrapling, Playwright, Selenium) time out per page load
+PAGE_TIMEOUT = 60
+
+# Threads that run hedged requests; a losing duplicate finishes in the background
+HEDGE_WORKERS = 16
+
+_hedge_executor = None
+_hedge_lock = threading.Lock()
+
+
+class RetryPolicy:
+    """
+    How often and how patiently a request is retried.
+
+    Args:
+        max_attempts (int): Attempts in total, including the first.
+        timeout (tuple): (connect, read) timeout in seconds for each attempt.
+        retry_statuses (set): Response statuses that are retried.
+        backoff_base (float): Backoff ceiling in seconds before the first retry.
+        backoff_cap (float): Largest backoff ceiling in seconds.
+    """
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS, timeout=DEFAULT_TIMEOUT,
+                 retry_statuses=RETRY_STATUSES, backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP):
+        self.max_attempts = max(1, max_attempts)
+        self.timeout = timeout
+        self.retry_statuses = set(retry_statuses)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Seconds to wait before retrying after failed attempt ``attempt`` (0-based).
+
+        Full jitter keeps parallel workers that failed together from retrying
+        together; a ``Retry-After`` from the server is a lower bound.
+        """
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, MAX_RETRY_AFTER))
+        return delay
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a ``Retry-After`` header value.
+
+    Returns:
+        float: Delta-seconds or the time left until the HTTP date, or None
+            when the header is missing or malformed.
+    """
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def response_status(response):
+    return response.status_code
+
+
+def response_retry_after(response):
+    return parse_retry_after(response.headers.get("Retry-After"))
+
+
+def call_with_retries(call, policy=None, status_of=response_status, retry_after_of=response_retry_after,
+                      retry_exceptions=RETRY_EXCEPTIONS):
+    """
+    Runs ``call`` until it succeeds or the policy's attempts are used up.
+
+    Args:
+        call (callable): Makes one attempt and returns its result.
+        policy (RetryPolicy): Defaults to ``DEFAULT_POLICY``.
+        status_of (callable): Status code of a result.
+        retry_after_of (callable): Retry-After seconds of a result, or None.
+        retry_exceptions (tuple): Exceptions that count as a failed attempt.
+
+    Returns:
+        The first result whose status is not retried, or the last result once
+        every attempt has been used (the caller decides what a 503 means).
+
+    Raises:
+        Exception: The last attempt's exception, if it raised one of
+            ``retry_exceptions``; other exceptions are raised immediately.
+    """
+    policy = policy or DEFAULT_POLICY
+    last_attempt = policy.max_attempts - 1
+    for attempt in range(policy.max_attempts):
+        try:
+            result = call()
+        except retry_exceptions:
+            if attempt == last_attempt:
+                raise
+            time.sleep(policy.delay(attempt))
+            continue
+        if status_of(result) not in policy.retry_statuses or attempt == last_attempt:
+            return result
+        time.sleep(policy.delay(attempt, retry_after_of(result)))
+
+
+def page_retry_after(page):
+    headers = getattr(page, "headers", None) or {}
+    return parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+
+
+def fetch_page(fetcher, url, policy=None, timeout=PAGE_TIMEOUT):
+    """
+    Fetches ``url`` with a scrapling fetcher under the same retry rules as the session.
+
+    Browser failures come in many exception types, so any exception counts as
+    a failed attempt; the last one is raised once the attempts are used up.
+
+    Args:
+        fetcher: A scrapling fetcher (e.g. ``StealthyFetcher``).
+        url (str): Page to fetch.
+        policy (RetryPolicy): Defaults to ``DEFAULT_POLICY``.
+        timeout (float): Seconds one page load may take.
+
+    Returns:
+        The fetched page; check ``page.status``.
+    """
+    def attempt():
+        started = time.monotonic()
+        try:
+            page = fetcher.fetch(url, timeout=timeout * 1000)
+        except Exception as e:
+            get_metrics().record_request(url, type(e).__name__, 0, time.monotonic() - started)
+            raise
+        get_metrics().record_request(url, page.status, len(page.html_content or ""), time.monotonic() - started)
+        return page
+
+    return call_with_retries(
+        attempt,
+        policy,
+        status_of=lambda page: page.status,
+        retry_after_of=page_retry_after,
+        retry_exceptions=(Exception,),
+    )
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    with _hedge_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+        return _hedge_executor
+
+
+def hedged(call, hedge_after):
+    """
+    Runs ``call``, starting a duplicate if it has not finished ``hedge_after`` seconds after it started.
+
+    ``call`` is passed an ``on_start`` callback to invoke once the request is
+    actually sent (e.g. after waiting for a throttle slot), so time spent
+    queued behind a saturated host does not count towards ``hedge_after``.
+
+    Only for idempotent requests. The first attempt to succeed wins; if one of
+    the two raises, the other one's outcome is used. The slower duplicate is
+    not cancelled (requests cannot be), its result is simply dropped.
+    """
+    executor = _get_hedge_executor()
+    started = threading.Event()
+
+    def first_call():
+        try:
+            return call(started.set)
+        finally:
+            started.set()
+
+    first = executor.submit(first_call)
+    started.wait()
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result()
+    second = executor.submit(call, lambda: None)
+    done, _ = wait([first, second], return_when=FIRST_COMPLETED)
+    winner = done.pop()
+    if winner.exception() is not None:
+        return (second if winner is first else first).result()
+    return winner.result()
@@ -0,0 +1,116 @@
+"""Work scheduler for batch scrapes that span many events and hosts.
+
+Walking events one after another lets one slow event hold up every other
+one, and leaves one host idle while the other is busy. Here every event is a
+task that, once its details are fetched, queues a task per division (which
+may queue per-team tasks in turn). Tasks wait in one queue per host and are
+handed out round-robin across hosts, biggest first within a host, and their
+results are yielded as soon as each one finishes.
+"""
+import heapq
+import itertools
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Threads shared by every queued task (each host is still capped by common.throttle)
+DEFAULT_WORKERS = 16
+# Priority of event tasks, above any division size, so every division is known early
+EVENT_PRIORITY = float("inf")
+
+
+class Task:
+    """One unit of work: ``fn(*args)`` run on a worker thread."""
+
+    def __init__(self, host, fn, args, priority=0, key=None):
+        self.host = host
+        self.fn = fn
+        self.args = args
+        self.priority = priority
+        self.key = key
+
+
+class WorkScheduler:
+    """
+    Runs queued tasks on a shared thread pool, interleaving hosts.
+
+    Tasks may queue further tasks with ``submit`` while they run (an event
+    task queues its divisions); ``run`` keeps going until no task is left.
+
+    Args:
+        max_workers (int): Tasks allowed to run at once.
+        max_per_host (int): Tasks allowed to run at once for one host;
+            defaults to ``max_workers``.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_per_host=None):
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host or max_workers
+        self._queues = {}
+        self._hosts = []
+        self._next_host = 0
+        self._running = {}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def submit(self, host, fn, *args, priority=0, key=None):
+        """
+        Queues ``fn(*args)``.
+
+        Args:
+            host (str): Host the task fetches from; tasks of different hosts
+                are interleaved.
+            fn (callable): The work; its return value is yielded by ``run``.
+            priority (float): Higher runs first within the host (e.g. the
+                division's team count).
+            key: Any label handed back with the result (e.g. for ordering).
+        """
+        task = Task(host, fn, args, priority, key)
+        with self._lock:
+            if host not in self._queues:
+                self._queues[host] = []
+                self._hosts.append(host)
+            heapq.heappush(self._queues[host], (-priority, next(self._order), task))
+
+    def _next_task(self):
+        """Pops the best task of the next host in turn that may start one, or None."""
+        with self._lock:
+            for offset in range(len(self._hosts)):
+                host = self._hosts[(self._next_host + offset) % len(self._hosts)]
+                if self._queues[host] and self._running.get(host, 0) < self.max_per_host:
+                    self._next_host = (self._next_host + offset + 1) % len(self._hosts)
+                    self._running[host] = self._running.get(host, 0) + 1
+                    return heapq.heappop(self._queues[host])[2]
+        return None
+
+    def _finished(self, task):
+        with self._lock:
+            self._running[task.host] -= 1
+
+    def run(self):
+        """
+        Runs every queued task, including the ones queued along the way.
+
+        Yields:
+            tuple: (task key, result) as each task finishes. A task that
+                raises is reported and skipped.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {}
+            while True:
+                while len(in_flight) < self.max_workers:
+                    task = self._next_task()
+                    if task is None:
+                        break
+                    in_flight[executor.submit(task.fn, *task.args)] = task
+                if not in_flight:
+                    return
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = in_flight.pop(future)
+                    self._finished(task)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"Task {task.key} on {task.host} failed: {e}")
+                        continue
+                    yield task.key, result
@@ -0,0 +1,115 @@
+"""Joins standings from several seasons onto one team identity.
+
+Team codes change every season (the age goes up by one) and some teams move
+clubs, which the ``team_code_conversions.csv`` overrides record. Rows keep the
+code they were scraped with plus a ``SeasonOffset`` (0 = current season,
+1 = last season, ...). The current-season identity is worked out once per
+distinct (code, offset) pair into a mapping table that is hash-joined onto the
+rows, so adding older seasons only means tagging their rows with a larger
+offset; nothing that was already fetched changes.
+"""
+import pandas as pd
+
+from common.team_codes import increment_team_codes, normalize_team_codes
+
+SEASON_COLUMN = "SeasonOffset"
+CANONICAL_COLUMN = "CanonicalTeamCode"
+
+
+def identity_table(codes, season_offsets, conversions=None):
+    """
+    Maps every distinct (team code, season offset) pair to its current-season code.
+
+    A code from ``n`` seasons back is rolled forward ``n`` times; at every
+    rollover a team listed in ``conversions`` takes its new code instead of
+    the incremented one.
+
+    Args:
+        codes (pd.Series): Team codes as scraped.
+        season_offsets (pd.Series): Seasons back from the current one, per row.
+        conversions (dict): Lower-case LastCode -> CurrentCode overrides.
+
+    Returns:
+        pd.DataFrame: TeamCode (normalized), SeasonOffset and CanonicalTeamCode.
+    """
+    pairs = pd.DataFrame({
+        "TeamCode": normalize_team_codes(pd.Series(codes).reset_index(drop=True)),
+        SEASON_COLUMN: pd.Series(season_offsets).reset_index(drop=True).fillna(0).astype(int),
+    }).dropna(subset=["TeamCode"]).drop_duplicates(ignore_index=True)
+
+    canonical = pairs["TeamCode"].copy()
+    for rollover in range(int(pairs[SEASON_COLUMN].max()) if len(pairs) else 0):
+        older = pairs[SEASON_COLUMN] > rollover
+        canonical[older] = increment_team_codes(canonical[older], conversions)
+    pairs[CANONICAL_COLUMN] = normalize_team_codes(canonical)
+    return pairs
+
+
+def join_seasons(frame, conversions=None, code_column="TeamCode"):
+    """
+    Adds a CanonicalTeamCode column to standings rows from any number of seasons.
+
+    Args:
+        frame (pd.DataFrame): Rows with ``code_column`` and SeasonOffset columns
+            (rows without an offset count as current season).
+        conversions (dict): Lower-case LastCode -> CurrentCode overrides.
+        code_column (str): Column holding the codes as scraped.
+
+    Returns:
+        pd.DataFrame: ``frame`` with the canonical code of every row.
+    """
+    offsets = frame[SEASON_COLUMN] if SEASON_COLUMN in frame.columns else pd.Series(0, index=frame.index)
+    mapping = identity_table(frame[code_column], offsets, conversions)
+    keys = pd.DataFrame({
+        "TeamCode": normalize_team_codes(frame[code_column]).to_numpy(),
+        SEASON_COLUMN: offsets.fillna(0).astype(int).to_numpy(),
+    })
+    joined = keys.merge(mapping, on=["TeamCode", SEASON_COLUMN], how="left")
+    result = frame.copy()
+    result[CANONICAL_COLUMN] = joined[CANONICAL_COLUMN].to_numpy()
+    return result
+
+
+def season_pivot(frame, conversions=None, values="FinishRank", code_column="TeamCode"):
+    """
+    One row per team identity with a column per event across all seasons.
+
+    Args:
+        frame (pd.DataFrame): Standings rows with TeamName, EventName,
+            ``values``, ``code_column`` and SeasonOffset columns.
+        conversions (dict): Lower-case LastCode -> CurrentCode overrides.
+        values (str): Column shown in the event columns.
+        code_column (str): Column holding the codes as scraped.
+
+    Returns:
+        pd.DataFrame: TeamCode (current-season code), TeamName (from the most
+            recent season the team played) and one column per event, current
+            season first.
+    """
+    joined = join_seasons(frame, conversions, code_column)
+    if SEASON_COLUMN not in joined.columns:
+        joined[SEASON_COLUMN] = 0
+    joined[SEASON_COLUMN] = joined[SEASON_COLUMN].fillna(0).astype(int)
+
+    pivot_data = joined.pivot_table(
+        index=CANONICAL_COLUMN,
+        columns="EventName",
+        values=values,
+        aggfunc="first",
+    )
+    event_order = (
+        joined[["EventName", SEASON_COLUMN]]
+        .drop_duplicates("EventName")
+        .sort_values([SEASON_COLUMN, "EventName"])["EventName"]
+    )
+    pivot_data = pivot_data[[event for event in event_order if event in pivot_data.columns]]
+
+    team_names = (
+        joined.dropna(subset=["TeamName"])
+        .sort_values(SEASON_COLUMN, kind="stable")
+        .groupby(CANONICAL_COLUMN)["TeamName"]
+        .first()
+    )
+    pivot_data.insert(0, "TeamName", team_names.reindex(pivot_data.index))
+    pivot_data.columns.name = None
+    return pivot_data.rename_axis("TeamCode").reset_index()
@@ -0,0 +1,41 @@
+"""Process-wide HTTP session shared by every fetcher.
+
+The session keeps connections alive per host, reads/writes the on-disk
+response cache in ``common.http_cache`` and retries transient failures as
+set out in ``common.resilience``.
+"""
+from requests.adapters import HTTPAdapter
+
+from common.http_cache import CACHE_DIR, CachedSession, HttpCache
+
+# Number of keep-alive connections kept open per host
+DEFAULT_POOL_SIZE = 16
+
+_shared_session = None
+
+
+def build_session(pool_size=DEFAULT_POOL_SIZE, cache_dir=CACHE_DIR, policy=None):
+    """
+    Creates a session whose connection pool is sized for parallel fetches.
+
+    Args:
+        pool_size (int): Keep-alive connections kept per host.
+        cache_dir (Path): Response cache folder, or None to disable caching.
+        policy (RetryPolicy): Timeouts and retries; defaults to ``DEFAULT_POLICY``.
+
+    Returns:
+        CachedSession: The configured session.
+    """
+    session = CachedSession(HttpCache(cache_dir) if cache_dir else None, policy=policy)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """Returns the process-wide session shared by every client."""
+    global _shared_session
+    if _shared_session is None:
+        _shared_session = build_session()
+    return _shared_session
@@ -0,0 +1,153 @@
+"""Last-seen AES standings per (event, division) for incremental refreshes.
+
+During a tournament weekend the scripts are re-run many times. Divisions whose
+teams all have a finish are done and are read back from disk; only divisions
+still in progress are fetched again.
+"""
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from common.aes_client import AESRequestError
+from common.team_codes import normalize_team_code
+
+STORE_DIR = Path(__file__).resolve().parents[1] / ".standings_store"
+
+
+def is_division_complete(standings):
+    """True when every team in the division has a finish rank."""
+    return bool(standings) and all(
+        str(team.get("FinishRank")).strip() not in ("", "None", "null") for team in standings
+    )
+
+
+class StandingsStore:
+    """
+    Stores the last standings payload fetched for each division.
+
+    Args:
+        directory (Path): Folder holding one JSON file per (event, division).
+    """
+
+    def __init__(self, directory=STORE_DIR):
+        self.directory = Path(directory)
+
+    def _path(self, event_id, division_id):
+        return self.directory / str(event_id) / f"{division_id}.json"
+
+    def _load_entry(self, event_id, division_id):
+        path = self._path(event_id, division_id)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def load(self, event_id, division_id):
+        """Returns the stored standings list, or None if never fetched."""
+        entry = self._load_entry(event_id, division_id)
+        return None if entry is None else entry["value"]
+
+    def save(self, event_id, division_id, standings, final=False):
+        """
+        Stores a division's standings.
+
+        Args:
+            final (bool): The standings were fetched after the event ended,
+                so they are not fetched again even if some finishes are blank.
+        """
+        path = self._path(event_id, division_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"value": standings, "final": final}), encoding="utf-8")
+
+    def refresh(self, client, division_ids, event_final=False, incremental=True, team_codes=None):
+        """
+        Returns standings for every division, refetching only live ones.
+
+        With ``team_codes``, a division fetched before is refreshed for the
+        tracked teams only: their codes are resolved to AES team IDs from the
+        stored payload and passed as the standings ``tIds`` filter, and
+        divisions without tracked teams are not fetched at all. Other teams
+        keep their last-seen rows. Divisions never fetched are fetched in full.
+
+        Args:
+            client (AESClient): Client for the event.
+            division_ids (list): Divisions of the event.
+            event_final (bool): True once the event's end date has passed;
+                divisions still incomplete are fetched one last time and then
+                kept as they are.
+            incremental (bool): False refetches every division.
+            team_codes (set): Optional lower-case codes of the tracked teams.
+
+        Returns:
+            tuple: (dict of division_id -> standings list, list of division IDs
+                whose standings changed since the last run).
+        """
+        standings_by_division = {}
+        changed = []
+        for division_id in division_ids:
+            standings, division_changed = self.refresh_division(
+                client, division_id, event_final, incremental, team_codes)
+            if standings is not None:
+                standings_by_division[division_id] = standings
+            if division_changed:
+                changed.append(division_id)
+        return standings_by_division, changed
+
+    def refresh_division(self, client, division_id, event_final=False, incremental=True, team_codes=None):
+        """
+        Standings of one division, refetched only when live (see ``refresh``).
+
+        Returns:
+            tuple: (standings list, or None if the fetch failed and nothing
+                was stored; True if the standings changed since the last run).
+        """
+        entry = self._load_entry(client.event_id, division_id)
+        stored = None if entry is None else entry["value"]
+        if incremental and stored is not None and (entry.get("final") or is_division_complete(stored)):
+            return stored, False
+        try:
+            # Standings saved mid-event are fetched in full once after the end
+            if team_codes is not None and stored is not None and not event_final:
+                standings = self._refresh_teams(client, division_id, stored, team_codes)
+            else:
+                standings = client.standings(division_id)
+        except AESRequestError as e:
+            print(f"Failed to fetch standings for division ID: {division_id}. Status code: {e.status_code}")
+            return stored, False
+        if standings == stored and not event_final:
+            return standings, False
+        self.save(client.event_id, division_id, standings, final=event_final)
+        return standings, standings != stored
+
+    @staticmethod
+    def _refresh_teams(client, division_id, stored, team_codes):
+        """Stored standings with the tracked teams' rows fetched again."""
+        team_ids = [
+            team["TeamId"] for team in stored
+            if normalize_team_code(team.get("TeamCode")) in team_codes and team.get("TeamId") is not None
+        ]
+        if not team_ids:
+            return stored
+        fresh = {str(team["TeamId"]): team for team in client.team_standings(division_id, team_ids)}
+        return [fresh.get(str(team.get("TeamId")), team) for team in stored]
+
+
+def patch_rows(existing_df, updates_df, keys):
+    """
+    Replaces the rows of ``existing_df`` that share ``keys`` with ``updates_df``.
+
+    Args:
+        existing_df (pd.DataFrame): Previously written output.
+        updates_df (pd.DataFrame): Fresh rows for the refreshed groups.
+        keys (list): Columns identifying a group (e.g. EventName, DivisionName).
+
+    Returns:
+        pd.DataFrame: Existing rows outside the refreshed groups plus the updates.
+    """
+    if updates_df.empty:
+        return existing_df
+    if existing_df.empty:
+        return updates_df.reset_index(drop=True)
+    refreshed = pd.MultiIndex.from_frame(updates_df[keys].drop_duplicates())
+    stale = pd.MultiIndex.from_frame(existing_df[keys]).isin(refreshed)
+    return pd.concat([existing_df[~stale], updates_df], ignore_index=True)
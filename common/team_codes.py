@@ -0,0 +1,142 @@
+"""Parsing of USAV team codes such as ``g14abcde1nt``.
+
+A canonical code is gender letter, two-digit age, club letters, team number
+and two-letter region. The scripts used to take codes apart with their own
+regexes and ``.str.lower()`` calls row by row; the column functions here
+decode each distinct code once and map the result back onto the rows.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# gender, age, club, team number, region
+TEAM_CODE_PATTERN = re.compile(r"^([a-z])(\d{2})([a-z]+)(\d)([a-z]{2})$")
+# Season rollover: the age after the "g" goes up by one
+INCREMENT_PATTERN = re.compile(r"g(\d+)(.+)")
+
+PARSED_FIELDS = ["Gender", "Age", "Club", "TeamNumber", "Region"]
+
+
+def normalize_team_code(team_code):
+    """Stripped, lower-case team code; '' for missing values."""
+    if not isinstance(team_code, str):
+        return ""
+    return team_code.strip().lower()
+
+
+def is_canonical_team_code(team_code):
+    return bool(TEAM_CODE_PATTERN.match(normalize_team_code(team_code)))
+
+
+def extract_age_group(team_code):
+    """Gender letter plus age (``g14``), also for codes that are not canonical."""
+    value = normalize_team_code(team_code)
+    if len(value) >= 3 and value[0].isalpha() and value[1:3].isdigit():
+        return value[:3]
+    return ""
+
+
+def parse_team_code(team_code):
+    """
+    Splits one team code into its parts.
+
+    Returns:
+        tuple: (gender, age, club, team_number, region), all None when the
+            code is not canonical. Age and team number are ints.
+    """
+    match = TEAM_CODE_PATTERN.match(normalize_team_code(team_code))
+    if not match:
+        return (None,) * len(PARSED_FIELDS)
+    gender, age, club, team_number, region = match.groups()
+    return gender, int(age), club, int(team_number), region
+
+
+def _per_value(codes, transform):
+    """Applies ``transform`` to every distinct value and returns (row codes, results)."""
+    row_codes, uniques = pd.factorize(pd.Series(codes), use_na_sentinel=False)
+    return row_codes, [transform(value) for value in uniques]
+
+
+def _categorical(row_codes, values, index):
+    category_codes, categories = pd.factorize(pd.Series(values, dtype=object))
+    return pd.Series(
+        pd.Categorical.from_codes(category_codes[row_codes], categories=categories),
+        index=index,
+    )
+
+
+def normalize_team_codes(codes):
+    """Column version of ``normalize_team_code``; missing values stay missing."""
+    codes = pd.Series(codes)
+    row_codes, values = _per_value(codes, lambda value: normalize_team_code(value) if isinstance(value, str) else value)
+    return pd.Series(np.array(values, dtype=object)[row_codes], index=codes.index, dtype=object)
+
+
+def parse_team_codes(codes):
+    """
+    Decodes a whole column of team codes at once.
+
+    Args:
+        codes (pd.Series): Team codes as scraped (any case, may have blanks).
+
+    Returns:
+        pd.DataFrame: Same index as ``codes`` with TeamCode (normalized),
+            Gender, Age, Club, TeamNumber, Region and AgeGroup as categorical
+            columns (missing where the code is not canonical; AgeGroup is set
+            for any code starting with a letter and two digits) and a boolean
+            Canonical column.
+    """
+    codes = pd.Series(codes)
+    row_codes, values = _per_value(codes, normalize_team_code)
+    parts = [parse_team_code(value) for value in values]
+
+    parsed = pd.DataFrame(index=codes.index)
+    parsed["TeamCode"] = _categorical(row_codes, values, codes.index)
+    for position, field in enumerate(PARSED_FIELDS):
+        parsed[field] = _categorical(row_codes, [part[position] for part in parts], codes.index)
+    parsed["AgeGroup"] = _categorical(
+        row_codes, [extract_age_group(value) or None for value in values], codes.index
+    )
+    parsed["Canonical"] = np.array([part[0] is not None for part in parts], dtype=bool)[row_codes]
+    return parsed
+
+
+def load_team_code_conversions(path):
+    """
+    Reads the LastCode -> CurrentCode overrides for teams that changed codes.
+
+    Raises:
+        FileNotFoundError: If the CSV does not exist.
+
+    Returns:
+        dict: Lower-case last-season code -> lower-case current code.
+    """
+    conversions_df = pd.read_csv(path)
+    return dict(zip(normalize_team_codes(conversions_df["LastCode"]), normalize_team_codes(conversions_df["CurrentCode"])))
+
+
+def increment_team_code(team_code, conversions=None):
+    """
+    Maps a last-season team code to this season's code.
+
+    Teams listed in ``conversions`` get their current code; any other code has
+    the age after its "g" incremented (``g13abc1nt`` -> ``g14abc1nt``).
+    """
+    if conversions:
+        converted = conversions.get(normalize_team_code(team_code))
+        if converted is not None:
+            return converted
+    match = INCREMENT_PATTERN.search(team_code)
+    if match:
+        return f"g{int(match.group(1)) + 1}{match.group(2)}"
+    return team_code
+
+
+def increment_team_codes(codes, conversions=None):
+    """Column version of ``increment_team_code``; each distinct code is converted once."""
+    codes = pd.Series(codes)
+    row_codes, values = _per_value(
+        codes, lambda value: increment_team_code(value, conversions) if isinstance(value, str) else value
+    )
+    return pd.Series(np.array(values, dtype=object)[row_codes], index=codes.index, dtype=object)
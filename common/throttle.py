@@ -0,0 +1,175 @@
+"""Per-host politeness for parallel fetches.
+
+Each host gets a cap on in-flight requests and a minimum spacing between
+request starts, shared by every thread in the process.
+
+The cap adapts (AIMD): every healthy response raises it by about one per
+round of requests, up to the host's ceiling, while a 429, a 5xx, a failed
+connection or a latency spike halves it. A 429/503 carrying Retry-After also
+holds back new requests to the host for that long.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# (starting in-flight limit, highest limit, minimum seconds between request starts) per host
+HOST_LIMITS = {
+    "results.advancedeventsystems.com": (8, 32, 0.02),
+}
+DEFAULT_HOST_LIMIT = (4, 16, 0.05)
+
+# The limit never drops below this many in-flight requests
+MIN_CONCURRENCY = 1
+# Multiplier applied to the limit when the host pushes back
+BACKOFF_FACTOR = 0.5
+# A response slower than this multiple of the host's typical latency is a spike...
+LATENCY_SPIKE_FACTOR = 3.0
+# ... as long as it also took at least this many seconds
+MIN_SPIKE_SECONDS = 1.0
+# Weight of the newest response in the typical (moving average) latency
+LATENCY_SMOOTHING = 0.1
+# Longest pause taken for a Retry-After
+MAX_HOST_PAUSE = 60
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+
+def is_overload_status(status_code):
+    """Statuses with which a host says it is rate limiting or struggling."""
+    return status_code == 429 or status_code >= 500
+
+
+class HostThrottle:
+    """
+    Adaptive limit on concurrent requests to one host.
+
+    Use ``with throttle.slot() as slot:`` around a request and report the
+    outcome with ``slot.record(status_code)``; a slot left without a record
+    (the request raised) counts as a failure.
+
+    Args:
+        initial_concurrency (int): In-flight limit to start from.
+        max_concurrency (int): Highest limit the throttle may grow to.
+        min_interval (float): Minimum seconds between two request starts.
+    """
+
+    def __init__(self, initial_concurrency, max_concurrency, min_interval):
+        self.max_concurrency = max_concurrency
+        self.min_interval = min_interval
+        self._limit = float(min(max(initial_concurrency, MIN_CONCURRENCY), max_concurrency))
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._next_start = 0.0
+        self._last_decrease = 0.0
+        self._typical_latency = None
+        self.decreases = 0
+
+    @property
+    def limit(self):
+        """Current number of requests allowed in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def acquire(self):
+        """Blocks until a request may start; returns its start time."""
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+        return start
+
+    def release(self, started, status_code=None, retry_after=None):
+        """
+        Frees the request's slot and adjusts the limit to its outcome.
+
+        Args:
+            started (float): Start time returned by ``acquire``.
+            status_code (int): Response status, or None if the request failed.
+            retry_after (float): Seconds the host asked to wait, if any.
+        """
+        latency = time.monotonic() - started
+        with self._condition:
+            was_busy = self._in_flight >= self._limit / 2
+            self._in_flight -= 1
+            if status_code is None or is_overload_status(status_code):
+                self._decrease(started)
+                if retry_after:
+                    self._next_start = max(self._next_start, time.monotonic() + min(retry_after, MAX_HOST_PAUSE))
+            elif self._is_spike(latency):
+                self._decrease(started)
+            else:
+                self._observe_latency(latency)
+                # Only grow while the limit is actually being used
+                if was_busy:
+                    self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+    def _is_spike(self, latency):
+        return (
+            self._typical_latency is not None
+            and latency >= MIN_SPIKE_SECONDS
+            and latency > LATENCY_SPIKE_FACTOR * self._typical_latency
+        )
+
+    def _observe_latency(self, latency):
+        if self._typical_latency is None:
+            self._typical_latency = latency
+        else:
+            self._typical_latency += LATENCY_SMOOTHING * (latency - self._typical_latency)
+
+    def _decrease(self, started):
+        # Requests already in flight when the limit was cut report the same
+        # overload; only the first of them cuts it
+        if started < self._last_decrease:
+            return
+        self._limit = max(MIN_CONCURRENCY, self._limit * BACKOFF_FACTOR)
+        self._last_decrease = time.monotonic()
+        self.decreases += 1
+
+    @contextmanager
+    def slot(self):
+        slot = _Slot()
+        started = self.acquire()
+        try:
+            yield slot
+        finally:
+            self.release(started, slot.status_code, slot.retry_after)
+
+
+class _Slot:
+    """Outcome of one request, filled in by the caller inside ``HostThrottle.slot``."""
+
+    def __init__(self):
+        self.status_code = None
+        self.retry_after = None
+
+    def record(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def for_url(url):
+    """Returns the shared throttle for the host of ``url``."""
+    host = urlsplit(url).netloc
+    with _throttles_lock:
+        throttle = _throttles.get(host)
+        if throttle is None:
+            throttle = HostThrottle(*HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+            _throttles[host] = throttle
+        return throttle
+
+
+def current_limits():
+    """Current in-flight limit of every host contacted so far."""
+    with _throttles_lock:
+        return {host: throttle.limit for host, throttle in _throttles.items()}
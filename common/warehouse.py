@@ -0,0 +1,515 @@
+"""Local SQLite warehouse of everything the fetchers have downloaded.
+
+Each script used to write its own flat CSV and nothing read back what an
+earlier run already fetched. The AES, SportWrench and vbschedule fetchers now
+also record events, divisions, teams, standings, matches and sets here, in
+normalized tables indexed for the lookups the analyses need (every finish
+for a team code, every match of an event), so those become local queries
+instead of re-scrapes.
+
+Events are keyed ``<source>:<event id>`` (e.g. ``aes:PTAw...``). SportWrench
+keys match the HTTP cache scopes (``esw:<id>``); AES responses are cached
+under the bare event ID instead.
+
+Rows are written division by division, so an event can hold rows fetched
+mid-event or left half-written by a crashed run. Each event records when its
+standings and its matches were last ingested in full (``IngestTracker``);
+only a complete ingestion that started after the event ended is final.
+"""
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from common.http_cache import end_timestamp, has_ended, parse_end_date
+
+WAREHOUSE_PATH = Path(__file__).resolve().parents[1] / "results.db"
+
+AES_SOURCE = "aes"
+ESW_SOURCE = "esw"
+VBSCHEDULE_SOURCE = "vbschedule"
+
+# Parts of an event that are ingested (and completed) separately
+STANDINGS = "standings"
+MATCHES = "matches"
+_INGESTED_COLUMNS = {STANDINGS: "standings_ingested_at", MATCHES: "matches_ingested_at"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event_key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    source_event_id TEXT NOT NULL,
+    name TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    standings_ingested_at REAL,
+    matches_ingested_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_events_name ON events (name);
+CREATE INDEX IF NOT EXISTS idx_events_start_date ON events (start_date);
+
+CREATE TABLE IF NOT EXISTS divisions (
+    division_key TEXT PRIMARY KEY,
+    event_key TEXT NOT NULL REFERENCES events (event_key),
+    source_division_id TEXT NOT NULL,
+    name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_divisions_event ON divisions (event_key);
+
+CREATE TABLE IF NOT EXISTS teams (
+    team_code TEXT PRIMARY KEY,
+    team_name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS standings (
+    division_key TEXT NOT NULL REFERENCES divisions (division_key),
+    team_code TEXT NOT NULL REFERENCES teams (team_code),
+    event_key TEXT NOT NULL REFERENCES events (event_key),
+    source_team_id TEXT,
+    team_name TEXT,
+    finish_rank INTEGER,
+    PRIMARY KEY (division_key, team_code)
+);
+CREATE INDEX IF NOT EXISTS idx_standings_team ON standings (team_code);
+CREATE INDEX IF NOT EXISTS idx_standings_event ON standings (event_key);
+CREATE INDEX IF NOT EXISTS idx_standings_source_team ON standings (event_key, source_team_id);
+
+CREATE TABLE IF NOT EXISTS matches (
+    match_key TEXT PRIMARY KEY,
+    event_key TEXT NOT NULL REFERENCES events (event_key),
+    source_match_id TEXT NOT NULL,
+    first_team_id TEXT,
+    first_team_name TEXT,
+    second_team_id TEXT,
+    second_team_name TEXT,
+    first_team_won INTEGER,
+    scheduled_start TEXT,
+    division_key TEXT REFERENCES divisions (division_key),
+    round_name TEXT,
+    court_name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_matches_event ON matches (event_key);
+CREATE INDEX IF NOT EXISTS idx_matches_first_team ON matches (event_key, first_team_id);
+CREATE INDEX IF NOT EXISTS idx_matches_second_team ON matches (event_key, second_team_id);
+
+CREATE TABLE IF NOT EXISTS sets (
+    match_key TEXT NOT NULL REFERENCES matches (match_key),
+    set_number INTEGER NOT NULL,
+    score_text TEXT,
+    first_team_score INTEGER,
+    second_team_score INTEGER,
+    PRIMARY KEY (match_key, set_number)
+);
+"""
+
+# Columns added to existing tables after their first release: (table, column, type)
+_ADDED_COLUMNS = [
+    ("matches", "division_key", "TEXT"),
+    ("matches", "round_name", "TEXT"),
+    ("matches", "court_name", "TEXT"),
+    ("events", "standings_ingested_at", "REAL"),
+    ("events", "matches_ingested_at", "REAL"),
+]
+
+_SCORE_PATTERN = re.compile(r"^\s*(\d+)\s*-\s*(\d+)\s*$")
+
+
+def event_key(source, event_id):
+    """Warehouse key of an event, e.g. ``aes:PTAwMDAwNDI3Nzk90``."""
+    return f"{source}:{event_id}"
+
+
+def _iso_date(value):
+    parsed = parse_end_date(value)
+    return parsed.isoformat() if parsed else None
+
+
+def _finish_rank(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+class Warehouse:
+    """
+    Normalized store of events, divisions, teams, standings, matches and sets.
+
+    Args:
+        path (Path): SQLite database file; created on first use.
+    """
+
+    def __init__(self, path=WAREHOUSE_PATH):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            for table, column, column_type in _ADDED_COLUMNS:
+                existing = {row["name"] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def close(self):
+        self._conn.close()
+
+    def record_event(self, source, event_id, name, start_date=None, end_date=None):
+        """
+        Inserts or updates an event.
+
+        Returns:
+            str: The event's warehouse key.
+        """
+        key = event_key(source, event_id)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO events (event_key, source, source_event_id, name, start_date, end_date)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (event_key) DO UPDATE SET name = excluded.name,"
+                " start_date = COALESCE(excluded.start_date, start_date),"
+                " end_date = COALESCE(excluded.end_date, end_date)",
+                (key, source, str(event_id), name, _iso_date(start_date), _iso_date(end_date)),
+            )
+        return key
+
+    def record_standings(self, event_key, rows):
+        """
+        Replaces the standings of every division that appears in ``rows``.
+
+        Args:
+            event_key (str): Key returned by ``record_event``.
+            rows (list): Dicts with DivisionId, DivisionName, TeamCode,
+                TeamName, FinishRank and optionally TeamId. Rows without a
+                team code are skipped.
+        """
+        rows = [row for row in rows if str(row.get("TeamCode") or "").strip() not in ("", "None", "null")]
+        divisions = {}
+        for row in rows:
+            divisions.setdefault(str(row["DivisionId"]), row.get("DivisionName"))
+
+        with self._lock, self._conn:
+            for division_id, division_name in divisions.items():
+                division_key = f"{event_key}:{division_id}"
+                self._conn.execute(
+                    "INSERT INTO divisions (division_key, event_key, source_division_id, name)"
+                    " VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (division_key) DO UPDATE SET name = excluded.name",
+                    (division_key, event_key, division_id, division_name),
+                )
+                self._conn.execute("DELETE FROM standings WHERE division_key = ?", (division_key,))
+
+            for row in rows:
+                team_code = str(row["TeamCode"]).strip().lower()
+                self._conn.execute(
+                    "INSERT INTO teams (team_code, team_name) VALUES (?, ?)"
+                    " ON CONFLICT (team_code) DO UPDATE SET team_name = excluded.team_name",
+                    (team_code, row.get("TeamName")),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO standings"
+                    " (division_key, team_code, event_key, source_team_id, team_name, finish_rank)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        f"{event_key}:{row['DivisionId']}",
+                        team_code,
+                        event_key,
+                        str(row["TeamId"]) if row.get("TeamId") is not None else None,
+                        row.get("TeamName"),
+                        _finish_rank(row.get("FinishRank")),
+                    ),
+                )
+
+    def record_matches(self, event_key, matches):
+        """
+        Inserts or replaces played matches and their set scores.
+
+        Args:
+            event_key (str): Key returned by ``record_event``.
+            matches (list): Matches in the AES ``schedule/past`` shape, with
+                DivisionId, Round and Court when known.
+        """
+        with self._lock, self._conn:
+            for match in matches:
+                match_key = f"{event_key}:{match['MatchId']}"
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO matches"
+                    " (match_key, event_key, source_match_id, first_team_id, first_team_name,"
+                    " second_team_id, second_team_name, first_team_won, scheduled_start,"
+                    " division_key, round_name, court_name)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        match_key,
+                        event_key,
+                        str(match["MatchId"]),
+                        str(match["FirstTeamId"]),
+                        match.get("FirstTeamName"),
+                        str(match["SecondTeamId"]),
+                        match.get("SecondTeamName"),
+                        int(bool(match.get("FirstTeamWon"))),
+                        match.get("ScheduledStartDateTime") or "",
+                        f"{event_key}:{match['DivisionId']}" if match.get("DivisionId") is not None else None,
+                        match.get("Round"),
+                        match.get("Court"),
+                    ),
+                )
+                self._conn.execute("DELETE FROM sets WHERE match_key = ?", (match_key,))
+                set_number = 0
+                for set_data in match.get("Sets") or []:
+                    score_text = set_data.get("ScoreText")
+                    if not score_text:
+                        continue
+                    set_number += 1
+                    score = _SCORE_PATTERN.match(score_text)
+                    self._conn.execute(
+                        "INSERT INTO sets (match_key, set_number, score_text, first_team_score, second_team_score)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (
+                            match_key,
+                            set_number,
+                            score_text,
+                            int(score.group(1)) if score else None,
+                            int(score.group(2)) if score else None,
+                        ),
+                    )
+
+    def query(self, sql, params=()):
+        """Runs a read query and returns the result as a DataFrame."""
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def begin_ingest(self, event_key, part):
+        """
+        Marks the event's ``part`` (STANDINGS or MATCHES) as being rewritten.
+
+        Until ``complete_ingest`` is called the part is not final, so rows
+        of an interrupted run are never reused.
+
+        Returns:
+            float: The ingestion's start time, for ``complete_ingest``.
+        """
+        started_at = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE events SET {_INGESTED_COLUMNS[part]} = NULL WHERE event_key = ?", (event_key,))
+        return started_at
+
+    def complete_ingest(self, event_key, part, started_at):
+        """Records that every row of the event's ``part`` was written by the ingestion started at ``started_at``."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE events SET {_INGESTED_COLUMNS[part]} = ? WHERE event_key = ?", (started_at, event_key))
+
+    def has_final(self, event_key, part):
+        """
+        True if the event's ``part`` can be reused instead of fetched again.
+
+        That takes an event that has ended and a complete ingestion of the
+        part that started after it ended.
+        """
+        column = _INGESTED_COLUMNS[part]
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT end_date, {column} AS ingested_at FROM events WHERE event_key = ?", (event_key,)).fetchone()
+        return (
+            row is not None
+            and has_ended(row["end_date"])
+            and row["ingested_at"] is not None
+            and row["ingested_at"] >= end_timestamp(row["end_date"])
+        )
+
+    def team_finishes(self, team_code):
+        """Every recorded finish of a team code, oldest event first."""
+        return self.query(
+            "SELECT e.name AS EventName, e.start_date AS EventDate, d.name AS DivisionName,"
+            " s.finish_rank AS FinishRank, s.team_name AS TeamName"
+            " FROM standings s"
+            " JOIN events e ON e.event_key = s.event_key"
+            " JOIN divisions d ON d.division_key = s.division_key"
+            " WHERE s.team_code = ?"
+            " ORDER BY e.start_date, e.name",
+            (str(team_code).strip().lower(),),
+        )
+
+    def standings(self, event_keys):
+        """
+        Standings rows of the given events.
+
+        Returns:
+            pd.DataFrame: EventKey, EventName, EventDate, DivisionId,
+                DivisionName, TeamCode, TeamName, TeamId and FinishRank columns.
+        """
+        placeholders = ", ".join("?" for _ in event_keys)
+        return self.query(
+            "SELECT s.event_key AS EventKey, e.name AS EventName, e.start_date AS EventDate,"
+            " d.source_division_id AS DivisionId, d.name AS DivisionName,"
+            " s.team_code AS TeamCode, s.team_name AS TeamName,"
+            " s.source_team_id AS TeamId, s.finish_rank AS FinishRank"
+            " FROM standings s"
+            " JOIN events e ON e.event_key = s.event_key"
+            " JOIN divisions d ON d.division_key = s.division_key"
+            f" WHERE s.event_key IN ({placeholders})"
+            " ORDER BY e.start_date, d.name, s.finish_rank",
+            list(event_keys),
+        )
+
+    def match_results(self, event_key):
+        """
+        Played matches of an event in the ``nit_results`` match-results shape.
+
+        Returns:
+            pd.DataFrame: Match ID, First/Second Team ID and Name, Winner,
+                Set Scores, Match Date, Division, Round and Court columns. The
+                IDs are integers, like the ones fetched live, so the two concat
+                and de-duplicate cleanly.
+        """
+        results = self.query(
+            "SELECT m.source_match_id AS \"Match ID\","
+            " m.first_team_id AS \"First Team ID\", m.first_team_name AS \"First Team Name\","
+            " m.second_team_id AS \"Second Team ID\", m.second_team_name AS \"Second Team Name\","
+            " CASE WHEN m.first_team_won THEN m.first_team_name ELSE m.second_team_name END AS Winner,"
+            " COALESCE((SELECT group_concat(score_text, ', ') FROM"
+            "   (SELECT score_text FROM sets WHERE match_key = m.match_key ORDER BY set_number)), '')"
+            "   AS \"Set Scores\","
+            " m.scheduled_start AS \"Match Date\","
+            " d.name AS Division, m.round_name AS Round, m.court_name AS Court"
+            " FROM matches m LEFT JOIN divisions d ON d.division_key = m.division_key"
+            " WHERE m.event_key = ?"
+            " ORDER BY m.scheduled_start, m.source_match_id",
+            (event_key,),
+        )
+        # The IDs are stored as TEXT
+        for column in ("Match ID", "First Team ID", "Second Team ID"):
+            results[column] = pd.to_numeric(results[column], errors="coerce").astype("Int64")
+        return results
+
+    def team_results(self, event_name_filter=None):
+        """
+        Yields one row per team per match, in the TeamResults CSV shape.
+
+        Team codes are resolved through the standings of the same event.
+
+        Args:
+            event_name_filter (str): Optional substring the event name must contain.
+
+        Yields:
+            dict: Team, Team Code, Event Name, Event Date, Result,
+                Opponent Team Code and Opponent Team.
+        """
+        sql = (
+            "WITH sides AS ("
+            "  SELECT event_key, first_team_id AS team_id, first_team_name AS team,"
+            "    second_team_id AS opp_id, second_team_name AS opp, first_team_won AS won"
+            "  FROM matches"
+            "  UNION ALL"
+            "  SELECT event_key, second_team_id, second_team_name, first_team_id, first_team_name,"
+            "    1 - first_team_won FROM matches"
+            ")"
+            " SELECT sides.team AS \"Team\", COALESCE(ts.team_code, '') AS \"Team Code\","
+            " e.name AS \"Event Name\", COALESCE(e.start_date, '') AS \"Event Date\","
+            " CASE WHEN sides.won THEN 'Won' ELSE 'Lost' END AS \"Result\","
+            " COALESCE(os.team_code, '') AS \"Opponent Team Code\", sides.opp AS \"Opponent Team\""
+            " FROM sides"
+            " JOIN events e ON e.event_key = sides.event_key"
+            " LEFT JOIN standings ts ON ts.event_key = sides.event_key AND ts.source_team_id = sides.team_id"
+            " LEFT JOIN standings os ON os.event_key = sides.event_key AND os.source_team_id = sides.opp_id"
+        )
+        params = []
+        if event_name_filter:
+            sql += " WHERE e.name LIKE ?"
+            params.append(f"%{event_name_filter}%")
+        sql += " ORDER BY e.start_date, e.name, sides.team"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        for row in rows:
+            yield dict(row)
+
+
+class IngestTracker:
+    """
+    Completes an event's ingestion once each of its divisions has been recorded.
+
+    Division tasks run in parallel and report with ``division_done``; a
+    division that failed keeps the ingestion incomplete.
+
+    Args:
+        warehouse (Warehouse): Target warehouse.
+        event_key (str): Key returned by ``record_event``.
+        part (str): STANDINGS or MATCHES.
+        division_count (int): Divisions that will report.
+    """
+
+    def __init__(self, warehouse, event_key, part, division_count):
+        self.warehouse = warehouse
+        self.event_key = event_key
+        self.part = part
+        self._pending = division_count
+        self._failed = False
+        self._lock = threading.Lock()
+        self._started_at = warehouse.begin_ingest(event_key, part)
+        if division_count == 0:
+            warehouse.complete_ingest(event_key, part, self._started_at)
+
+    def division_done(self, ok=True):
+        """Reports one division; ``ok=False`` if its rows could not be recorded."""
+        with self._lock:
+            self._pending -= 1
+            self._failed = self._failed or not ok
+            complete = self._pending == 0 and not self._failed
+        if complete:
+            self.warehouse.complete_ingest(self.event_key, self.part, self._started_at)
+
+
+_shared_warehouse = None
+_shared_lock = threading.Lock()
+
+
+def get_warehouse():
+    """Returns the process-wide warehouse shared by every fetcher, opening it on first use."""
+    global _shared_warehouse
+    with _shared_lock:
+        if _shared_warehouse is None:
+            _shared_warehouse = Warehouse()
+        return _shared_warehouse
+
+
+def aes_standings_rows(standings):
+    """Converts AES standings rows into ``record_standings`` rows."""
+    return [
+        {
+            "DivisionId": team["Division"]["DivisionId"],
+            "DivisionName": team["Division"]["Name"],
+            "TeamId": team.get("TeamId"),
+            "TeamCode": team.get("TeamCode"),
+            "TeamName": team.get("TeamName") or team.get("TeamText"),
+            "FinishRank": team.get("FinishRank"),
+        }
+        for team in standings
+    ]
+
+
+def record_aes_event(warehouse, event_id, event_data, standings_by_division, matches=None):
+    """
+    Records an AES event's standings (and matches, when fetched).
+
+    Args:
+        warehouse (Warehouse): Target warehouse.
+        event_id (str): The AES event ID.
+        event_data (dict): Payload returned by ``AESClient.event()``.
+        standings_by_division (dict): division_id -> AES standings rows.
+        matches (list): Optional matches in the ``schedule/past`` shape.
+
+    Returns:
+        str: The event's warehouse key.
+    """
+    key = warehouse.record_event(
+        AES_SOURCE, event_id, event_data.get("Name"),
+        event_data.get("StartDate"), event_data.get("EndDate"))
+    rows = [row for standings in standings_by_division.values() for row in aes_standings_rows(standings)]
+    warehouse.record_standings(key, rows)
+    if matches:
+        warehouse.record_matches(key, matches)
+    return key
@@ -0,0 +1,130 @@
+import copy
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.aes_client import AESRequestError
+from common.aes_matches import collect_division_matches, iter_bracket_matches, normalize_match
+
+BRACKET_SAMPLE = Path(__file__).resolve().parents[1] / "Brackets" / "JSON files" / "raw_bracket_data_188491.json"
+
+
+def load_bracket_matches():
+    plays = json.loads(BRACKET_SAMPLE.read_text(encoding="utf-8"))
+    return [match for play in plays for root in play.get("Roots") or [] for match in iter_bracket_matches(root)]
+
+
+def played_bracket_match(first_team_won=True, second_team_won=False):
+    """The sample's "Match 1" (first team known), with an opponent and scores filled in."""
+    matches = load_bracket_matches()
+    match = copy.deepcopy(next(m for m in matches if m["MatchId"] == -62505))
+    match["SecondTeam"] = copy.deepcopy(next(m for m in matches if m["MatchId"] == -62536)["FirstTeam"])
+    match["Sets"][0].update(FirstTeamScore=25, SecondTeamScore=20, ScoreText="25-20")
+    match["Sets"][1].update(FirstTeamScore=25, SecondTeamScore=18, ScoreText="25-18")
+    match["HasScores"] = True
+    match["FirstTeamWon"] = first_team_won
+    match["SecondTeamWon"] = second_team_won
+    return match
+
+
+def test_bracket_match_reads_team_objects():
+    match = normalize_match(played_bracket_match(), division_id=188491, round_name="Pearl Division")
+
+    assert match is not None
+    assert "FirstTeamId" not in played_bracket_match()
+    assert match["FirstTeamId"] == 58003
+    assert match["FirstTeamName"] == "Academy 16-3E Banshees"
+    assert match["SecondTeamId"] == 66473
+    assert match["SecondTeamName"] == "Nebraska ONE 16 Lime"
+    assert match["FirstTeamWon"] is True
+    assert [set_data["ScoreText"] for set_data in match["Sets"]] == ["25-20", "25-18", ""]
+    assert match["Court"] == "North 25"
+    assert match["Round"] == "Pearl Division"
+
+
+def test_bracket_second_team_win():
+    match = normalize_match(played_bracket_match(first_team_won=False, second_team_won=True))
+
+    assert match["FirstTeamWon"] is False
+
+
+def test_unplayed_bracket_matches_are_skipped():
+    assert all(normalize_match(match) is None for match in load_bracket_matches())
+
+
+def test_match_in_progress_is_skipped():
+    assert normalize_match(played_bracket_match(first_team_won=False, second_team_won=False)) is None
+
+
+def test_poolsheet_match_keeps_flat_keys():
+    match = normalize_match({
+        "MatchId": 1,
+        "FirstTeamId": 10,
+        "FirstTeamName": "Team A",
+        "SecondTeamId": 20,
+        "SecondTeamName": "Team B",
+        "FirstTeamWon": False,
+        "SecondTeamWon": True,
+        "Sets": [{"ScoreText": "20-25"}, {"ScoreText": "22-25"}],
+    })
+
+    assert (match["FirstTeamId"], match["SecondTeamId"]) == (10, 20)
+    assert (match["FirstTeamName"], match["SecondTeamName"]) == ("Team A", "Team B")
+    assert match["FirstTeamWon"] is False
+
+
+class FakeClient:
+    """Serves fixed plays and pool sheets; pool sheets not in ``poolsheets`` fail."""
+
+    def __init__(self, plays, poolsheets):
+        self._plays = plays
+        self._poolsheets = poolsheets
+
+    def plays(self, division_id, play_date):
+        return self._plays[division_id]
+
+    def poolsheet(self, play_id):
+        if play_id not in self._poolsheets:
+            raise AESRequestError(f"poolsheet/{play_id}", 500)
+        return self._poolsheets[play_id]
+
+
+def poolsheet_match(match_id):
+    return {
+        "MatchId": match_id,
+        "FirstTeamId": 10,
+        "FirstTeamName": "Team A",
+        "SecondTeamId": 20,
+        "SecondTeamName": "Team B",
+        "FirstTeamWon": True,
+        "SecondTeamWon": False,
+        "Sets": [{"ScoreText": "25-20"}, {"ScoreText": "25-22"}],
+    }
+
+
+EVENT = {"StartDate": "2026-01-10T00:00:00", "EndDate": "2026-01-10T00:00:00", "Divisions": [{"DivisionId": 1}, {"DivisionId": 2}]}
+
+
+def test_placeholder_play_does_not_fail_division():
+    client = FakeClient(
+        plays={1: [{"PlayId": 100, "Teams": []}, {"PlayId": 101, "FullName": "Pool 2 (TBD)"}], 2: []},
+        poolsheets={100: {"Matches": [poolsheet_match(1)]}},
+    )
+
+    matches, failed_division_ids = collect_division_matches(client, EVENT)
+
+    assert [match["MatchId"] for match in matches] == [1]
+    assert failed_division_ids == set()
+
+
+def test_failed_poolsheet_fails_division():
+    client = FakeClient(
+        plays={1: [{"PlayId": 100, "Teams": []}], 2: [{"PlayId": 200, "Teams": []}]},
+        poolsheets={200: {"Matches": [poolsheet_match(2)]}},
+    )
+
+    matches, failed_division_ids = collect_division_matches(client, EVENT)
+
+    assert [match["MatchId"] for match in matches] == [2]
+    assert failed_division_ids == {1}